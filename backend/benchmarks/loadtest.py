@@ -0,0 +1,481 @@
+# backend/benchmarks/loadtest.py
+"""End-to-end load generator for the Elevate API.
+
+Drives every route with a seeded mix of user IDs, ticket IDs and
+documentation queries drawn from the mock datasets, then prints a JSON
+report with RPS, latency percentiles, error rate and cache hit rate per
+route. Run the backend against the fake upstream so no DeepSeek quota is
+used:
+
+    uvicorn fake_deepseek:app --port 8001
+    DEEPSEEK_API_BASE_URL=http://localhost:8001/v1 uvicorn main:app --port 8000
+    python benchmarks/loadtest.py --requests 2000 --concurrency 50 --output report.json
+
+With --rate the generator sends requests on a seeded Poisson schedule instead
+of as fast as the workers allow, and latency is measured from each request's
+scheduled start so a slow server cannot hide its queueing delay.
+
+Requests sent with "Prefer: respond-async" are followed to completion by
+long-polling their job, so their latency includes the job queue. With
+--replay-etags the conditional GET routes resend the last ETag they got for
+a path as If-None-Match, like a browser cache, and report their 304 rate.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+
+# Add the directory containing mock data to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+mock_data_dir = os.path.join(current_dir, '..', 'mock_data')
+sys.path.insert(0, mock_data_dir)
+
+from company_documentation import company_documentation
+from jira_tickets import jira_tickets
+from user_profiles import user_profiles
+
+# A planned request: route name, method, path, JSON body, headers
+PlannedRequest = Tuple[str, str, str, Optional[Dict[str, Any]], Dict[str, str]]
+
+MOODS = ["great", "good", "okay", "stressed", "overwhelmed"]
+FEEDBACK = [
+    None,
+    "Busy sprint but the team is supportive.",
+    "Too many meetings this week.",
+    "Excited about the new project.",
+    "Struggling to balance review work and delivery."
+]
+
+# Routes mapped to the token-usage endpoint name used for cache hit rates
+CACHE_ENDPOINTS = {
+    "star_summary": "star_summary",
+    "star_summary_stream": "star_summary",
+    "star_summaries_bulk": "star_summary",
+    "documentation": "documentation",
+    "job_recommendations": "job_recommendations",
+    "job_recommendations_stream": "job_recommendations",
+    "job_recommendations_async": "job_recommendations",
+    "star_summary_async": "star_summary",
+    "mood_check": "mood_check"
+}
+
+# GET routes answering If-None-Match with 304
+CONDITIONAL_ROUTES = {"documentation_search", "connection_recommendations_get"}
+
+DEFAULT_MIX = {
+    "star_summary": 20,
+    "star_summary_stream": 5,
+    "star_summaries_bulk": 1,
+    "star_summary_async": 3,
+    "documentation": 15,
+    "documentation_search": 5,
+    "connection_recommendations": 20,
+    "connection_recommendations_get": 10,
+    "job_recommendations": 15,
+    "job_recommendations_stream": 5,
+    "job_recommendations_async": 2,
+    "mood_check": 10,
+    "health": 5,
+    "root": 4
+}
+
+SSE_HEADERS = {"Accept": "text/event-stream"}
+ASYNC_HEADERS = {"Prefer": "respond-async"}
+
+# Longest single long-poll on a background job, in seconds
+JOB_POLL_WAIT = 30
+
+def _route_builders() -> Dict[str, Callable[[random.Random], PlannedRequest]]:
+    """Request builders per route, drawing IDs and queries from the mock data.
+
+    Most draws are valid and repeat across requests, like real traffic; a few
+    target unknown or incomplete tickets to exercise the error paths.
+    """
+    ticket_ids = [t['ticket_id'] for t in jira_tickets]
+    completed_ids = [t['ticket_id'] for t in jira_tickets if t.get('status') == 'Completed']
+    assignees = sorted({t['assignee'] for t in jira_tickets})
+    user_ids = [u['user_id'] for u in user_profiles]
+    queries = [keyword for doc in company_documentation for keyword in doc.get('keywords', [])]
+    queries.append("holiday party playlist")
+
+    def star_ticket(rng: random.Random) -> str:
+        roll = rng.random()
+        if roll < 0.9:
+            return rng.choice(completed_ids)
+        if roll < 0.97:
+            return rng.choice(ticket_ids)
+        return "PROJ-999"
+
+    return {
+        "star_summary": lambda rng: (
+            "star_summary", "POST", "/api/create/star-summary",
+            {"ticket_id": star_ticket(rng)}, {}
+        ),
+        "star_summary_stream": lambda rng: (
+            "star_summary_stream", "POST", "/api/create/star-summary",
+            {"ticket_id": rng.choice(completed_ids)}, SSE_HEADERS
+        ),
+        "star_summary_async": lambda rng: (
+            "star_summary_async", "POST", "/api/create/star-summary",
+            {"ticket_id": star_ticket(rng)}, ASYNC_HEADERS
+        ),
+        "star_summaries_bulk": lambda rng: (
+            "star_summaries_bulk", "POST", "/api/create/star-summaries",
+            {"assignee": rng.choice(assignees)}, {}
+        ),
+        "documentation": lambda rng: (
+            "documentation", "POST", "/api/create/documentation",
+            {"query": f"Where can I read about {rng.choice(queries)}?"}, {}
+        ),
+        "documentation_search": lambda rng: (
+            "documentation_search", "GET",
+            "/api/documentation/search?" + urlencode({"query": rng.choice(queries)}), None, {}
+        ),
+        "connection_recommendations": lambda rng: (
+            "connection_recommendations", "POST", "/api/connect/recommendations",
+            {"user_id": rng.choice(user_ids)}, {}
+        ),
+        "connection_recommendations_get": lambda rng: (
+            "connection_recommendations_get", "GET",
+            "/api/connect/recommendations?" + urlencode({"user_id": rng.choice(user_ids)}), None, {}
+        ),
+        "job_recommendations": lambda rng: (
+            "job_recommendations", "POST", "/api/elevate/job-recommendations",
+            {"user_id": rng.choice(user_ids)}, {}
+        ),
+        "job_recommendations_stream": lambda rng: (
+            "job_recommendations_stream", "POST", "/api/elevate/job-recommendations",
+            {"user_id": rng.choice(user_ids)}, SSE_HEADERS
+        ),
+        "job_recommendations_async": lambda rng: (
+            "job_recommendations_async", "POST", "/api/elevate/job-recommendations",
+            {"user_id": rng.choice(user_ids)}, ASYNC_HEADERS
+        ),
+        "mood_check": lambda rng: (
+            "mood_check", "POST", "/api/create/mood-check",
+            {"mood": rng.choice(MOODS), "feedback": rng.choice(FEEDBACK)}, {}
+        ),
+        "health": lambda rng: ("health", "GET", "/health", None, {}),
+        "root": lambda rng: ("root", "GET", "/", None, {})
+    }
+
+def plan_requests(count: int, mix: Dict[str, float], seed: int) -> List[PlannedRequest]:
+    """Build the same request sequence for the same mix and seed.
+
+    Args:
+        count: Number of requests.
+        mix: Relative weight per route name.
+        seed: Random seed.
+
+    Returns:
+        The planned requests in sending order.
+    """
+    builders = _route_builders()
+    unknown = set(mix) - set(builders)
+    if unknown:
+        raise ValueError(f"Unknown routes in mix: {', '.join(sorted(unknown))}")
+
+    rng = random.Random(seed)
+    routes = [route for route, weight in mix.items() if weight > 0]
+    weights = [mix[route] for route in routes]
+    return [builders[route](rng) for route in rng.choices(routes, weights=weights, k=count)]
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class RouteStats:
+    """Latency and outcome samples for one route."""
+
+    def __init__(self):
+        """Initialize empty samples."""
+        self.latencies: List[float] = []
+        self.ttfb: List[float] = []
+        self.queue_waits: List[float] = []
+        self.status_codes: Dict[str, int] = {}
+        self.errors = 0
+        self.client_errors = 0
+
+    def record(self, status: Optional[int], latency: float, ttfb: Optional[float]) -> None:
+        """Record one request.
+
+        Args:
+            status: HTTP status, or None if the request failed in transport.
+            latency: Seconds until the full body was read.
+            ttfb: Seconds until the response headers arrived.
+        """
+        self.latencies.append(latency)
+        if ttfb is not None:
+            self.ttfb.append(ttfb)
+        code = str(status) if status is not None else "transport_error"
+        self.status_codes[code] = self.status_codes.get(code, 0) + 1
+        if status is None or status >= 500:
+            self.errors += 1
+        elif status >= 400:
+            self.client_errors += 1
+
+    def report(self, duration: float) -> Dict[str, Any]:
+        """Summarize the samples.
+
+        Args:
+            duration: Wall-clock length of the run in seconds.
+
+        Returns:
+            Counts, rates and latency percentiles in milliseconds.
+        """
+        latencies = sorted(self.latencies)
+        ttfb = sorted(self.ttfb)
+        count = len(latencies)
+        report = {
+            "requests": count,
+            "rps": count / duration if duration else 0.0,
+            "error_rate": self.errors / count if count else 0.0,
+            "client_error_rate": self.client_errors / count if count else 0.0,
+            "status_codes": self.status_codes,
+            "latency_ms": {
+                "mean": 1000 * sum(latencies) / count if count else 0.0,
+                "p50": 1000 * percentile(latencies, 50),
+                "p95": 1000 * percentile(latencies, 95),
+                "p99": 1000 * percentile(latencies, 99),
+                "max": 1000 * latencies[-1] if latencies else 0.0
+            },
+            "ttfb_ms": {
+                "p50": 1000 * percentile(ttfb, 50),
+                "p95": 1000 * percentile(ttfb, 95),
+                "p99": 1000 * percentile(ttfb, 99)
+            }
+        }
+        if self.queue_waits:
+            queue_waits = sorted(self.queue_waits)
+            report["job_queue_wait_ms"] = {
+                "p50": 1000 * percentile(queue_waits, 50),
+                "p95": 1000 * percentile(queue_waits, 95),
+                "p99": 1000 * percentile(queue_waits, 99)
+            }
+        return report
+
+
+async def _send(
+    client: httpx.AsyncClient,
+    planned: PlannedRequest,
+    stats: Dict[str, RouteStats],
+    scheduled_at: float,
+    etags: Optional[Dict[str, str]] = None
+) -> None:
+    """Send one request, read the whole body and record the outcome.
+
+    A 202 with a job is followed until the job finishes and recorded with
+    the status the synchronous call would have had. With etags, conditional
+    routes send the last ETag seen for their path as If-None-Match.
+    """
+    route, method, path, body, headers = planned
+    route_stats = stats.setdefault(route, RouteStats())
+    replay = etags is not None and route in CONDITIONAL_ROUTES
+    if replay and path in etags:
+        headers = {**headers, "If-None-Match": etags[path]}
+    status: Optional[int] = None
+    ttfb: Optional[float] = None
+    try:
+        async with client.stream(method, path, json=body, headers=headers) as response:
+            ttfb = time.perf_counter() - scheduled_at
+            status = response.status_code
+            content = await response.aread()
+        if replay and status == 200 and "etag" in response.headers:
+            etags[path] = response.headers["etag"]
+        if status == 202:
+            status = await _follow_job(client, json.loads(content)["status_url"], route_stats)
+    except (httpx.HTTPError, ValueError, KeyError):
+        status = None
+    route_stats.record(status, time.perf_counter() - scheduled_at, ttfb)
+
+async def _follow_job(client: httpx.AsyncClient, status_url: str, route_stats: RouteStats) -> Optional[int]:
+    """Long-poll a background job until it finishes.
+
+    Returns:
+        200 if the job succeeded, else the status code of its error.
+    """
+    while True:
+        response = await client.get(status_url, params={"wait": JOB_POLL_WAIT})
+        if response.status_code != 200:
+            return response.status_code
+        job = response.json()
+        if job["status"] in ("succeeded", "failed"):
+            break
+    if job.get("started_at") is not None:
+        route_stats.queue_waits.append(job["started_at"] - job["created_at"])
+    if job["status"] == "succeeded":
+        return 200
+    return (job.get("error") or {}).get("status_code", 500)
+
+async def run_closed_loop(
+    client: httpx.AsyncClient,
+    plan: List[PlannedRequest],
+    concurrency: int,
+    stats: Dict[str, RouteStats],
+    etags: Optional[Dict[str, str]] = None
+) -> None:
+    """Send the plan from a fixed number of workers, each waiting for its reply."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for planned in plan:
+        queue.put_nowait(planned)
+
+    async def worker():
+        while not queue.empty():
+            planned = queue.get_nowait()
+            await _send(client, planned, stats, time.perf_counter(), etags)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+async def run_open_loop(
+    client: httpx.AsyncClient,
+    plan: List[PlannedRequest],
+    rate: float,
+    seed: int,
+    stats: Dict[str, RouteStats],
+    etags: Optional[Dict[str, str]] = None
+) -> None:
+    """Send the plan on a seeded Poisson arrival schedule at the given rate."""
+    rng = random.Random(seed + 1)
+    start = time.perf_counter()
+    offset = 0.0
+    tasks = []
+    for planned in plan:
+        offset += rng.expovariate(rate)
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(_send(client, planned, stats, start + offset, etags)))
+    await asyncio.gather(*tasks)
+
+def _cache_hit_rates(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """Cache hit rate per token-usage endpoint between two snapshots."""
+    rates: Dict[str, Optional[float]] = {}
+    for endpoint, entry in after.items():
+        previous = before.get(endpoint, {})
+        cached = entry.get("cached_calls", 0) - previous.get("cached_calls", 0)
+        upstream = entry.get("calls", 0) - previous.get("calls", 0)
+        rates[endpoint] = cached / (cached + upstream) if cached + upstream else None
+    return rates
+
+def _git_commit() -> Optional[str]:
+    """Current git commit of the working tree, if available."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=current_dir, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the load test and build the report."""
+    mix = DEFAULT_MIX if not args.mix else {
+        route: float(weight) for route, weight in (item.split("=") for item in args.mix.split(","))
+    }
+    plan = plan_requests(args.requests, mix, args.seed)
+    stats: Dict[str, RouteStats] = {}
+    etags: Optional[Dict[str, str]] = {} if args.replay_etags else None
+
+    limits = httpx.Limits(max_connections=max(args.concurrency, 100), max_keepalive_connections=max(args.concurrency, 100))
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        if args.clear_cache:
+            await client.post("/api/admin/clear-cache")
+        if args.warmup:
+            await run_closed_loop(client, plan_requests(args.warmup, mix, args.seed + 2), args.concurrency, {}, etags)
+
+        usage_before = (await client.get("/api/admin/token-usage")).json()
+        upstream_before = (await client.get("/api/admin/upstream-stats")).json()
+
+        started_at = time.time()
+        start = time.perf_counter()
+        if args.rate:
+            await run_open_loop(client, plan, args.rate, args.seed, stats, etags)
+        else:
+            await run_closed_loop(client, plan, args.concurrency, stats, etags)
+        duration = time.perf_counter() - start
+
+        usage_after = (await client.get("/api/admin/token-usage")).json()
+        upstream_after = (await client.get("/api/admin/upstream-stats")).json()
+
+    cache_hit_rates = _cache_hit_rates(usage_before, usage_after)
+    routes = {}
+    for route, route_stats in sorted(stats.items()):
+        routes[route] = route_stats.report(duration)
+        if route in CACHE_ENDPOINTS:
+            routes[route]["cache_hit_rate"] = cache_hit_rates.get(CACHE_ENDPOINTS[route])
+        if route in CONDITIONAL_ROUTES:
+            count = len(route_stats.latencies)
+            routes[route]["not_modified_rate"] = route_stats.status_codes.get("304", 0) / count if count else 0.0
+
+    overall = RouteStats()
+    for route_stats in stats.values():
+        overall.latencies.extend(route_stats.latencies)
+        overall.ttfb.extend(route_stats.ttfb)
+        overall.errors += route_stats.errors
+        overall.client_errors += route_stats.client_errors
+        for code, count in route_stats.status_codes.items():
+            overall.status_codes[code] = overall.status_codes.get(code, 0) + count
+
+    return {
+        "config": {
+            "base_url": args.base_url,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "seed": args.seed,
+            "warmup": args.warmup,
+            "clear_cache": args.clear_cache,
+            "replay_etags": args.replay_etags,
+            "mix": mix
+        },
+        "git_commit": _git_commit(),
+        "started_at": started_at,
+        "duration_s": duration,
+        "overall": overall.report(duration),
+        "routes": routes,
+        "cache_hit_rate_by_endpoint": cache_hit_rates,
+        "upstream": {
+            "coalesced_calls": upstream_after["single_flight"]["coalesced_calls"] - upstream_before["single_flight"]["coalesced_calls"],
+            "limiter": upstream_after["limiter"],
+            "circuit_state": upstream_after["circuit_breaker"]["state"]
+        }
+    }
+
+def main() -> None:
+    """Parse arguments, run the load test and write the JSON report."""
+    parser = argparse.ArgumentParser(description="Load test every Elevate API route")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=1000, help="requests to send")
+    parser.add_argument("--concurrency", type=int, default=20, help="workers in closed-loop mode")
+    parser.add_argument("--rate", type=float, default=None, help="requests per second for open-loop mode")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mix", default=None, help="route weights, e.g. star_summary=5,health=1")
+    parser.add_argument("--warmup", type=int, default=0, help="requests sent before measuring")
+    parser.add_argument("--clear-cache", action="store_true", help="start from an empty response cache")
+    parser.add_argument("--replay-etags", action="store_true", help="send If-None-Match on conditional GET routes")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", default=None, help="write the report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
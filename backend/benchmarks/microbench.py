@@ -0,0 +1,339 @@
+# backend/benchmarks/microbench.py
+"""Micro-benchmarks for the pure-Python hot paths, with regression baselines.
+
+Times connection scoring, match reasons, learning material, document and job
+matching, response cache operations and prompt building over synthetic
+datasets of configurable size:
+
+    python benchmarks/microbench.py --sizes 1000,10000,100000 --save-baseline
+    python benchmarks/microbench.py --sizes 1000,10000,100000
+
+The first command stores the results as the baseline; later runs compare
+against it and exit with status 1 when a benchmark got slower than the
+threshold allows. A run with no baseline to compare against, or whose
+benchmarks are missing from it, exits with status 2 rather than passing
+unchecked. Baselines are machine-specific, so compare runs made on the same
+machine.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Benchmarks import the backend modules directly; give settings placeholder secrets
+os.environ.setdefault("DEEPSEEK_API_KEY", "sk-benchmark")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '..'))
+
+from cache import ResponseCache
+from matching import (
+    score_connections,
+    generate_match_reason,
+    match_learning_materials,
+    match_documents,
+    match_jobs,
+    rank_jobs
+)
+from prompts import build_star_messages, build_job_recommendation_messages
+
+DEFAULT_BASELINE_PATH = os.path.join(current_dir, "baselines.json")
+
+# Operations per timed call of the cache benchmarks
+CACHE_BATCH = 100
+
+SKILLS = [f"skill{i}" for i in range(300)] + [
+    "Python", "JavaScript", "React", "Kubernetes", "Docker", "AWS", "SQL",
+    "Machine Learning", "Data Analysis", "Project Management", "Leadership"
+]
+INTERESTS = [f"interest{i}" for i in range(100)] + ["Machine Learning", "Cloud", "Design"]
+WORDS = "the team shipped a new service to improve latency across regions with better tooling".split()
+
+
+def _profile(rng: random.Random, i: int) -> Dict[str, Any]:
+    """Synthetic user profile shaped like mock_data/user_profiles."""
+    return {
+        "user_id": f"user{i}",
+        "name": f"User {i}",
+        "role": "Engineer",
+        "department": rng.choice(["Engineering", "Product", "Data", "Design"]),
+        "experience": rng.randint(0, 20),
+        "skills": rng.sample(SKILLS, 6),
+        "interests": rng.sample(INTERESTS, 3),
+        "desired_skills": rng.sample(SKILLS, 3)
+    }
+
+def _job(rng: random.Random, i: int) -> Dict[str, Any]:
+    """Synthetic job posting shaped like mock_data/job_postings."""
+    return {
+        "job_id": f"job{i}",
+        "title": f"Engineer {i}",
+        "department": rng.choice(["Engineering", "Product", "Data", "Design"]),
+        "location": rng.choice(["Remote", "New York", "Berlin"]),
+        "requirements": [f"{rng.randint(2, 8)}+ years of {skill}" for skill in rng.sample(SKILLS, 4)],
+        "preferred_skills": rng.sample(SKILLS, 2),
+        "description": " ".join(rng.choices(WORDS, k=30)),
+        "salary_range": "$100,000 - $150,000",
+        "internal_only": rng.random() < 0.1
+    }
+
+def _document(rng: random.Random, i: int) -> Dict[str, Any]:
+    """Synthetic document shaped like mock_data/company_documentation."""
+    return {
+        "doc_id": f"doc{i}",
+        "title": f"Policy {i}",
+        "content_summary": " ".join(rng.choices(WORDS, k=20)),
+        "keywords": [f"topic{rng.randint(0, 5000)}" for _ in range(4)]
+    }
+
+def _material(rng: random.Random, i: int) -> Dict[str, Any]:
+    """Synthetic learning material shaped like mock_data/learning_materials_dataset."""
+    return {"material_id": f"mat{i}", "title": f"Course {i}", "skills": rng.sample(SKILLS, 3)}
+
+def _ticket(rng: random.Random, i: int) -> Dict[str, Any]:
+    """Synthetic completed ticket shaped like mock_data/jira_tickets."""
+    return {
+        "ticket_id": f"PROJ-{i}",
+        "title": f"Improve service {i}",
+        "description": " ".join(rng.choices(WORDS, k=60)),
+        "priority": "High",
+        "start_date": "2024-01-01",
+        "completion_date": "2024-02-01",
+        "comments": [
+            {"user": f"user{rng.randint(0, 99)}", "text": " ".join(rng.choices(WORDS, k=25))}
+            for _ in range(rng.randint(1, 40))
+        ]
+    }
+
+
+# Each benchmark takes (size, rng) and returns the function to time
+def bench_connection_scoring(size: int, rng: random.Random) -> Callable[[], Any]:
+    """Score one user against every profile."""
+    profiles = [_profile(rng, i) for i in range(size)]
+    return lambda: score_connections(profiles[0], profiles)
+
+def bench_match_reason(size: int, rng: random.Random) -> Callable[[], Any]:
+    """Build the match reason for every overlap triple."""
+    overlaps = [
+        (set(rng.sample(SKILLS, rng.randint(0, 3))),
+         set(rng.sample(INTERESTS, rng.randint(0, 2))),
+         set(rng.sample(SKILLS, rng.randint(0, 2))))
+        for _ in range(size)
+    ]
+    return lambda: [generate_match_reason(*overlap) for overlap in overlaps]
+
+def bench_learning_matching(size: int, rng: random.Random) -> Callable[[], Any]:
+    """Match desired skills against every learning material."""
+    materials = [_material(rng, i) for i in range(size)]
+    desired_skills = rng.sample(SKILLS, 3)
+    return lambda: match_learning_materials(desired_skills, materials)
+
+def bench_document_matching(size: int, rng: random.Random) -> Callable[[], Any]:
+    """Match a query against every document's keywords."""
+    documents = [_document(rng, i) for i in range(size)]
+    query = f"Where is the policy on topic{rng.randint(0, 5000)} and topic{rng.randint(0, 5000)}?"
+    return lambda: match_documents(query, documents)
+
+def bench_job_matching(size: int, rng: random.Random) -> Callable[[], Any]:
+    """Match and rank every job for one user."""
+    jobs = [_job(rng, i) for i in range(size)]
+    user = _profile(rng, 0)
+    return lambda: rank_jobs(user, match_jobs(user, jobs))
+
+def _payload(i: int, rng: random.Random) -> str:
+    """A serialized chat payload like the ones the client caches."""
+    return json.dumps({"messages": [{"role": "user", "content": f"request {i} {rng.random()}"}]}, sort_keys=True)
+
+def _filled_cache(size: int, rng: random.Random) -> Tuple[ResponseCache, List[str]]:
+    """A full cache of the given size and the payloads of its entries."""
+    cache = ResponseCache(ttl=3600, max_size=size)
+    payloads = [_payload(i, rng) for i in range(size)]
+    for payload in payloads:
+        cache.set(cache.make_key(payload, "star_summary@v2"), "response " * 50)
+    return cache, payloads
+
+def bench_cache_get(size: int, rng: random.Random) -> Callable[[], Any]:
+    """Key and look up CACHE_BATCH entries in a full cache."""
+    cache, payloads = _filled_cache(size, rng)
+    sample = rng.sample(payloads, min(CACHE_BATCH, size))
+    return lambda: [cache.get(cache.make_key(payload, "star_summary@v2")) for payload in sample]
+
+def bench_cache_set(size: int, rng: random.Random) -> Callable[[], Any]:
+    """Key and add CACHE_BATCH entries to a full cache."""
+    cache, _ = _filled_cache(size, rng)
+    counter = iter(range(10 ** 12))
+    def run():
+        # Every set into the full cache evicts an entry
+        for _ in range(CACHE_BATCH):
+            cache.set(cache.make_key(_payload(next(counter), rng), "star_summary@v2"), "response")
+    return run
+
+def bench_cache_stats(size: int, rng: random.Random) -> Callable[[], Any]:
+    """Compute the statistics of a full cache."""
+    cache, _ = _filled_cache(size, rng)
+    return cache.get_stats
+
+def bench_prompt_building(size: int, rng: random.Random) -> Callable[[], Any]:
+    """Build STAR prompts for up to 1000 tickets and one job prompt over every job."""
+    tickets = [_ticket(rng, i) for i in range(min(size, 1000))]
+    jobs = [_job(rng, i) for i in range(size)]
+    user = _profile(rng, 0)
+    def run():
+        for ticket in tickets:
+            build_star_messages(ticket)
+        build_job_recommendation_messages(user, jobs)
+    return run
+
+BENCHMARKS: Dict[str, Callable[[int, random.Random], Callable[[], Any]]] = {
+    "connection_scoring": bench_connection_scoring,
+    "match_reason": bench_match_reason,
+    "learning_matching": bench_learning_matching,
+    "document_matching": bench_document_matching,
+    "job_matching": bench_job_matching,
+    "cache_get": bench_cache_get,
+    "cache_set": bench_cache_set,
+    "cache_stats": bench_cache_stats,
+    "prompt_building": bench_prompt_building
+}
+
+
+def time_function(fn: Callable[[], Any], min_time: float, repeat: int) -> float:
+    """Best time of one call in seconds, timeit-style.
+
+    Calls are looped until a timing takes at least min_time, and the best of
+    `repeat` such timings is kept to filter out noise.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+def run_benchmarks(names: List[str], sizes: List[int], seed: int, min_time: float, repeat: int) -> Dict[str, float]:
+    """Run the benchmarks for every size.
+
+    Returns:
+        Seconds per call keyed by "name[size]".
+    """
+    results = {}
+    for name in names:
+        for size in sizes:
+            fn = BENCHMARKS[name](size, random.Random(seed))
+            key = f"{name}[{size}]"
+            results[key] = time_function(fn, min_time, repeat)
+            print(f"{key:<32} {results[key] * 1000:12.4f} ms", file=sys.stderr)
+    return results
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[Dict[str, Any]]:
+    """Compare results to a baseline.
+
+    Args:
+        results: Seconds per call of this run.
+        baseline: Seconds per call of the baseline run.
+        threshold: Allowed slowdown ratio, e.g. 1.25 for 25%.
+
+    Returns:
+        One entry per benchmark present in both, with its ratio and verdict.
+    """
+    comparison = []
+    for key, seconds in results.items():
+        if key not in baseline:
+            continue
+        ratio = seconds / baseline[key] if baseline[key] else float("inf")
+        comparison.append({
+            "benchmark": key,
+            "baseline_ms": baseline[key] * 1000,
+            "current_ms": seconds * 1000,
+            "ratio": ratio,
+            "regressed": ratio > threshold
+        })
+    return comparison
+
+def _load_baseline(path: str) -> Optional[Dict[str, float]]:
+    """Load stored baseline results, if any."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)["results"]
+
+def main() -> None:
+    """Run the suite, then store or check the baseline."""
+    parser = argparse.ArgumentParser(description="Micro-benchmark the pure-Python hot paths")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="dataset sizes, e.g. 1000,1000000")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per timing")
+    parser.add_argument("--repeat", type=int, default=5, help="timings per benchmark, best is kept")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio that fails the run")
+    parser.add_argument("--output", default=None, help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    names = [name for name in args.benchmarks.split(",") if name]
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    results = run_benchmarks(names, sizes, args.seed, args.min_time, args.repeat)
+    report: Dict[str, Any] = {"sizes": sizes, "seed": args.seed, "results": results}
+
+    regressed = False
+    unchecked = False
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"created_at": time.time(), "sizes": sizes, "seed": args.seed, "results": results}, f, indent=2)
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+    else:
+        baseline = _load_baseline(args.baseline)
+        if baseline is None:
+            print(
+                f"ERROR: no baseline at {args.baseline}, nothing was checked; "
+                "run with --save-baseline on the reference machine first",
+                file=sys.stderr
+            )
+            unchecked = True
+        else:
+            report["threshold"] = args.threshold
+            report["comparison"] = compare(results, baseline, args.threshold)
+            regressed = any(entry["regressed"] for entry in report["comparison"])
+            for entry in report["comparison"]:
+                if entry["regressed"]:
+                    print(f"REGRESSION {entry['benchmark']}: {entry['ratio']:.2f}x the baseline", file=sys.stderr)
+            missing = sorted(set(results) - set(baseline))
+            if missing:
+                print(
+                    f"ERROR: not in the baseline, so not checked: {', '.join(missing)}; "
+                    "refresh it with --save-baseline",
+                    file=sys.stderr
+                )
+                unchecked = True
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    sys.exit(1 if regressed else 2 if unchecked else 0)
+
+if __name__ == "__main__":
+    main()
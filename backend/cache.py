@@ -1,127 +1,1072 @@
 # backend/cache.py
+import asyncio
 import hashlib
+import heapq
 import json
+import sqlite3
 import time
-from typing import Dict, Any, Optional, Union
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
 import logging
 
+from config import settings
+
 logger = logging.getLogger("cache")
 
+class CachePolicy:
+    """How one call uses the response cache.
+
+    Policies are immutable values passed with each call, so one caller
+    skipping the cache never changes caching for anyone else.
+    """
+
+    def __init__(
+        self,
+        namespace: str = "default",
+        ttl: Optional[int] = None,
+        bypass_read: bool = False,
+        bypass_write: bool = False,
+        max_stale: float = 0.0
+    ):
+        """Initialize a cache policy.
+
+        Args:
+            namespace: Group the entries belong to, usually the endpoint.
+            ttl: Seconds entries stay fresh; the cache default if None.
+            bypass_read: Skip the lookup and always call upstream.
+            bypass_write: Don't store the response.
+            max_stale: Seconds past expiry an entry may still be served.
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.bypass_read = bypass_read
+        self.bypass_write = bypass_write
+        self.max_stale = max_stale
+
+    def replace(self, **changes: Any) -> "CachePolicy":
+        """Return a copy of this policy with some fields changed."""
+        return CachePolicy(**{**vars(self), **changes})
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in vars(self).items())
+        return f"CachePolicy({fields})"
+
+
+# Policy for calls that must neither read nor write the cache
+NO_CACHE = CachePolicy(namespace="none", bypass_read=True, bypass_write=True)
+
+# Per-endpoint defaults; AI_CACHE_POLICIES overrides individual fields
+DEFAULT_CACHE_POLICIES: Dict[str, Dict[str, Any]] = {
+    "star_summary": {"ttl": 7 * 24 * 3600, "max_stale": 24 * 3600},  # completed tickets rarely change
+    "documentation": {"ttl": 24 * 3600, "max_stale": 3600},
+    "job_recommendations": {"ttl": 6 * 3600, "max_stale": 3600},
+    "job_insights": {"ttl": 24 * 3600, "max_stale": 3600},
+    "skill_plan": {"ttl": 24 * 3600, "max_stale": 3600},
+    "mood_check": {"ttl": 600}  # generic encouragement only; personal feedback is never cached
+}
+
+def cache_policy_for(endpoint: Optional[str]) -> CachePolicy:
+    """Get the default cache policy of an endpoint.
+
+    Args:
+        endpoint: Endpoint name, e.g. 'star_summary'.
+
+    Returns:
+        The endpoint's policy, with settings overrides applied.
+    """
+    fields = dict(DEFAULT_CACHE_POLICIES.get(endpoint, {}))
+    if settings:
+        fields.update(settings.AI_CACHE_POLICIES.get(endpoint, {}))
+    return CachePolicy(namespace=endpoint or "default", **fields)
+
+
+class CacheScope:
+    """What a generated response depends on, for entity-based cache keys.
+
+    Keys built from a scope change exactly when the data a prompt uses
+    changes: editing an unrelated field of an entity or the wording of a
+    template version keeps them, a new comment on a ticket does not. The
+    entities and dependencies also tag the cached entry, so invalidating
+    one entity drops every response built from it.
+    """
+
+    def __init__(self, entities: List[str], data: Any = None, depends_on: Optional[List[str]] = None):
+        """Initialize a cache scope.
+
+        Args:
+            entities: References to the entities the response is about, as
+                'kind:id' strings, e.g. ['ticket:PROJ-101'].
+            data: The entity fields and request values the prompt is built
+                from; must be JSON serializable.
+            depends_on: Further entities the response is built from but not
+                keyed by, e.g. ['job:JOB-002'].
+        """
+        self.entities = entities
+        self.data = data
+        self.depends_on = depends_on or []
+
+    @property
+    def tags(self) -> Tuple[str, ...]:
+        """Dependency tags of the cached response: every entity it uses."""
+        return tuple(dict.fromkeys(self.entities + self.depends_on))
+
+
+def entity_fields(entity: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Pick the fields a prompt uses from an entity, for a CacheScope."""
+    return {field: entity.get(field) for field in fields}
+
+
+# Staleness of every cached response served while handling the current HTTP request
+_served_staleness: ContextVar[Optional[List[float]]] = ContextVar("served_staleness", default=None)
+
+def track_staleness() -> List[float]:
+    """Start collecting the staleness of cached responses served in this context.
+
+    Returns:
+        The list record_staleness appends to; it is shared with tasks
+        started from this context.
+    """
+    served: List[float] = []
+    _served_staleness.set(served)
+    return served
+
+def record_staleness(seconds: float) -> None:
+    """Note that a response was served this many seconds past its expiry."""
+    served = _served_staleness.get()
+    if served is not None:
+        served.append(seconds)
+
+
+def decode_value(value: Union[str, bytes]) -> str:
+    """Turn a stored cache value back into the response text."""
+    return zlib.decompress(value).decode("utf-8") if isinstance(value, bytes) else value
+
+
+class _CacheEntry:
+    """A cached response, when it expires and how long it may be served stale.
+
+    Large responses are held zlib-compressed as bytes, small ones as str.
+    """
+    __slots__ = (
+        "value", "expires_at", "stale_until", "namespace", "raw_size", "size", "tags",
+        "created_at", "cost", "hits"
+    )
+
+    def __init__(
+        self,
+        value: Union[str, bytes],
+        expires_at: float,
+        stale_until: float,
+        namespace: str,
+        raw_size: int,
+        size: int,
+        tags: Tuple[str, ...] = (),
+        cost: float = 0.0
+    ):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.namespace = namespace
+        self.raw_size = raw_size
+        self.size = size
+        self.tags = tags
+        self.created_at = time.time()
+        self.cost = cost  # upstream seconds it took to generate, saved by each hit
+        self.hits = 0
+
+    @property
+    def response(self) -> str:
+        """The cached response text, decompressed if needed."""
+        return decode_value(self.value)
+
+
+class _NamespaceStats:
+    """Running counters of one cache namespace."""
+    __slots__ = (
+        "entries", "raw_bytes", "stored_bytes", "hits", "misses", "evictions", "expirations",
+        "generated", "generation_time", "latency_saved"
+    )
+
+    def __init__(self):
+        self.entries = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.generated = 0
+        self.generation_time = 0.0
+        self.latency_saved = 0.0
+
+    @property
+    def avg_generation_time(self) -> float:
+        """Mean upstream seconds it took to generate a response."""
+        return self.generation_time / self.generated if self.generated else 0.0
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.entries,
+            "raw_bytes": self.raw_bytes,
+            "stored_bytes": self.stored_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "avg_generation_time": self.avg_generation_time,
+            "latency_saved_seconds": self.latency_saved
+        }
+
+
+class CacheBackend:
+    """Interface of a shared second-level (L2) store behind the in-memory cache.
+
+    Implementations are best effort: failures are logged and reported as
+    misses, never raised to the request path.
+    """
+
+    def get(self, key: str) -> Optional[Tuple[str, float, Tuple[str, ...]]]:
+        """Get a response, its expiry time and tags, or None if absent or expired."""
+        raise NotImplementedError
+
+    async def get_async(self, key: str) -> Optional[Tuple[str, float, Tuple[str, ...]]]:
+        """Like get, for callers on the event loop; override if get blocks."""
+        return self.get(key)
+
+    def set(self, key: str, response: str, expires_at: float, tags: Sequence[str] = ()) -> None:
+        """Store a response with its dependency tags until expires_at."""
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        """Remove every entry carrying any of the tags."""
+        raise NotImplementedError
+
+    def remove_prefix(self, prefix: str) -> None:
+        """Remove every entry whose key starts with prefix."""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Union[int, float, str]]:
+        """Get backend statistics."""
+        return {}
+
+    def close(self) -> None:
+        """Finish pending writes and release resources."""
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """L2 cache in a SQLite file in WAL mode, shared by every worker on a host.
+
+    WAL lets readers proceed while another process writes. Each process opens
+    its own connection, used only by a dedicated database thread so SQLite
+    never runs on the event loop: writes are handed to the thread and return
+    at once, and get_async awaits reads there. Running everything on one
+    thread keeps operations in submission order, so a read never sees an
+    entry an earlier invalidation removed. A short busy timeout bounds how
+    long a contended write holds up the thread; such writes are skipped.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 50, purge_every: int = 1000):
+        """Open or create the cache database.
+
+        Args:
+            path: SQLite database file.
+            busy_timeout_ms: How long to wait for another process's write lock.
+            purge_every: Delete expired rows after this many writes.
+        """
+        self.path = path
+        self.purge_every = purge_every
+        self._writes = 0
+        self._entries = 0
+        self.errors = 0
+
+        # Workers of a pool are joined at interpreter exit, so queued writes are not lost
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-l2")
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL, "
+            "tags TEXT NOT NULL DEFAULT '')"
+        )
+        # Files created before entries were tagged lack the column
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(response_cache)")]
+        if "tags" not in columns:
+            self._db.execute("ALTER TABLE response_cache ADD COLUMN tags TEXT NOT NULL DEFAULT ''")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache_tags ("
+            "tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key)) WITHOUT ROWID"
+        )
+        self._count()
+        logger.info(f"Opened SQLite L2 cache at {path}")
+
+    def get(self, key: str) -> Optional[Tuple[str, float, Tuple[str, ...]]]:
+        """Get an entry, blocking until the database thread has read it."""
+        return self._executor.submit(self._get, key).result()
+
+    async def get_async(self, key: str) -> Optional[Tuple[str, float, Tuple[str, ...]]]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._get, key)
+
+    def set(self, key: str, response: str, expires_at: float, tags: Sequence[str] = ()) -> None:
+        self._executor.submit(self._set, key, response, expires_at, tuple(tags))
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        self._executor.submit(self._invalidate_tags, list(tags))
+
+    def remove_prefix(self, prefix: str) -> None:
+        self._executor.submit(self._remove_prefix, prefix)
+
+    def clear(self) -> None:
+        self._executor.submit(self._clear)
+
+    def get_stats(self) -> Dict[str, Union[int, float, str]]:
+        """Get backend statistics.
+
+        The entry count is refreshed in the background, so it is the count as
+        of the previous call or the last purge of expired rows.
+        """
+        self._executor.submit(self._count)
+        return {"backend": "sqlite", "path": self.path, "entries": self._entries, "errors": self.errors}
+
+    def close(self) -> None:
+        """Wait for pending writes and close the database."""
+        self._executor.submit(self._db.close)
+        self._executor.shutdown(wait=True)
+
+    # The methods below run on the database thread
+
+    def _get(self, key: str) -> Optional[Tuple[str, float, Tuple[str, ...]]]:
+        try:
+            row = self._db.execute(
+                "SELECT response, expires_at, tags FROM response_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"L2 cache read failed: {str(e)}")
+            return None
+        return (row[0], row[1], tuple(row[2].split())) if row else None
+
+    def _set(self, key: str, response: str, expires_at: float, tags: Tuple[str, ...]) -> None:
+        try:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, response, expires_at, tags) VALUES (?, ?, ?, ?)",
+                    (key, response, expires_at, " ".join(tags))
+                )
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO response_cache_tags (tag, key) VALUES (?, ?)",
+                    [(tag, key) for tag in tags]
+                )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._db.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+                self._db.execute(
+                    "DELETE FROM response_cache_tags WHERE key NOT IN (SELECT key FROM response_cache)"
+                )
+                self._count()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"L2 cache write failed: {str(e)}")
+
+    def _invalidate_tags(self, tags: List[str]) -> None:
+        try:
+            with self._db:
+                self._db.execute("BEGIN")
+                for tag in tags:
+                    self._db.execute(
+                        "DELETE FROM response_cache WHERE key IN "
+                        "(SELECT key FROM response_cache_tags WHERE tag = ?)",
+                        (tag,)
+                    )
+                    self._db.execute("DELETE FROM response_cache_tags WHERE tag = ?", (tag,))
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"L2 cache invalidation failed: {str(e)}")
+
+    def _remove_prefix(self, prefix: str) -> None:
+        try:
+            # substr rather than LIKE, so '%' and '_' in keys match literally
+            self._db.execute(
+                "DELETE FROM response_cache WHERE substr(key, 1, ?) = ?",
+                (len(prefix), prefix)
+            )
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"L2 cache prefix removal failed: {str(e)}")
+
+    def _clear(self) -> None:
+        try:
+            self._db.execute("DELETE FROM response_cache")
+            self._db.execute("DELETE FROM response_cache_tags")
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"L2 cache clear failed: {str(e)}")
+
+    def _count(self) -> None:
+        try:
+            self._entries = self._db.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        except sqlite3.Error:
+            self._entries = -1
+
+
 class ResponseCache:
-    """Simple in-memory cache for API responses to improve performance and reduce costs."""
-    
-    def __init__(self, ttl: int = 3600, max_size: int = 100, enabled: bool = True):
+    """In-memory LRU cache with TTL for API responses to improve performance and reduce costs.
+
+    Entries live in an OrderedDict kept in least-recently-used order, so
+    lookups, inserts and evictions are O(1). The cache is bounded both by
+    entry count and by the bytes its keys and responses take; responses of
+    compress_min_bytes or more are stored zlib-compressed. Each call passes a CachePolicy
+    that sets the entry's namespace and TTL, whether to skip the lookup or
+    the store, and how stale an expired entry it accepts. Entries are kept
+    past expiry for the longest staleness their writer allowed, and a heap
+    of those times lets them be purged in amortized O(log n) without
+    scanning the whole cache. Statistics are kept as running counters.
+
+    With a backend the in-memory cache is the L1 in front of a shared L2:
+    L1 misses read through to the L2 and fill the L1, and every set writes
+    through to both, so workers share each other's responses. Code on the
+    event loop uses lookup_async, so an L2 read does not block it.
+    """
+
+    def __init__(
+        self,
+        ttl: int = 3600,
+        max_size: int = 100,
+        enabled: bool = True,
+        backend: Optional[CacheBackend] = None,
+        max_bytes: Optional[int] = None,
+        compress_min_bytes: Optional[int] = 1024,
+        compress_level: int = 6
+    ):
         """Initialize the response cache.
-        
+
         Args:
             ttl: Time-to-live in seconds for cache entries.
             max_size: Maximum number of entries in the cache.
             enabled: Whether caching is enabled.
+            backend: Optional shared L2 store.
+            max_bytes: Maximum stored bytes of keys and responses; None for
+                no byte bound.
+            compress_min_bytes: Compress responses of at least this many
+                bytes; None to never compress.
+            compress_level: zlib compression level.
         """
         self.ttl = ttl
         self.max_size = max_size
         self.enabled = enabled
-        self.cache: Dict[str, Dict[str, Any]] = {}
-        
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.compress_min_bytes = compress_min_bytes
+        self.compress_level = compress_level
+        self.cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, str]] = []
+
+        # Keys of the entries built from each entity, for invalidation
+        self._tag_index: Dict[str, Set[str]] = {}
+
+        # Running byte totals of the entries in the cache; stored_bytes, which
+        # the byte bound applies to, includes the keys and raw_bytes does not
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.key_bytes = 0
+        self.compressed_entries = 0
+
+        # Running counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.l2_hits = 0
+        self.stale_hits = 0
+        self.bypassed = 0
+        self.invalidations = 0
+        self.latency_saved = 0.0
+
+        # Per-namespace breakdown of the counters and byte totals
+        self._namespaces: Dict[str, _NamespaceStats] = {}
+
         logger.info(f"Initialized response cache (enabled={enabled}, ttl={ttl}s, max_size={max_size})")
-    
-    def _generate_key(self, data: Dict[str, Any]) -> str:
-        """Generate a cache key from request data.
-        
+
+    @staticmethod
+    def make_key(payload: str, prompt_version: Optional[str] = None) -> str:
+        """Generate a cache key from an already serialized request payload.
+
         Args:
-            data: Request data to generate key from.
-            
+            payload: Request payload serialized once by the caller (sorted keys).
+            prompt_version: Prompt template version the payload was built from.
+
         Returns:
             String key for the cache.
         """
-        # Sort the dictionary to ensure consistent keys
-        serialized = json.dumps(data, sort_keys=True)
-        return hashlib.md5(serialized.encode()).hexdigest()
-    
-    def get(self, request_data: Dict[str, Any]) -> Optional[str]:
+        digest = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+        return f"{prompt_version}:{digest}" if prompt_version else digest
+
+    @staticmethod
+    def make_entity_key(prompt_version: Optional[str], scope: CacheScope, params: Dict[str, Any]) -> str:
+        """Generate a cache key from the entities and data a response depends on.
+
+        Args:
+            prompt_version: Prompt template version, e.g. 'star_summary@v2'.
+            scope: Entities and the data used from them.
+            params: Generation parameters such as model and temperature.
+
+        Returns:
+            String key '<prompt_version>:<entities>:<hash of data and params>'.
+        """
+        content = json.dumps([scope.data, params], sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+        return f"{prompt_version or 'default'}:{','.join(scope.entities)}:{digest}"
+
+    def get(self, key: str, policy: Optional[CachePolicy] = None) -> Optional[str]:
         """Get a response from the cache.
-        
+
+        Args:
+            key: Cache key from make_key or make_entity_key.
+            policy: Cache policy of the call; fresh entries only if None.
+
+        Returns:
+            Cached response or None if not found, expired beyond the policy's
+            staleness tolerance, or the policy bypasses reads.
+        """
+        found = self.lookup(key, policy)
+        return found[0] if found is not None else None
+
+    def lookup(self, key: str, policy: Optional[CachePolicy] = None) -> Optional[Tuple[str, float]]:
+        """Get a response from the cache along with how stale it is.
+
         Args:
-            request_data: The request data to look up.
-            
+            key: Cache key from make_key or make_entity_key.
+            policy: Cache policy of the call; fresh entries only if None.
+
         Returns:
-            Cached response or None if not found or expired.
+            The response and the seconds it is past expiry (0 if fresh), or
+            None under the same conditions as get.
         """
-        if not self.enabled:
+        if not self._readable(policy):
             return None
-            
-        key = self._generate_key(request_data)
-        
-        if key in self.cache:
-            entry = self.cache[key]
-            current_time = time.time()
-            
-            # Check if entry is expired
-            if current_time - entry["timestamp"] <= self.ttl:
-                logger.debug(f"Cache hit for key: {key[:8]}...")
-                return entry["response"]
-            else:
-                # Remove expired entry
+        found = self._lookup_l1(key, policy)
+        if found is None and self.backend is not None:
+            return self._read_through(key, policy, self.backend.get(key))
+        if found is None:
+            self._miss(policy)
+        return found
+
+    async def lookup_async(self, key: str, policy: Optional[CachePolicy] = None) -> Optional[Tuple[str, float]]:
+        """Like lookup, but awaits an L2 read instead of blocking the event loop."""
+        if not self._readable(policy):
+            return None
+        found = self._lookup_l1(key, policy)
+        if found is None and self.backend is not None:
+            return self._read_through(key, policy, await self.backend.get_async(key))
+        if found is None:
+            self._miss(policy)
+        return found
+
+    def _readable(self, policy: Optional[CachePolicy]) -> bool:
+        """Whether a lookup under the policy reads the cache at all."""
+        if not self.enabled:
+            return False
+        if policy is not None and policy.bypass_read:
+            self.bypassed += 1
+            return False
+        return True
+
+    def _lookup_l1(self, key: str, policy: Optional[CachePolicy]) -> Optional[Tuple[str, float]]:
+        """Look a key up in the L1 only, as lookup does; misses are not counted."""
+        entry = self.cache.get(key)
+        now = time.time()
+
+        # Check if entry is expired
+        if entry is not None and entry.expires_at <= now:
+            max_stale = policy.max_stale if policy is not None else 0.0
+            if now - entry.expires_at < max_stale and now < entry.stale_until:
+                self._hit(key, entry)
+                self.stale_hits += 1
+                logger.debug(f"Stale cache hit for key: {key[:8]}...")
+                return entry.response, now - entry.expires_at
+            if now >= entry.stale_until:
                 logger.debug(f"Cache entry expired for key: {key[:8]}...")
-                del self.cache[key]
-                
-        return None
-    
-    def set(self, request_data: Dict[str, Any], response: str) -> None:
+                self._remove(key)
+                self.expirations += 1
+                self._namespace(entry.namespace).expirations += 1
+            entry = None
+
+        if entry is None:
+            return None
+
+        self._hit(key, entry)
+        logger.debug(f"Cache hit for key: {key[:8]}...")
+        return entry.response, 0.0
+
+    def set(
+        self,
+        key: str,
+        response: str,
+        policy: Optional[CachePolicy] = None,
+        tags: Sequence[str] = (),
+        latency: Optional[float] = None
+    ) -> None:
         """Store a response in the cache.
-        
+
         Args:
-            request_data: The request data to use as the key.
+            key: Cache key from make_key or make_entity_key.
             response: The response to cache.
+            policy: Cache policy of the call, for namespace, TTL and staleness.
+            tags: Entities the response was built from, e.g. 'ticket:PROJ-101';
+                invalidate_tags drops the entry when any of them changes.
+            latency: Seconds the upstream call took, counted as saved on each
+                hit; the namespace's average if None.
         """
         if not self.enabled:
             return
-            
-        key = self._generate_key(request_data)
-        
-        # If cache is full, remove oldest entry
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k]["timestamp"])
-            del self.cache[oldest_key]
-            logger.debug(f"Cache full, removed oldest entry: {oldest_key[:8]}...")
-        
-        self.cache[key] = {
-            "response": response,
-            "timestamp": time.time()
-        }
-        
+        policy = policy or CachePolicy()
+        if policy.bypass_write:
+            return
+
+        stats = self._namespace(policy.namespace)
+        if latency is not None:
+            stats.generated += 1
+            stats.generation_time += latency
+        expires_at = time.time() + (policy.ttl if policy.ttl is not None else self.ttl)
+        tags = tuple(tags)
+        self._store(
+            key, response, expires_at, expires_at + policy.max_stale, policy.namespace, tags,
+            latency if latency is not None else stats.avg_generation_time
+        )
+        if self.backend is not None:
+            self.backend.set(key, response, expires_at, tags)
+
         logger.debug(f"Added response to cache with key: {key[:8]}...")
-    
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Drop every entry built from any of the given entities.
+
+        Costs O(dependent entries), not O(cache size). The L2 is invalidated
+        too; other workers' L1 entries stay until they expire.
+
+        Args:
+            tags: Entity tags such as 'ticket:PROJ-101' or 'user:user123'.
+
+        Returns:
+            Number of L1 entries dropped.
+        """
+        tags = list(tags)
+        dropped = 0
+        for tag in tags:
+            for key in list(self._tag_index.get(tag, ())):
+                self._remove(key)
+                dropped += 1
+        if self.backend is not None:
+            self.backend.invalidate_tags(tags)
+
+        self.invalidations += dropped
+        logger.info(f"Invalidated {dropped} cache entries tagged {', '.join(tags)}")
+        return dropped
+
+    def has_fresh(self, tag: str, namespace: str) -> bool:
+        """Whether the L1 holds an unexpired entry of a namespace built from an entity.
+
+        Args:
+            tag: Entity tag, e.g. 'ticket:PROJ-101'.
+            namespace: Cache policy namespace, usually the endpoint name.
+        """
+        now = time.time()
+        return any(
+            self.cache[key].namespace == namespace and self.cache[key].expires_at > now
+            for key in self._tag_index.get(tag, ())
+        )
+
+    def _miss(self, policy: Optional[CachePolicy]) -> None:
+        """Count a lookup found in neither level."""
+        self.misses += 1
+        self._namespace(policy.namespace if policy is not None else "default").misses += 1
+
+    def _read_through(
+        self,
+        key: str,
+        policy: Optional[CachePolicy],
+        found: Optional[Tuple[str, float, Tuple[str, ...]]]
+    ) -> Optional[Tuple[str, float]]:
+        """Count the L2 result of an L1 miss and copy a hit into the L1."""
+        if found is None:
+            self._miss(policy)
+            return None
+
+        # The L2 keeps only fresh entries, without staleness or generation time
+        response, expires_at, tags = found
+        namespace = policy.namespace if policy is not None else "default"
+        stats = self._namespace(namespace)
+        cost = stats.avg_generation_time
+        self._store(key, response, expires_at, expires_at, namespace, tags, cost)
+        self.hits += 1
+        self.l2_hits += 1
+        self.latency_saved += cost
+        stats.hits += 1
+        stats.latency_saved += cost
+        logger.debug(f"L2 cache hit for key: {key[:8]}...")
+        return response, 0.0
+
+    def _hit(self, key: str, entry: _CacheEntry) -> None:
+        """Count a hit on an L1 entry and mark it most recently used."""
+        self.cache.move_to_end(key)
+        self.hits += 1
+        self.latency_saved += entry.cost
+        entry.hits += 1
+        stats = self._namespace(entry.namespace)
+        stats.hits += 1
+        stats.latency_saved += entry.cost
+
+    def _namespace(self, namespace: str) -> _NamespaceStats:
+        """Get the counters of a namespace, creating them on first use."""
+        stats = self._namespaces.get(namespace)
+        if stats is None:
+            stats = self._namespaces[namespace] = _NamespaceStats()
+        return stats
+
+    def _store(
+        self,
+        key: str,
+        response: str,
+        expires_at: float,
+        stale_until: float,
+        namespace: str,
+        tags: Tuple[str, ...] = (),
+        cost: float = 0.0
+    ) -> None:
+        """Put an entry into the L1, evicting as needed."""
+        entry = self._make_entry(key, response, expires_at, stale_until, namespace, tags, cost)
+        if self.max_bytes is not None and entry.size > self.max_bytes:
+            logger.debug(f"Response too large to cache ({entry.size} bytes): {key[:8]}...")
+            return
+
+        if key in self.cache:
+            self._remove(key)
+        self._add(key, entry)
+
+        # Make room: expired entries first, then the least recently used
+        if self._over_capacity():
+            self._purge_expired()
+            while self._over_capacity():
+                oldest_key, oldest = self.cache.popitem(last=False)
+                self._forget(oldest_key, oldest)
+                self.evictions += 1
+                self._namespace(oldest.namespace).evictions += 1
+                logger.debug(f"Cache full, removed least recently used entry: {oldest_key[:8]}...")
+
+    def _make_entry(
+        self,
+        key: str,
+        response: str,
+        expires_at: float,
+        stale_until: float,
+        namespace: str,
+        tags: Tuple[str, ...] = (),
+        cost: float = 0.0
+    ) -> _CacheEntry:
+        """Build an entry, compressing the response if that pays off."""
+        encoded = response.encode("utf-8")
+        value: Union[str, bytes] = response
+        stored_size = len(encoded)
+        if self.compress_min_bytes is not None and len(encoded) >= self.compress_min_bytes:
+            compressed = zlib.compress(encoded, self.compress_level)
+            if len(compressed) < len(encoded):
+                value, stored_size = compressed, len(compressed)
+        return _CacheEntry(
+            value, expires_at, stale_until, namespace, len(encoded), stored_size + len(key), tags, cost
+        )
+
+    def _over_capacity(self) -> bool:
+        """Whether the L1 holds more entries or bytes than allowed."""
+        return len(self.cache) > self.max_size or (
+            self.max_bytes is not None and self.stored_bytes > self.max_bytes
+        )
+
+    def _add(self, key: str, entry: _CacheEntry, oldest: bool = False) -> None:
+        """Add a new entry to the L1, its byte totals, tag index and expiry heap."""
+        self.cache[key] = entry
+        if oldest:
+            self.cache.move_to_end(key, last=False)
+        self.raw_bytes += entry.raw_size
+        self.stored_bytes += entry.size
+        self.key_bytes += len(key)
+        self.compressed_entries += isinstance(entry.value, bytes)
+        stats = self._namespace(entry.namespace)
+        stats.entries += 1
+        stats.raw_bytes += entry.raw_size
+        stats.stored_bytes += entry.size
+        for tag in entry.tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+        heapq.heappush(self._expiry_heap, (entry.stale_until, key))
+
+    def _remove(self, key: str) -> None:
+        """Drop an entry from the L1, if present."""
+        entry = self.cache.pop(key, None)
+        if entry is not None:
+            self._forget(key, entry)
+
+    def _forget(self, key: str, entry: _CacheEntry) -> None:
+        """Take an entry already popped from the L1 out of the totals and tag index."""
+        self.raw_bytes -= entry.raw_size
+        self.stored_bytes -= entry.size
+        self.key_bytes -= len(key)
+        self.compressed_entries -= isinstance(entry.value, bytes)
+        stats = self._namespace(entry.namespace)
+        stats.entries -= 1
+        stats.raw_bytes -= entry.raw_size
+        stats.stored_bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def _purge_expired(self) -> None:
+        """Drop every entry past its staleness window, oldest first."""
+        now = time.time()
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            stale_until, key = heapq.heappop(heap)
+            entry = self.cache.get(key)
+            # Skip heap items left behind by entries that were replaced or evicted
+            if entry is not None and entry.stale_until == stale_until:
+                self._remove(key)
+                self.expirations += 1
+                self._namespace(entry.namespace).expirations += 1
+
+        # Heap items of evicted entries linger until they expire; rebuild if they pile up
+        if len(heap) > 2 * len(self.cache) + 1024:
+            self._expiry_heap = [(entry.stale_until, key) for key, entry in self.cache.items()]
+            heapq.heapify(self._expiry_heap)
+
     def clear(self) -> None:
         """Clear all entries from the cache."""
         self.cache.clear()
+        self._expiry_heap.clear()
+        self._tag_index.clear()
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.key_bytes = 0
+        self.compressed_entries = 0
+        for stats in self._namespaces.values():
+            stats.entries = stats.raw_bytes = stats.stored_bytes = 0
+        if self.backend is not None:
+            self.backend.clear()
         logger.info("Cache cleared")
-    
+
+    def export_records(self) -> List[Tuple[str, Union[str, bytes], float, float, str, Tuple[str, ...]]]:
+        """List the L1 entries for a snapshot, least recently used first.
+
+        Values are returned as stored, so compressed responses are bytes;
+        decode them with decode_value, e.g. off the event loop.
+
+        Returns:
+            (key, value, expires_at, stale_until, namespace, tags) tuples.
+        """
+        return [
+            (key, entry.value, entry.expires_at, entry.stale_until, entry.namespace, entry.tags)
+            for key, entry in self.cache.items()
+        ]
+
+    def restore(self, records: Iterable[Tuple[str, str, float, float, str, Sequence[str]]]) -> int:
+        """Add snapshot entries behind the live ones without evicting anything.
+
+        Entries past their staleness window or already cached are skipped,
+        and restoring stops once the cache is full.
+
+        Args:
+            records: (key, response, expires_at, stale_until, namespace, tags)
+                tuples, most recently used first.
+
+        Returns:
+            Number of entries restored.
+        """
+        now = time.time()
+        restored = 0
+        for key, response, expires_at, stale_until, namespace, tags in records:
+            if stale_until <= now or key in self.cache:
+                continue
+            entry = self._make_entry(
+                key, response, expires_at, stale_until, namespace, tuple(tags),
+                self._namespace(namespace).avg_generation_time
+            )
+            if len(self.cache) >= self.max_size or (
+                self.max_bytes is not None and self.stored_bytes + entry.size > self.max_bytes
+            ):
+                break
+
+            # Restored entries are older than anything cached since startup
+            self._add(key, entry, oldest=True)
+            restored += 1
+        return restored
+
+    def top_entries(self, order: str = "hottest", limit: int = 20) -> List[Dict[str, Any]]:
+        """List the L1 entries with the most hits or the most bytes.
+
+        Args:
+            order: 'hottest' to rank by hits, 'largest' by stored bytes.
+            limit: Number of entries to return.
+
+        Returns:
+            Entry descriptions as returned by describe, without responses.
+
+        Raises:
+            ValueError: If order is not 'hottest' or 'largest'.
+        """
+        if order == "hottest":
+            rank = lambda item: item[1].hits
+        elif order == "largest":
+            rank = lambda item: item[1].size
+        else:
+            raise ValueError(f"Unknown order: {order}")
+        now = time.time()
+        return [
+            self._describe(key, entry, now)
+            for key, entry in heapq.nlargest(limit, self.cache.items(), key=rank)
+        ]
+
+    def describe(self, key: str, include_response: bool = False) -> Optional[Dict[str, Any]]:
+        """Describe one L1 entry without counting a hit or changing its recency.
+
+        Args:
+            key: Cache key.
+            include_response: Whether to include the cached response text.
+
+        Returns:
+            Entry metadata, or None if the key is not in the L1.
+        """
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        description = self._describe(key, entry, time.time())
+        if include_response:
+            description["response"] = entry.response
+        return description
+
+    def _describe(self, key: str, entry: _CacheEntry, now: float) -> Dict[str, Any]:
+        """Build the metadata of an entry for the admin endpoints."""
+        return {
+            "key": key,
+            "namespace": entry.namespace,
+            "hits": entry.hits,
+            "age": now - entry.created_at,
+            "ttl_remaining": entry.expires_at - now,
+            "stale": entry.expires_at <= now,
+            "raw_bytes": entry.raw_size,
+            "stored_bytes": entry.size,
+            "compressed": isinstance(entry.value, bytes),
+            "generation_time": entry.cost,
+            "latency_saved_seconds": entry.hits * entry.cost,
+            "tags": list(entry.tags)
+        }
+
+    def clear_namespace(self, namespace: str) -> int:
+        """Drop every entry of one namespace, e.g. after changing its prompt.
+
+        Scans the whole L1. In the L2, which keeps no namespace, entries are
+        matched by their '<namespace>@' prompt version key prefix.
+
+        Args:
+            namespace: Cache policy namespace, usually the endpoint name.
+
+        Returns:
+            Number of L1 entries dropped.
+        """
+        keys = [key for key, entry in self.cache.items() if entry.namespace == namespace]
+        for key in keys:
+            self._remove(key)
+        if self.backend is not None:
+            self.backend.remove_prefix(f"{namespace}@")
+
+        logger.info(f"Cleared {len(keys)} cache entries in namespace {namespace}")
+        return len(keys)
+
+    def clear_prefix(self, prefix: str) -> int:
+        """Drop every entry whose key starts with prefix, e.g. 'star_summary@v2:PROJ-101'.
+
+        Scans the whole L1; the L2 is cleared by the same prefix.
+
+        Args:
+            prefix: Key prefix; must not be empty, use clear for everything.
+
+        Returns:
+            Number of L1 entries dropped.
+
+        Raises:
+            ValueError: If prefix is empty.
+        """
+        if not prefix:
+            raise ValueError("Key prefix must not be empty")
+        keys = [key for key in self.cache if key.startswith(prefix)]
+        for key in keys:
+            self._remove(key)
+        if self.backend is not None:
+            self.backend.remove_prefix(prefix)
+
+        logger.info(f"Cleared {len(keys)} cache entries with key prefix {prefix}")
+        return len(keys)
+
     def get_stats(self) -> Dict[str, Union[int, float]]:
         """Get cache statistics.
-        
+
         Returns:
             Dictionary with cache statistics.
         """
-        current_time = time.time()
-        active_entries = sum(1 for entry in self.cache.values() 
-                             if current_time - entry["timestamp"] <= self.ttl)
-        
+        self._purge_expired()
+        lookups = self.hits + self.misses
+
+        # Entries past expiry but inside their staleness window are still held
+        now = time.time()
+        stored_payload = self.stored_bytes - self.key_bytes
+        expired = sum(1 for entry in self.cache.values() if entry.expires_at <= now)
+
         return {
             "total_entries": len(self.cache),
-            "active_entries": active_entries,
-            "expired_entries": len(self.cache) - active_entries,
+            "active_entries": len(self.cache) - expired,
+            "expired_entries": expired,
             "max_size": self.max_size,
             "ttl": self.ttl,
-            "enabled": self.enabled
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "l2_hits": self.l2_hits,
+            "stale_hits": self.stale_hits,
+            "bypassed": self.bypassed,
+            "invalidations": self.invalidations,
+            "tags": len(self._tag_index),
+            "max_bytes": self.max_bytes,
+            "raw_bytes": self.raw_bytes,
+            "stored_bytes": self.stored_bytes,
+            "compressed_entries": self.compressed_entries,
+            "compression_ratio": self.raw_bytes / stored_payload if stored_payload else 1.0,
+            "latency_saved_seconds": self.latency_saved,
+            "namespaces": {namespace: stats.as_dict() for namespace, stats in self._namespaces.items()},
+            "l2": self.backend.get_stats() if self.backend is not None else None
         }
 
 
-# Create a global cache instance
-from config import settings
-
-# Initialize cache with settings
+# Create a global cache instance, initialized with settings
 response_cache = ResponseCache(
     ttl=settings.AI_RESPONSE_CACHE_TTL if settings else 3600,
-    enabled=settings.AI_RESPONSE_CACHE_ENABLED if settings else False
-)
\ No newline at end of file
+    max_size=settings.AI_RESPONSE_CACHE_MAX_SIZE if settings else 100,
+    enabled=settings.AI_RESPONSE_CACHE_ENABLED if settings else False,
+    backend=SQLiteCacheBackend(settings.AI_RESPONSE_CACHE_L2_PATH)
+    if settings and settings.AI_RESPONSE_CACHE_L2_PATH else None,
+    max_bytes=settings.AI_RESPONSE_CACHE_MAX_BYTES if settings else None,
+    compress_min_bytes=settings.AI_RESPONSE_CACHE_COMPRESS_MIN_BYTES if settings else 1024
+)
@@ -0,0 +1,210 @@
+# backend/cache_snapshot.py
+import asyncio
+import json
+import os
+import tempfile
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from cache import ResponseCache, decode_value, response_cache
+
+logger = logging.getLogger("cache_snapshot")
+
+# Bump when the snapshot layout changes; other versions are ignored
+SNAPSHOT_VERSION = 2
+
+# Entries restored per event loop turn
+RESTORE_BATCH_SIZE = 500
+
+Record = Tuple[str, Any, float, float, str, Any]
+
+def write_snapshot(path: str, records: List[Record]) -> int:
+    """Write cache records to a zlib-compressed JSON snapshot file.
+
+    The file is replaced atomically, so a crash mid-write keeps the previous
+    snapshot. Safe to call from a worker thread.
+
+    Args:
+        path: Snapshot file.
+        records: Records from ResponseCache.export_records.
+
+    Returns:
+        Size of the snapshot in bytes.
+    """
+    data = json.dumps(
+        {
+            "version": SNAPSHOT_VERSION,
+            "written_at": time.time(),
+            "entries": [
+                [key, decode_value(value), expires_at, stale_until, namespace, list(tags)]
+                for key, value, expires_at, stale_until, namespace, tags in records
+            ]
+        },
+        separators=(",", ":")
+    )
+    blob = zlib.compress(data.encode("utf-8"))
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(blob)
+
+def read_snapshot(path: str) -> List[Record]:
+    """Read a snapshot, dropping entries past their staleness window.
+
+    Safe to call from a worker thread.
+
+    Args:
+        path: Snapshot file.
+
+    Returns:
+        Records, most recently used first; empty if there is no usable snapshot.
+    """
+    try:
+        with open(path, "rb") as f:
+            snapshot = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError, zlib.error) as e:
+        logger.warning(f"Ignoring unreadable cache snapshot {path}: {str(e)}")
+        return []
+
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.warning(f"Ignoring cache snapshot {path} with version {snapshot.get('version')}")
+        return []
+
+    now = time.time()
+    return [tuple(entry) for entry in reversed(snapshot["entries"]) if entry[3] > now]
+
+
+class CacheSnapshotter:
+    """Snapshots a response cache to disk so restarted processes start warm.
+
+    The snapshot is written periodically and on shutdown, and restored in the
+    background at startup. Serialization and file I/O run in a worker thread;
+    restored entries are added in small batches so requests are served while
+    the restore is still running.
+    """
+
+    def __init__(self, cache: ResponseCache, path: Optional[str], interval: float = 300.0):
+        """Initialize the snapshotter.
+
+        Args:
+            cache: Cache to snapshot.
+            path: Snapshot file; snapshots are disabled if None.
+            interval: Seconds between periodic snapshots.
+        """
+        self.cache = cache
+        self.path = path
+        self.interval = interval
+        self._restore_task: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.snapshots = 0
+        self.failures = 0
+        self.restored = 0
+        self.last_snapshot: Optional[float] = None
+        self.last_snapshot_bytes = 0
+
+    def start(self) -> None:
+        """Restore the last snapshot and start periodic snapshots, in the background."""
+        if self.path is None or self._loop_task is not None:
+            return
+        self._restore_task = asyncio.ensure_future(self._restore())
+        self._loop_task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        """Stop the background tasks and write a final snapshot."""
+        tasks = [task for task in (self._restore_task, self._loop_task) if task is not None]
+        if not tasks:
+            return
+        await self.snapshot()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._restore_task = self._loop_task = None
+
+    @property
+    def restoring(self) -> bool:
+        """Whether the startup restore is still running."""
+        return self._restore_task is not None and not self._restore_task.done()
+
+    async def snapshot(self) -> None:
+        """Write the cache contents to the snapshot file.
+
+        Skipped while the startup restore runs, so a process stopped early
+        keeps the previous, fuller snapshot.
+        """
+        if self.path is None or not self.cache.enabled:
+            return
+        if self.restoring:
+            logger.info("Cache restore still running, keeping the previous snapshot")
+            return
+        records = self.cache.export_records()
+        started = time.time()
+        try:
+            size = await asyncio.get_running_loop().run_in_executor(None, write_snapshot, self.path, records)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Cache snapshot to {self.path} failed: {str(e)}")
+            return
+
+        self.snapshots += 1
+        self.last_snapshot = time.time()
+        self.last_snapshot_bytes = size
+        logger.info(
+            f"Wrote cache snapshot of {len(records)} entries ({size} bytes) "
+            f"in {self.last_snapshot - started:.2f}s"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get snapshot statistics.
+
+        Returns:
+            Dictionary with the snapshot path, counters and restore progress.
+        """
+        return {
+            "path": self.path,
+            "interval": self.interval,
+            "snapshots": self.snapshots,
+            "failures": self.failures,
+            "last_snapshot": self.last_snapshot,
+            "last_snapshot_bytes": self.last_snapshot_bytes,
+            "restored": self.restored,
+            "restoring": self.restoring
+        }
+
+    async def _restore(self) -> None:
+        """Load the snapshot into the cache a batch at a time."""
+        if not self.cache.enabled:
+            return
+        records = await asyncio.get_running_loop().run_in_executor(None, read_snapshot, self.path)
+        for start in range(0, len(records), RESTORE_BATCH_SIZE):
+            self.restored += self.cache.restore(records[start:start + RESTORE_BATCH_SIZE])
+            await asyncio.sleep(0)
+        logger.info(f"Restored {self.restored} of {len(records)} unexpired entries from cache snapshot {self.path}")
+
+    async def _loop(self) -> None:
+        """Write a snapshot every interval seconds."""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.snapshot()
+
+
+# Create a global cache snapshotter
+from config import settings
+
+# Initialize the snapshotter with settings
+cache_snapshotter = CacheSnapshotter(
+    response_cache,
+    path=settings.AI_RESPONSE_CACHE_SNAPSHOT_PATH if settings else None,
+    interval=settings.AI_RESPONSE_CACHE_SNAPSHOT_INTERVAL if settings else 300.0
+)
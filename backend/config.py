@@ -1,7 +1,7 @@
 # backend/config.py
 import os
 from pydantic import BaseSettings, validator
-from typing import Optional
+from typing import Any, Optional, Dict
 import logging
 
 # Configure logging
@@ -25,11 +25,68 @@ class Settings(BaseSettings):
     DEEPSEEK_MODEL: str = "deepseek-chat"
     DEEPSEEK_REQUEST_TIMEOUT: int = 30
     DEEPSEEK_MAX_RETRIES: int = 3
+    DEEPSEEK_MAX_CONNECTIONS: int = 200
+    DEEPSEEK_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    DEEPSEEK_KEEPALIVE_EXPIRY: float = 30.0  # seconds an idle connection is kept open
+    
+    # Adaptive upstream concurrency limit (AIMD)
+    DEEPSEEK_CONCURRENCY_INITIAL_LIMIT: int = 20
+    DEEPSEEK_CONCURRENCY_MIN_LIMIT: int = 1
+    DEEPSEEK_CONCURRENCY_MAX_LIMIT: int = 200
+    DEEPSEEK_CONCURRENCY_LATENCY_TOLERANCE: float = 2.0  # short/baseline latency ratio that triggers a decrease
+    
+    # Circuit breaker for DeepSeek outages
+    DEEPSEEK_CIRCUIT_FAILURE_THRESHOLD: float = 0.5  # error rate that opens the circuit
+    DEEPSEEK_CIRCUIT_MIN_CALLS: int = 10  # calls in the window before the error rate counts
+    DEEPSEEK_CIRCUIT_WINDOW: float = 30.0  # rolling window in seconds
+    DEEPSEEK_CIRCUIT_OPEN_DURATION: float = 30.0  # seconds before probing a tripped circuit
+    DEEPSEEK_CIRCUIT_HALF_OPEN_CALLS: int = 1  # probe calls allowed while half-open
+    
+    # Retry budget: retries allowed as a share of first attempts, process-wide
+    DEEPSEEK_RETRY_BUDGET_RATIO: float = 0.1
+    DEEPSEEK_RETRY_BUDGET_MIN_PER_SECOND: float = 1.0
+    DEEPSEEK_MIN_ATTEMPT_TIME: float = 1.0  # don't start an attempt with less budget left (seconds)
+    
+    # Total latency budget per AI endpoint call, including retries and backoff
+    AI_LATENCY_BUDGET: float = 25.0  # seconds, keep below the proxy timeout
+    AI_ENDPOINT_LATENCY_BUDGETS: Dict[str, float] = {}  # per-endpoint overrides, e.g. {"star_summary": 40}
+    
+    # Token budget for the per-request context (tickets, jobs, docs) put into a prompt
+    AI_PROMPT_TOKEN_BUDGET: int = 2000
+    AI_ENDPOINT_PROMPT_TOKEN_BUDGETS: Dict[str, int] = {}  # per-endpoint overrides
+    
+    # Bulk STAR summary generation
+    STAR_BULK_CONCURRENCY: int = 8  # summaries generated at the same time per request
+    STAR_BULK_MAX_TICKETS: int = 200
+    
+    # HTTP caching of responses computed deterministically from the datasets
+    HTTP_CACHE_MAX_AGE: int = 60  # seconds clients reuse a response before revalidating with its ETag
+    
+    # Background job queue for "Prefer: respond-async" requests
+    AI_JOBS_WORKERS: int = 4  # jobs run at the same time
+    AI_JOBS_RESULT_TTL: int = 3600  # seconds finished jobs are kept
+    AI_JOBS_MAX_WAIT: float = 30.0  # longest long-poll on a job, in seconds
+    AI_JOBS_LATENCY_BUDGET: float = 120.0  # latency budget of a background generation
+    AI_JOBS_DB_PATH: Optional[str] = None  # SQLite file to make the queue durable
+    
+    # Off-peak pre-generation of STAR summaries and job recommendations into the cache
+    AI_PREWARM_ENABLED: bool = False
+    AI_PREWARM_INTERVAL: float = 600.0  # seconds between runs inside the window
+    AI_PREWARM_CONCURRENCY: int = 2  # generations at the same time, leaving room for users
+    AI_PREWARM_START_HOUR: int = 1  # local off-peak window, may wrap past midnight
+    AI_PREWARM_END_HOUR: int = 6
     
     # API request configuration
     AI_REQUEST_LOGGING: bool = True
     AI_RESPONSE_CACHE_ENABLED: bool = True
     AI_RESPONSE_CACHE_TTL: int = 3600  # 1 hour in seconds
+    AI_RESPONSE_CACHE_MAX_SIZE: int = 10000  # entries per worker process
+    AI_RESPONSE_CACHE_MAX_BYTES: Optional[int] = 64 * 1024 * 1024  # memory budget per worker process; None for no limit
+    AI_RESPONSE_CACHE_COMPRESS_MIN_BYTES: Optional[int] = 1024  # zlib-compress responses at least this large
+    AI_RESPONSE_CACHE_SNAPSHOT_PATH: Optional[str] = None  # file the cache is saved to and restored from across restarts
+    AI_RESPONSE_CACHE_SNAPSHOT_INTERVAL: float = 300.0  # seconds between periodic snapshots
+    AI_RESPONSE_CACHE_L2_PATH: Optional[str] = None  # SQLite file shared by all workers on a host
+    AI_CACHE_POLICIES: Dict[str, Dict[str, Any]] = {}  # per-endpoint overrides, e.g. {"mood_check": {"ttl": 300}}
     
     # Database settings
     DATABASE_URL: str = "sqlite:///./elevate.db"
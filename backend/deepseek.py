@@ -1,19 +1,75 @@
 # backend/deepseek.py
 import os
 import time
+import asyncio
 import logging
-import requests
+import httpx
 import json
-from typing import Dict, Any, Optional, List, Union
-from requests.exceptions import RequestException, Timeout, ConnectionError
+from typing import Dict, Any, Optional, List, Sequence, Union, AsyncIterator
 
 # Import configuration and cache
 from config import settings
-from cache import response_cache
+from cache import (
+    CachePolicy,
+    CacheScope,
+    NO_CACHE,
+    cache_policy_for,
+    entity_fields,
+    record_staleness,
+    response_cache
+)
+from tokens import (
+    token_usage,
+    estimate_message_tokens,
+    estimate_tokens,
+    compact_whitespace,
+    truncate_to_tokens,
+    fit_items,
+    prompt_token_budget
+)
+
+# Share of a prompt's context budget a user profile may take, leaving the rest for jobs
+PROFILE_BUDGET_SHARE = 0.5
+from prompts import prompt_registry, job_recommendation_cache_scope
+from resilience import (
+    SingleFlight,
+    AdaptiveLimiter,
+    LIMIT_SUCCESS,
+    LIMIT_DROPPED,
+    LIMIT_IGNORED,
+    CircuitBreaker,
+    Deadline,
+    RetryBudget
+)
 
 # Set up logging
 logger = logging.getLogger("deepseek")
 
+# Size of the pieces a cached or canned response is replayed in when streaming
+STREAM_REPLAY_CHUNK_SIZE = 64
+
+async def replay_chunks(text: str, chunk_size: int = STREAM_REPLAY_CHUNK_SIZE) -> AsyncIterator[str]:
+    """Replay a complete text as a stream of chunks."""
+    for i in range(0, len(text), chunk_size):
+        yield text[i:i + chunk_size]
+
+def resolve_cache_policy(
+    use_cache: bool,
+    cache_policy: Optional[CachePolicy],
+    endpoint_name: Optional[str]
+) -> CachePolicy:
+    """Pick the cache policy of a call; use_cache=False always wins."""
+    if not use_cache:
+        return NO_CACHE
+    return cache_policy or cache_policy_for(endpoint_name)
+
+def make_cache_key(data: Dict, prompt_version: Optional[str], cache_scope: Optional[CacheScope]) -> str:
+    """Key a request by its scope and generation parameters, or by its whole payload."""
+    if cache_scope is None:
+        return response_cache.make_key(json.dumps(data, sort_keys=True), prompt_version)
+    params = {name: value for name, value in data.items() if name != "messages"}
+    return response_cache.make_entity_key(prompt_version, cache_scope, params)
+
 class DeepSeekAPIError(Exception):
     """Custom exception for DeepSeek API errors"""
     def __init__(self, message: str, status_code: Optional[int] = None, response: Optional[Dict] = None):
@@ -23,6 +79,19 @@ class DeepSeekAPIError(Exception):
         super().__init__(self.message)
 
 
+class DeepSeekUnavailableError(DeepSeekAPIError):
+    """Raised without contacting DeepSeek while its circuit breaker is open"""
+    def __init__(self, message: str, retry_after: float = 0.0):
+        self.retry_after = retry_after
+        super().__init__(message, status_code=503)
+
+
+class DeepSeekDeadlineError(DeepSeekAPIError):
+    """Raised when a request's latency budget runs out before DeepSeek answers"""
+    def __init__(self, message: str):
+        super().__init__(message, status_code=504)
+
+
 class DeepSeek:
     """Client for interacting with the DeepSeek API"""
     
@@ -55,17 +124,81 @@ class DeepSeek:
             self.default_timeout = settings.DEEPSEEK_REQUEST_TIMEOUT
             self.max_retries = settings.DEEPSEEK_MAX_RETRIES
             self.request_logging = settings.AI_REQUEST_LOGGING
+            max_connections = settings.DEEPSEEK_MAX_CONNECTIONS
+            max_keepalive = settings.DEEPSEEK_MAX_KEEPALIVE_CONNECTIONS
+            keepalive_expiry = settings.DEEPSEEK_KEEPALIVE_EXPIRY
+            limiter = AdaptiveLimiter(
+                initial_limit=settings.DEEPSEEK_CONCURRENCY_INITIAL_LIMIT,
+                min_limit=settings.DEEPSEEK_CONCURRENCY_MIN_LIMIT,
+                max_limit=settings.DEEPSEEK_CONCURRENCY_MAX_LIMIT,
+                latency_tolerance=settings.DEEPSEEK_CONCURRENCY_LATENCY_TOLERANCE
+            )
+            breaker = CircuitBreaker(
+                failure_threshold=settings.DEEPSEEK_CIRCUIT_FAILURE_THRESHOLD,
+                min_calls=settings.DEEPSEEK_CIRCUIT_MIN_CALLS,
+                window=settings.DEEPSEEK_CIRCUIT_WINDOW,
+                open_duration=settings.DEEPSEEK_CIRCUIT_OPEN_DURATION,
+                half_open_max_calls=settings.DEEPSEEK_CIRCUIT_HALF_OPEN_CALLS
+            )
+            retry_budget = RetryBudget(
+                ratio=settings.DEEPSEEK_RETRY_BUDGET_RATIO,
+                min_retries_per_second=settings.DEEPSEEK_RETRY_BUDGET_MIN_PER_SECOND
+            )
+            self.min_attempt_time = settings.DEEPSEEK_MIN_ATTEMPT_TIME
         else:
             self.base_url = "https://api.deepseek.com/v1"
             self.default_model = "deepseek-chat"
             self.default_timeout = 30
             self.max_retries = 3
             self.request_logging = True
+            max_connections = 200
+            max_keepalive = 50
+            keepalive_expiry = 30.0
+            limiter = AdaptiveLimiter()
+            breaker = CircuitBreaker()
+            retry_budget = RetryBudget()
+            self.min_attempt_time = 1.0
         
         self.chat_endpoint = f"{self.base_url}/chat/completions"
         
+        # Identical cacheable requests in flight at the same time share one upstream call
+        self._single_flight = SingleFlight()
+        
+        # Background refreshes of stale cache entries, at most one per key
+        self._revalidations: Dict[str, asyncio.Task] = {}
+        self.revalidated = 0
+        self.revalidation_failures = 0
+        
+        # Client-wide cap on concurrent upstream calls that adapts to 429s and latency
+        self._limiter = limiter
+        
+        # Fails calls instantly while DeepSeek is having an outage
+        self._breaker = breaker
+        
+        # Shared by every caller so retries stay a bounded share of traffic
+        self._retry_budget = retry_budget
+        
+        # One pooled HTTP client for the lifetime of this DeepSeek instance so
+        # TCP/TLS connections are reused across requests
+        self._http = httpx.AsyncClient(
+            headers=self._prepare_headers(),
+            timeout=httpx.Timeout(self.default_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry
+            )
+        )
+        
         logger.info("DeepSeek client initialized successfully")
     
+    async def aclose(self) -> None:
+        """Cancel background refreshes and close the underlying HTTP connection pool."""
+        for task in list(self._revalidations.values()):
+            task.cancel()
+        await self._http.aclose()
+        logger.info("DeepSeek client closed")
+    
     def _prepare_headers(self) -> Dict[str, str]:
         """Prepare HTTP headers for API requests.
         
@@ -78,11 +211,11 @@ class DeepSeek:
             "User-Agent": f"ElevateCareerCoach/1.0"
         }
     
-    def _handle_response(self, response: requests.Response) -> Dict:
+    def _handle_response(self, response: httpx.Response) -> Dict:
         """Handle and parse API response.
         
         Args:
-            response: Response object from requests.
+            response: Response object from httpx.
             
         Returns:
             Parsed response data.
@@ -110,42 +243,67 @@ class DeepSeek:
                 status_code=response.status_code
             )
     
-    def _make_request_with_retry(
+    async def _make_request_with_retry(
         self, 
         url: str, 
         data: Dict, 
         max_retries: Optional[int] = None, 
         base_delay: float = 1.0,
-        timeout: Optional[int] = None
-    ) -> Dict:
+        timeout: Optional[int] = None,
+        use_cache: bool = True,
+        stream: bool = False,
+        deadline: Optional[Deadline] = None,
+        endpoint_name: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+        cache_policy: Optional[CachePolicy] = None,
+        cache_scope: Optional[CacheScope] = None
+    ) -> Union[Dict, httpx.Response]:
         """Make API request with retry logic.
         
+        Cacheable requests first check the response cache; concurrent misses
+        for the same payload wait on a single upstream call.
+        
         Args:
             url: API endpoint URL.
             data: Request payload.
             max_retries: Maximum number of retry attempts.
             base_delay: Base delay between retries in seconds.
             timeout: Request timeout in seconds.
+            use_cache: Whether to read from and write to the response cache.
+            stream: Return the open response as soon as a successful status
+                arrives instead of reading the body. The caller must close it.
+                Caching is left to the caller in this mode.
+            deadline: Deadline shared by all attempts, queueing and backoff.
+            endpoint_name: App endpoint the call is made for, for usage accounting.
+            prompt_version: Prompt template version, made part of the cache key.
+            cache_policy: How the call uses the cache; the endpoint's default
+                policy if None.
+            cache_scope: Entities and data the response depends on, keying
+                the cache by them instead of by the whole payload.
             
         Returns:
-            Parsed API response.
+            Parsed API response, or the open streaming response.
             
         Raises:
             DeepSeekAPIError: If all retry attempts fail.
         """
+        policy = resolve_cache_policy(use_cache, cache_policy, endpoint_name)
+        
         # Use default values if not specified
         max_retries = max_retries if max_retries is not None else self.max_retries
         timeout = timeout if timeout is not None else self.default_timeout
         
-        headers = self._prepare_headers()
-        
-        # Create a cache key based on the payload
-        cache_key = json.dumps(data, sort_keys=True)
+        cache_key = make_cache_key(data, prompt_version, cache_scope)
+        cache_tags = cache_scope.tags if cache_scope is not None else ()
         
         # Check cache first if we should use it
-        cached_response = response_cache.get({"payload": cache_key})
-        if cached_response:
+        cached = await response_cache.lookup_async(cache_key, policy) if not stream else None
+        if cached:
+            cached_response, staleness = cached
             logger.info("Retrieved response from cache")
+            token_usage.record_cached(endpoint_name)
+            if staleness > 0:
+                self._revalidate(url, data, cache_key, policy, cache_tags, staleness, endpoint_name)
             return {
                 "choices": [
                     {"message": {"content": cached_response}}
@@ -153,19 +311,243 @@ class DeepSeek:
                 "cached": True
             }
         
+        if not policy.bypass_read and not stream:
+            # Coalesce concurrent cache misses for the same payload. The call
+            # runs under the first caller's deadline; every caller stops
+            # waiting at its own.
+            try:
+                return await self._single_flight.do(
+                    cache_key,
+                    lambda: self._send_with_retry(
+                        url, data, max_retries, base_delay, timeout,
+                        cache_key=cache_key, cache_policy=policy, cache_tags=cache_tags,
+                        deadline=deadline, endpoint_name=endpoint_name
+                    ),
+                    timeout=deadline.remaining() if deadline is not None else None
+                )
+            except asyncio.TimeoutError:
+                raise DeepSeekDeadlineError("Latency budget exhausted waiting for DeepSeek")
+        
+        # A forced refresh still stores its response unless writes are bypassed too
+        return await self._send_with_retry(
+            url, data, max_retries, base_delay, timeout,
+            cache_key=None if stream else cache_key, cache_policy=policy, cache_tags=cache_tags,
+            stream=stream, deadline=deadline, endpoint_name=endpoint_name
+        )
+    
+    def _revalidate(
+        self,
+        url: str,
+        data: Dict,
+        cache_key: str,
+        cache_policy: CachePolicy,
+        cache_tags: Sequence[str],
+        staleness: float,
+        endpoint_name: Optional[str] = None
+    ) -> None:
+        """Refresh a stale cache entry in the background after serving it.
+        
+        Only one refresh per key runs at a time, and it joins any call for the
+        same key already in flight. Until it succeeds the stale entry keeps
+        being served within the policy's max_stale.
+        
+        Args:
+            url: API endpoint URL.
+            data: Request payload without the stream flag.
+            cache_key: Key of the stale entry.
+            cache_policy: Policy the fresh response is stored with.
+            cache_tags: Dependency tags the fresh response is stored with.
+            staleness: Seconds the served entry was past expiry.
+            endpoint_name: App endpoint the call is made for, for usage accounting.
+        """
+        record_staleness(staleness)
+        if cache_key in self._revalidations:
+            return
+        
+        async def refresh() -> None:
+            try:
+                await self._single_flight.do(
+                    cache_key,
+                    lambda: self._send_with_retry(
+                        url, data, self.max_retries, 1.0, self.default_timeout,
+                        cache_key=cache_key, cache_policy=cache_policy, cache_tags=cache_tags,
+                        endpoint_name=endpoint_name
+                    )
+                )
+                self.revalidated += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.revalidation_failures += 1
+                logger.warning(f"Background refresh of stale cache entry failed: {str(e)}")
+            finally:
+                self._revalidations.pop(cache_key, None)
+        
+        logger.info(f"Serving cache entry {staleness:.0f}s stale; refreshing in the background")
+        self._revalidations[cache_key] = asyncio.ensure_future(refresh())
+    
+    async def _send_limited(
+        self,
+        url: str,
+        data: Dict,
+        timeout: float,
+        stream: bool = False,
+        deadline: Optional[Deadline] = None
+    ) -> httpx.Response:
+        """Send one request through the circuit breaker and adaptive limiter.
+        
+        The limiter slot is released with the outcome of the call. A successful
+        streaming response keeps its slot; the caller must release it once the
+        stream has been consumed.
+        
+        Args:
+            url: API endpoint URL.
+            data: Request payload.
+            timeout: Request timeout in seconds.
+            stream: Send without reading the response body.
+            deadline: Deadline bounding the wait for a slot and the request.
+            
+        Returns:
+            HTTP response.
+            
+        Raises:
+            DeepSeekUnavailableError: If the circuit breaker is open.
+            DeepSeekDeadlineError: If the deadline passes while queued.
+        """
+        if not self._breaker.allow_request():
+            raise DeepSeekUnavailableError(
+                "DeepSeek API is temporarily unavailable (circuit open)",
+                retry_after=self._breaker.retry_after
+            )
+        
+        try:
+            if deadline is None:
+                await self._limiter.acquire()
+            else:
+                await asyncio.wait_for(self._limiter.acquire(), deadline.remaining())
+        except asyncio.TimeoutError:
+            self._breaker.record_ignored()
+            raise DeepSeekDeadlineError("Latency budget exhausted while queued for DeepSeek")
+        except BaseException:
+            self._breaker.record_ignored()
+            raise
+        
+        # Time spent queued comes out of the budget for this attempt
+        if deadline is not None:
+            timeout = min(timeout, deadline.remaining())
+        
+        start_time = time.monotonic()
+        try:
+            request = self._http.build_request("POST", url, json=data, timeout=timeout)
+            response = await self._http.send(request, stream=stream)
+        except httpx.TransportError:
+            self._limiter.release(LIMIT_DROPPED)
+            self._breaker.record_failure()
+            raise
+        except BaseException:
+            self._limiter.release(LIMIT_IGNORED)
+            self._breaker.record_ignored()
+            raise
+        
+        if response.status_code == 200:
+            if not stream:
+                self._limiter.release(LIMIT_SUCCESS, time.monotonic() - start_time)
+            self._breaker.record_success()
+        elif response.status_code == 429:
+            # Rate limiting is handled by the limiter; it is not an outage
+            self._limiter.release(LIMIT_DROPPED)
+            self._breaker.record_ignored()
+        elif response.status_code >= 500:
+            self._limiter.release(LIMIT_DROPPED)
+            self._breaker.record_failure()
+        else:
+            self._limiter.release(LIMIT_IGNORED)
+            self._breaker.record_ignored()
+        
+        return response
+    
+    async def _backoff(
+        self,
+        delay: float,
+        error: DeepSeekAPIError,
+        deadline: Optional[Deadline] = None
+    ) -> None:
+        """Sleep before a retry, or raise error if the retry is not affordable.
+        
+        A retry needs a token from the process-wide retry budget and, when a
+        deadline is set, enough time left for the sleep plus a useful attempt.
+        
+        Args:
+            delay: Seconds to wait before retrying.
+            error: Error to raise when the retry is given up.
+            deadline: Deadline of the current request, if any.
+            
+        Raises:
+            DeepSeekAPIError: The given error, if no retry should be made.
+        """
+        if deadline is not None and deadline.remaining() < delay + self.min_attempt_time:
+            logger.warning(f"Not retrying: {deadline.remaining():.2f}s left of the latency budget")
+            raise error
+        
+        if not self._retry_budget.try_spend():
+            logger.warning("Not retrying: retry budget exhausted")
+            raise error
+        
+        logger.warning(f"{error.message}. Retrying in {delay:.2f} seconds...")
+        await asyncio.sleep(delay)
+    
+    async def _send_with_retry(
+        self,
+        url: str,
+        data: Dict,
+        max_retries: int,
+        base_delay: float,
+        timeout: int,
+        cache_key: Optional[str] = None,
+        cache_policy: Optional[CachePolicy] = None,
+        cache_tags: Sequence[str] = (),
+        stream: bool = False,
+        deadline: Optional[Deadline] = None,
+        endpoint_name: Optional[str] = None
+    ) -> Union[Dict, httpx.Response]:
+        """Send the request upstream, retrying transient failures.
+        
+        Retries stop early when the deadline leaves too little time for another
+        attempt or the process-wide retry budget is spent.
+        
+        Args:
+            url: API endpoint URL.
+            data: Request payload.
+            max_retries: Maximum number of retry attempts.
+            base_delay: Base delay between retries in seconds.
+            timeout: Request timeout in seconds.
+            cache_key: Cache key to store a successful response under, if any.
+            cache_policy: Cache policy the response is stored with.
+            cache_tags: Dependency tags the response is stored with.
+            stream: Return the open response instead of reading the body. It
+                holds a limiter slot the caller must release.
+            deadline: Deadline shared by all attempts and backoff sleeps.
+            endpoint_name: App endpoint the call is made for, for usage accounting.
+            
+        Returns:
+            Parsed API response, or the open streaming response.
+            
+        Raises:
+            DeepSeekAPIError: If all retry attempts fail.
+        """
+        self._retry_budget.record_request()
+        
         for attempt in range(max_retries + 1):
+            if deadline is not None and deadline.remaining() < self.min_attempt_time:
+                raise DeepSeekDeadlineError("Latency budget exhausted before DeepSeek could answer")
+            
             try:
                 if self.request_logging:
                     logger.debug(f"Making API request to {url} (attempt {attempt + 1}/{max_retries + 1})")
                     logger.debug(f"Request payload: {data}")
                 
                 start_time = time.time()
-                response = requests.post(
-                    url, 
-                    json=data, 
-                    headers=headers,
-                    timeout=timeout
-                )
+                response = await self._send_limited(url, data, timeout, stream=stream, deadline=deadline)
                 elapsed_time = time.time() - start_time
                 
                 if self.request_logging:
@@ -173,30 +555,52 @@ class DeepSeek:
                 
                 # Check if we hit a rate limit (assuming 429 is the rate limit status code)
                 if response.status_code == 429:
-                    retry_after = int(response.headers.get("Retry-After", attempt + 1))
-                    logger.warning(f"Rate limit exceeded. Retrying after {retry_after} seconds.")
-                    time.sleep(retry_after)
+                    if stream:
+                        await response.aclose()
+                    error = DeepSeekAPIError("Rate limit exceeded", status_code=429)
+                    if attempt == max_retries:
+                        raise error
+                    await self._backoff(self._retry_after(response, attempt + 1), error, deadline)
                     continue
                 
+                if stream:
+                    if response.status_code == 200:
+                        return response
+                    # Read the error body so it can be parsed, then raise
+                    try:
+                        await response.aread()
+                    finally:
+                        await response.aclose()
+                
                 # Process the response
                 response_data = self._handle_response(response)
+                token_usage.record(
+                    endpoint_name,
+                    response_data.get("usage"),
+                    estimate_message_tokens(data.get("messages", [])),
+                    elapsed_time
+                )
                 
                 # If response was successful and we got content, cache it
-                if "choices" in response_data and response_data["choices"]:
+                if cache_key is not None and "choices" in response_data and response_data["choices"]:
                     content = response_data["choices"][0]["message"]["content"]
-                    response_cache.set({"payload": cache_key}, content)
+                    response_cache.set(cache_key, content, cache_policy, cache_tags, latency=elapsed_time)
                 
                 return response_data
                 
-            except (ConnectionError, Timeout) as e:
-                # Network-related errors
+            except httpx.TransportError as e:
+                # Network, timeout and protocol errors, e.g. a dropped keep-alive connection
+                error = DeepSeekAPIError(f"Failed to connect to DeepSeek API after {attempt + 1} attempts: {str(e)}")
                 if attempt == max_retries:
-                    raise DeepSeekAPIError(f"Failed to connect to DeepSeek API after {max_retries} attempts: {str(e)}")
+                    raise error
                 
                 # Exponential backoff with jitter
                 delay = base_delay * (2 ** attempt) * (0.5 + 0.5 * (attempt / max_retries))
-                logger.warning(f"Connection error: {str(e)}. Retrying in {delay:.2f} seconds...")
-                time.sleep(delay)
+                await self._backoff(delay, error, deadline)
+                
+            except (DeepSeekUnavailableError, DeepSeekDeadlineError):
+                # Circuit open or out of time: retrying cannot help
+                raise
                 
             except DeepSeekAPIError as e:
                 # Don't retry if it's a client error (4xx except 429)
@@ -207,8 +611,7 @@ class DeepSeek:
                     raise
                 
                 delay = base_delay * (2 ** attempt)
-                logger.warning(f"API error: {e.message}. Retrying in {delay:.2f} seconds...")
-                time.sleep(delay)
+                await self._backoff(delay, e, deadline)
                 
             except Exception as e:
                 # Unexpected errors
@@ -218,7 +621,157 @@ class DeepSeek:
         # but adding as a fallback
         raise DeepSeekAPIError("Maximum retry attempts exceeded")
     
-    def get_response(
+    @staticmethod
+    def _retry_after(response: httpx.Response, default: float) -> float:
+        """Read the Retry-After header in seconds, falling back to default."""
+        try:
+            return float(response.headers.get("Retry-After", default))
+        except ValueError:
+            return default
+    
+    async def _stream_completion(
+        self,
+        url: str,
+        data: Dict,
+        timeout: Optional[int] = None,
+        use_cache: bool = True,
+        deadline: Optional[Deadline] = None,
+        endpoint_name: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+        cache_policy: Optional[CachePolicy] = None,
+        cache_scope: Optional[CacheScope] = None
+    ) -> AsyncIterator[str]:
+        """Stream a chat completion, yielding content deltas as they arrive.
+        
+        A cached response is replayed as a fast stream. A stream that runs to
+        completion is written to the cache under the same key as the
+        non-streaming request, so both modes share entries.
+        
+        Args:
+            url: API endpoint URL.
+            data: Request payload without the stream flag.
+            timeout: Request timeout in seconds.
+            use_cache: Whether to read from and write to the response cache.
+            deadline: Deadline for the stream to start; once tokens flow,
+                only the per-read timeout applies.
+            endpoint_name: App endpoint the call is made for, for usage accounting.
+            prompt_version: Prompt template version, made part of the cache key.
+            cache_policy: How the call uses the cache; the endpoint's default
+                policy if None.
+            cache_scope: Entities and data the response depends on, keying
+                the cache by them instead of by the whole payload.
+            
+        Yields:
+            Pieces of the model's text response.
+            
+        Raises:
+            DeepSeekAPIError: If the request fails or the stream is interrupted.
+        """
+        policy = resolve_cache_policy(use_cache, cache_policy, endpoint_name)
+        cache_key = make_cache_key(data, prompt_version, cache_scope)
+        cache_tags = cache_scope.tags if cache_scope is not None else ()
+        
+        cached = await response_cache.lookup_async(cache_key, policy)
+        if cached:
+            cached_response, staleness = cached
+            logger.info("Replaying cached response as stream")
+            token_usage.record_cached(endpoint_name)
+            if staleness > 0:
+                self._revalidate(url, data, cache_key, policy, cache_tags, staleness, endpoint_name)
+            async for chunk in replay_chunks(cached_response):
+                yield chunk
+            return
+        
+        start_time = time.time()
+        response = await self._make_request_with_retry(
+            url=url,
+            data={**data, "stream": True, "stream_options": {"include_usage": True}},
+            timeout=timeout,
+            use_cache=False,
+            stream=True,
+            deadline=deadline,
+            endpoint_name=endpoint_name
+        )
+        
+        parts: List[str] = []
+        usage: Optional[Dict[str, Any]] = None
+        completed = False
+        outcome = LIMIT_IGNORED
+        try:
+            async for line in response.aiter_lines():
+                # Server-sent events: only "data:" lines carry payloads
+                if not line.startswith("data:"):
+                    continue
+                chunk_data = line[len("data:"):].strip()
+                if chunk_data == "[DONE]":
+                    completed = True
+                    break
+                
+                try:
+                    event = json.loads(chunk_data)
+                except ValueError:
+                    raise DeepSeekAPIError(f"Failed to parse stream chunk: {chunk_data}")
+                
+                # With include_usage the final chunk carries the usage block
+                usage = event.get("usage") or usage
+                choices = event.get("choices") or []
+                if not choices:
+                    continue
+                content = (choices[0].get("delta") or {}).get("content")
+                if content:
+                    parts.append(content)
+                    yield content
+                if choices[0].get("finish_reason"):
+                    completed = True
+            if completed:
+                outcome = LIMIT_SUCCESS
+        except httpx.TransportError as e:
+            outcome = LIMIT_DROPPED
+            raise DeepSeekAPIError(f"DeepSeek stream interrupted: {str(e)}")
+        finally:
+            await response.aclose()
+            self._limiter.release(outcome)
+        
+        elapsed_time = time.time() - start_time
+        token_usage.record(
+            endpoint_name,
+            usage,
+            estimate_message_tokens(data.get("messages", [])),
+            elapsed_time
+        )
+        
+        # Only cache streams that ran to completion
+        if completed and parts:
+            response_cache.set(cache_key, "".join(parts), policy, cache_tags, latency=elapsed_time)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics about upstream traffic control.
+        
+        Returns:
+            Dictionary with circuit breaker, limiter, retry budget, request
+            coalescing and stale entry revalidation statistics.
+        """
+        return {
+            "circuit_breaker": self._breaker.get_stats(),
+            "retry_budget": self._retry_budget.get_stats(),
+            "limiter": self._limiter.get_stats(),
+            "single_flight": {
+                "in_flight": self._single_flight.in_flight,
+                "coalesced_calls": self._single_flight.coalesced_calls
+            },
+            "revalidation": {
+                "in_flight": len(self._revalidations),
+                "succeeded": self.revalidated,
+                "failed": self.revalidation_failures
+            }
+        }
+    
+    @staticmethod
+    def _error_result(message: str, stream: bool) -> Union[str, AsyncIterator[str]]:
+        """Shape an error message like a normal result for the requested mode."""
+        return replay_chunks(message) if stream else message
+    
+    async def get_response(
         self, 
         user_input: str, 
         system_prompt: str = "You are a helpful career coach.",
@@ -226,8 +779,14 @@ class DeepSeek:
         max_tokens: Optional[int] = None,
         model: Optional[str] = None,
         timeout: Optional[int] = None,
-        use_cache: bool = True
-    ) -> str:
+        use_cache: bool = True,
+        stream: bool = False,
+        deadline: Optional[Deadline] = None,
+        endpoint_name: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+        cache_policy: Optional[CachePolicy] = None,
+        cache_scope: Optional[CacheScope] = None
+    ) -> Union[str, AsyncIterator[str]]:
         """Send user input to DeepSeek API and get response.
         
         Args:
@@ -238,18 +797,27 @@ class DeepSeek:
             model: DeepSeek model to use.
             timeout: Request timeout in seconds.
             use_cache: Whether to use the response cache.
+            stream: Return an async iterator of response chunks instead of
+                the complete text. Errors are then raised while iterating.
+            deadline: Total latency budget for the call, including retries.
+            endpoint_name: App endpoint the call is made for, for usage accounting.
+            prompt_version: Key of the prompt template used (PromptTemplate.key),
+                so editing a template invalidates only its cache entries.
+            cache_policy: How the call uses the cache, e.g. its TTL or a
+                forced refresh; the endpoint's default policy if None.
+            cache_scope: Entities and data the response depends on. Keys the
+                cache by them, so unrelated edits keep the entry and data
+                changes replace it; keyed by the whole payload if None.
             
         Returns:
-            Model's text response.
+            Model's text response, or an async iterator over it when streaming.
             
         Raises:
-            DeepSeekAPIError: If the API request fails.
+            DeepSeekUnavailableError: If the circuit breaker is open and the
+                response is not cached.
+            DeepSeekDeadlineError: If the latency budget runs out. Other API
+                errors are turned into an error message.
         """
-        # Disable cache if requested
-        original_cache_enabled = response_cache.enabled
-        if not use_cache:
-            response_cache.enabled = False
-        
         try:
             model = model or self.default_model
             logger.info(f"Sending request to DeepSeek API (model: {model})")
@@ -275,11 +843,30 @@ class DeepSeek:
             if max_tokens is not None:
                 payload["max_tokens"] = max_tokens
             
+            if stream:
+                return self._stream_completion(
+                    url=self.chat_endpoint,
+                    data=payload,
+                    timeout=timeout,
+                    use_cache=use_cache,
+                    deadline=deadline,
+                    endpoint_name=endpoint_name,
+                    prompt_version=prompt_version,
+                    cache_policy=cache_policy,
+                    cache_scope=cache_scope
+                )
+            
             # Make the API request
-            response_data = self._make_request_with_retry(
+            response_data = await self._make_request_with_retry(
                 url=self.chat_endpoint,
                 data=payload,
-                timeout=timeout
+                timeout=timeout,
+                use_cache=use_cache,
+                deadline=deadline,
+                endpoint_name=endpoint_name,
+                prompt_version=prompt_version,
+                cache_policy=cache_policy,
+                cache_scope=cache_scope
             )
             
             # Check if this was a cached response
@@ -307,33 +894,39 @@ class DeepSeek:
             # Input validation errors
             error_msg = f"Invalid input: {str(e)}"
             logger.error(error_msg)
-            return f"Error: {error_msg}"
+            return self._error_result(f"Error: {error_msg}", stream)
+            
+        except (DeepSeekUnavailableError, DeepSeekDeadlineError):
+            # Let callers answer immediately with their own fallback
+            raise
             
         except DeepSeekAPIError as e:
             # API-related errors
             error_msg = f"DeepSeek API error: {e.message}"
             logger.error(error_msg)
-            return f"Error occurred while processing your request. Please try again later."
+            return self._error_result("Error occurred while processing your request. Please try again later.", stream)
             
         except Exception as e:
             # Unexpected errors
             error_msg = f"Unexpected error: {str(e)}"
             logger.error(error_msg)
-            return f"An unexpected error occurred. Please try again later."
-        
-        finally:
-            # Restore original cache setting
-            response_cache.enabled = original_cache_enabled
+            return self._error_result("An unexpected error occurred. Please try again later.", stream)
             
-    def chat(
+    async def chat(
         self, 
         messages: List[Dict[str, str]], 
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
         model: Optional[str] = None,
         timeout: Optional[int] = None,
-        use_cache: bool = True
-    ) -> str:
+        use_cache: bool = True,
+        stream: bool = False,
+        deadline: Optional[Deadline] = None,
+        endpoint_name: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+        cache_policy: Optional[CachePolicy] = None,
+        cache_scope: Optional[CacheScope] = None
+    ) -> Union[str, AsyncIterator[str]]:
         """Advanced chat method with support for conversation history.
         
         Args:
@@ -343,18 +936,27 @@ class DeepSeek:
             model: DeepSeek model to use.
             timeout: Request timeout in seconds.
             use_cache: Whether to use the response cache.
+            stream: Return an async iterator of response chunks instead of
+                the complete text. Errors are then raised while iterating.
+            deadline: Total latency budget for the call, including retries.
+            endpoint_name: App endpoint the call is made for, for usage accounting.
+            prompt_version: Key of the prompt template used (PromptTemplate.key),
+                so editing a template invalidates only its cache entries.
+            cache_policy: How the call uses the cache, e.g. its TTL or a
+                forced refresh; the endpoint's default policy if None.
+            cache_scope: Entities and data the response depends on. Keys the
+                cache by them, so unrelated edits keep the entry and data
+                changes replace it; keyed by the whole payload if None.
             
         Returns:
-            Model's text response.
+            Model's text response, or an async iterator over it when streaming.
             
         Raises:
-            DeepSeekAPIError: If the API request fails.
+            DeepSeekUnavailableError: If the circuit breaker is open and the
+                response is not cached.
+            DeepSeekDeadlineError: If the latency budget runs out. Other API
+                errors are turned into an error message.
         """
-        # Disable cache if requested
-        original_cache_enabled = response_cache.enabled
-        if not use_cache:
-            response_cache.enabled = False
-            
         try:
             model = model or self.default_model
             logger.info(f"Sending chat request to DeepSeek API (model: {model})")
@@ -381,11 +983,30 @@ class DeepSeek:
             if max_tokens is not None:
                 payload["max_tokens"] = max_tokens
             
+            if stream:
+                return self._stream_completion(
+                    url=self.chat_endpoint,
+                    data=payload,
+                    timeout=timeout,
+                    use_cache=use_cache,
+                    deadline=deadline,
+                    endpoint_name=endpoint_name,
+                    prompt_version=prompt_version,
+                    cache_policy=cache_policy,
+                    cache_scope=cache_scope
+                )
+            
             # Make the API request
-            response_data = self._make_request_with_retry(
+            response_data = await self._make_request_with_retry(
                 url=self.chat_endpoint,
                 data=payload,
-                timeout=timeout
+                timeout=timeout,
+                use_cache=use_cache,
+                deadline=deadline,
+                endpoint_name=endpoint_name,
+                prompt_version=prompt_version,
+                cache_policy=cache_policy,
+                cache_scope=cache_scope
             )
             
             # Check if this was a cached response
@@ -413,42 +1034,47 @@ class DeepSeek:
             # Input validation errors
             error_msg = f"Invalid input: {str(e)}"
             logger.error(error_msg)
-            return f"Error: {error_msg}"
+            return self._error_result(f"Error: {error_msg}", stream)
+            
+        except (DeepSeekUnavailableError, DeepSeekDeadlineError):
+            # Let callers answer immediately with their own fallback
+            raise
             
         except DeepSeekAPIError as e:
             # API-related errors
             error_msg = f"DeepSeek API error: {e.message}"
             logger.error(error_msg)
-            return f"Error occurred while processing your request. Please try again later."
+            return self._error_result("Error occurred while processing your request. Please try again later.", stream)
             
         except Exception as e:
             # Unexpected errors
             error_msg = f"Unexpected error: {str(e)}"
             logger.error(error_msg)
-            return f"An unexpected error occurred. Please try again later."
-            
-        finally:
-            # Restore original cache setting
-            response_cache.enabled = original_cache_enabled
+            return self._error_result("An unexpected error occurred. Please try again later.", stream)
             
 # Add specialized career-focused methods
 class CareerCoachDeepSeek(DeepSeek):
     """Specialized DeepSeek client for career coaching and job recommendations"""
     
-    def generate_job_insights(
+    async def generate_job_insights(
         self,
         user_profile: Dict[str, Any],
         job_postings: List[Dict[str, Any]],
         temperature: float = 0.7,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        deadline: Optional[Deadline] = None
     ) -> str:
         """Generate career insights and job recommendations based on user profile.
         
+        Jobs are included in the given order for as long as they fit the
+        prompt token budget, so pass the best matches first.
+        
         Args:
             user_profile: Dictionary containing user profile information.
-            job_postings: List of job posting dictionaries.
+            job_postings: List of job posting dictionaries, best matches first.
             temperature: Sampling temperature (0.0 to 1.0).
             max_tokens: Maximum tokens in the response.
+            deadline: Total latency budget for the call.
             
         Returns:
             Career insights and job recommendations.
@@ -464,9 +1090,9 @@ class CareerCoachDeepSeek(DeepSeek):
         Interests: {', '.join(user_profile.get('interests', []))}
         """
         
-        # Prepare job context (limit to top 5 for context length)
+        # Prepare job context (as many jobs as fit the prompt budget)
         job_contexts = []
-        for i, job in enumerate(job_postings[:5]):
+        for i, job in enumerate(job_postings):
             job_context = f"""
             Job {i+1}: {job.get('title', 'Unnamed Position')}
             Department: {job.get('department', 'Not specified')}
@@ -476,50 +1102,44 @@ class CareerCoachDeepSeek(DeepSeek):
             Description: {job.get('description', 'No description provided')}
             Salary Range: {job.get('salary_range', 'Not specified')}
             """
-            job_contexts.append(job_context)
-        
-        jobs_context = "\n".join(job_contexts)
+            job_contexts.append(compact_whitespace(job_context))
         
-        # Create career coach prompt
-        prompt = f"""As a career coach, analyze these job matches for the user.
-
-USER PROFILE:
-{user_context}
-
-JOB MATCHES:
-{jobs_context}
-
-Based on the user's current skills, desired skills, and interests, provide personalized career advice about these job opportunities. Focus on:
-
-1. How well each position aligns with their current skills and interests
-2. How these roles could help them develop their desired skills
-3. Any specific growth opportunities these positions offer
-4. Which jobs might be the best match and why
-
-Your advice should be practical, balanced, and personalized to this user's specific situation.
-"""
+        # A long profile may not crowd every job out of the prompt
+        budget = prompt_token_budget("job_insights")
+        user_context = truncate_to_tokens(compact_whitespace(user_context), int(budget * PROFILE_BUDGET_SHARE))
+        context_budget = budget - estimate_tokens(user_context)
+        kept = fit_items(job_contexts, context_budget, separator="\n\n")
+        if len(kept) < len(job_contexts):
+            logger.info(
+                f"Job insights prompt for {user_profile.get('user_id')} keeps {len(kept)} of "
+                f"{len(job_contexts)} jobs within {context_budget} tokens"
+            )
+        jobs_context = "\n\n".join(kept)
+        # fit_items keeps a prefix; the response depends only on these jobs
+        included_jobs = job_postings[:len(kept)]
         
-        # Use specialized system prompt for career coaching
-        system_prompt = """You are an expert career coach specializing in tech careers. 
-You provide insightful, balanced, and personalized career guidance based on a user's skills, 
-interests, and career goals. Your advice is practical and helps users make informed decisions
-about job opportunities and career development."""
+        # Static instructions first, per-user data last
+        prompt = prompt_registry.get("job_insights")
         
         # Get response with appropriate temperature for career advice
-        return self.get_response(
-            user_input=prompt,
-            system_prompt=system_prompt,
+        return await self.chat(
+            messages=prompt.render(user_profile=user_context, jobs=jobs_context),
             temperature=temperature,
             max_tokens=max_tokens,
-            use_cache=True  # Cache career insights to improve performance
+            use_cache=True,  # Cache career insights to improve performance
+            deadline=deadline,
+            endpoint_name=prompt.name,
+            prompt_version=prompt.key,
+            cache_scope=job_recommendation_cache_scope(user_profile, included_jobs)
         )
     
-    def generate_skill_development_plan(
+    async def generate_skill_development_plan(
         self,
         user_profile: Dict[str, Any],
         target_skills: List[str],
         temperature: float = 0.6,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        deadline: Optional[Deadline] = None
     ) -> str:
         """Generate a personalized skill development plan.
         
@@ -528,13 +1148,11 @@ about job opportunities and career development."""
             target_skills: List of skills the user wants to develop.
             temperature: Sampling temperature (0.0 to 1.0).
             max_tokens: Maximum tokens in the response.
+            deadline: Total latency budget for the call.
             
         Returns:
             Personalized skill development plan.
         """
-        # Implementation for skill development planning
-        # Similar structure to generate_job_insights but focused on skill development
-        
         # Create profile context
         profile_context = f"""
         User: {user_profile.get('name', 'User')}
@@ -544,36 +1162,28 @@ about job opportunities and career development."""
         """
         
         # Create skills context
-        skills_context = "Target Skills to Develop:\n" + "\n".join([f"- {skill}" for skill in target_skills])
-        
-        # Create prompt for skill development
-        prompt = f"""As a career coach, create a personalized skill development plan.
-
-USER PROFILE:
-{profile_context}
-
-{skills_context}
-
-Create a practical skill development plan that will help this user acquire these target skills. Include:
-
-1. Specific learning resources or activities for each skill
-2. A realistic timeline for skill acquisition
-3. How to apply these skills in their current role
-4. How these skills will enhance their career opportunities
-
-Provide actionable advice that takes into account their current skill set and experience level.
-"""
+        context_budget = prompt_token_budget("skill_plan") - estimate_tokens(profile_context)
+        skills_context = "\n".join(
+            fit_items([f"- {skill}" for skill in target_skills], context_budget)
+        )
         
-        # Use specialized system prompt for skill development
-        system_prompt = """You are an expert career coach specializing in professional skill development.
-You create practical, personalized learning plans that help professionals acquire new skills efficiently.
-Your advice is specific, actionable, and tailored to each individual's background and goals."""
+        # Static instructions first, per-user data last
+        prompt = prompt_registry.get("skill_plan")
         
         # Get response with appropriate temperature for structured advice
-        return self.get_response(
-            user_input=prompt,
-            system_prompt=system_prompt,
+        return await self.chat(
+            messages=prompt.render(user_profile=profile_context, target_skills=skills_context),
             temperature=temperature,
             max_tokens=max_tokens,
-            use_cache=True
-        )
\ No newline at end of file
+            use_cache=True,
+            deadline=deadline,
+            endpoint_name=prompt.name,
+            prompt_version=prompt.key,
+            cache_scope=CacheScope(
+                [f"user:{user_profile.get('user_id')}"],
+                {
+                    "user": entity_fields(user_profile, ['name', 'role', 'experience', 'skills']),
+                    "target_skills": target_skills
+                }
+            )
+        )
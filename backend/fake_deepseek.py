@@ -0,0 +1,319 @@
+# backend/fake_deepseek.py
+"""Local stand-in for the DeepSeek chat completions API.
+
+Serves OpenAI-shaped /v1/chat/completions responses, plain and streamed, with
+configurable latency and injected faults, so the backend can be load-tested
+and benchmarked offline. Run it and point the backend at it:
+
+    uvicorn fake_deepseek:app --port 8001
+    DEEPSEEK_API_BASE_URL=http://localhost:8001/v1 uvicorn main:app
+
+Behaviour is set through FAKE_DEEPSEEK_* environment variables, changed at
+runtime through POST /fake/config, or forced per request with the
+X-Fake-Fault header (rate_limit, server_error, timeout, malformed).
+"""
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+import logging
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseSettings
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("fake_deepseek")
+
+# Fault kinds, also accepted in the X-Fake-Fault header
+FAULT_RATE_LIMIT = "rate_limit"
+FAULT_SERVER_ERROR = "server_error"
+FAULT_TIMEOUT = "timeout"
+FAULT_MALFORMED = "malformed"
+
+class FakeDeepSeekSettings(BaseSettings):
+    """Fake server behaviour, loaded from FAKE_DEEPSEEK_* environment variables."""
+
+    # Response latency before the first byte
+    LATENCY_DISTRIBUTION: str = "lognormal"  # fixed, uniform, normal, lognormal or exponential
+    LATENCY_MEAN_MS: float = 800.0
+    LATENCY_STDDEV_MS: float = 400.0
+    LATENCY_MAX_MS: float = 20000.0
+
+    # Generated completion size and streaming pace
+    COMPLETION_WORDS: int = 120
+    STREAM_CHUNK_WORDS: int = 4
+    STREAM_CHUNK_DELAY_MS: float = 20.0
+
+    # Fault injection, as probabilities per request
+    RATE_LIMIT_RATE: float = 0.0
+    RETRY_AFTER_SECONDS: int = 1
+    SERVER_ERROR_RATE: float = 0.0
+    SERVER_ERROR_BURST: int = 1  # consecutive 5xx responses once a server error starts
+    SERVER_ERROR_STATUS: int = 503
+    TIMEOUT_RATE: float = 0.0
+    TIMEOUT_SECONDS: float = 120.0  # how long a timed-out request hangs
+    MALFORMED_RATE: float = 0.0
+
+    SEED: Optional[int] = None
+
+    class Config:
+        """Configuration for the FakeDeepSeekSettings class."""
+        env_prefix = "FAKE_DEEPSEEK_"
+        case_sensitive = True
+
+
+class FakeDeepSeek:
+    """Latency sampling, fault selection and counters of the fake server."""
+
+    def __init__(self, settings: FakeDeepSeekSettings):
+        """Initialize the fake server state.
+
+        Args:
+            settings: Behaviour settings.
+        """
+        self.settings = settings
+        self.random = random.Random(settings.SEED)
+        self.burst_remaining = 0
+        self.counters: Dict[str, int] = {}
+
+    def configure(self, changes: Dict[str, Any]) -> FakeDeepSeekSettings:
+        """Apply setting changes, validated like the environment variables.
+
+        Args:
+            changes: Setting names and new values.
+
+        Returns:
+            The new settings.
+        """
+        self.settings = FakeDeepSeekSettings(**{**self.settings.dict(), **changes})
+        if "SEED" in changes:
+            self.random = random.Random(self.settings.SEED)
+        self.burst_remaining = 0
+        return self.settings
+
+    def sample_latency(self) -> float:
+        """Sample the time to first byte in seconds."""
+        s = self.settings
+        mean, stddev = s.LATENCY_MEAN_MS, s.LATENCY_STDDEV_MS
+        distribution = s.LATENCY_DISTRIBUTION
+
+        if distribution == "fixed":
+            latency = mean
+        elif distribution == "uniform":
+            latency = self.random.uniform(max(0.0, mean - stddev), mean + stddev)
+        elif distribution == "normal":
+            latency = self.random.gauss(mean, stddev)
+        elif distribution == "exponential":
+            latency = self.random.expovariate(1.0 / mean) if mean > 0 else 0.0
+        else:
+            # Lognormal with the configured mean and standard deviation: a long right tail
+            if mean <= 0:
+                latency = 0.0
+            else:
+                sigma2 = math.log(1 + (stddev / mean) ** 2)
+                mu = math.log(mean) - sigma2 / 2
+                latency = self.random.lognormvariate(mu, sigma2 ** 0.5)
+
+        return min(max(latency, 0.0), s.LATENCY_MAX_MS) / 1000.0
+
+    def pick_fault(self, forced: Optional[str] = None) -> Optional[str]:
+        """Choose the fault for one request, if any.
+
+        Args:
+            forced: Fault named in the X-Fake-Fault header.
+
+        Returns:
+            The fault kind, or None for a normal response.
+        """
+        if forced:
+            return forced
+
+        s = self.settings
+        if self.burst_remaining > 0:
+            self.burst_remaining -= 1
+            return FAULT_SERVER_ERROR
+
+        roll = self.random.random()
+        for fault, rate in (
+            (FAULT_RATE_LIMIT, s.RATE_LIMIT_RATE),
+            (FAULT_SERVER_ERROR, s.SERVER_ERROR_RATE),
+            (FAULT_TIMEOUT, s.TIMEOUT_RATE),
+            (FAULT_MALFORMED, s.MALFORMED_RATE)
+        ):
+            if roll < rate:
+                if fault == FAULT_SERVER_ERROR:
+                    self.burst_remaining = max(0, s.SERVER_ERROR_BURST - 1)
+                return fault
+            roll -= rate
+        return None
+
+    def count(self, outcome: str) -> None:
+        """Count one request outcome."""
+        self.counters[outcome] = self.counters.get(outcome, 0) + 1
+
+    def completion_text(self, messages: List[Dict[str, Any]]) -> str:
+        """Build a deterministic completion for the conversation."""
+        last = str(messages[-1].get("content", "")) if messages else ""
+        words = ("This is a simulated response to: " + " ".join(last.split()[:12])).split()
+        filler = "lorem ipsum dolor sit amet consectetur adipiscing elit".split()
+        while len(words) < self.settings.COMPLETION_WORDS:
+            words.extend(filler)
+        return " ".join(words[:self.settings.COMPLETION_WORDS])
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count, in line with the backend's estimate."""
+    return max(1, int(len(text) * 0.3))
+
+def _usage(messages: List[Dict[str, Any]], completion: str) -> Dict[str, int]:
+    """Build an OpenAI-shaped usage object."""
+    prompt_tokens = sum(_estimate_tokens(str(m.get("content", ""))) + 4 for m in messages)
+    completion_tokens = _estimate_tokens(completion)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+def _error(status_code: int, message: str, error_type: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    """Build an OpenAI-shaped error response."""
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": error_type, "code": status_code}},
+        headers=headers
+    )
+
+
+app = FastAPI(title="Fake DeepSeek")
+fake = FakeDeepSeek(FakeDeepSeekSettings())
+
+@app.post("/v1/chat/completions")
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    """Answer a chat completion request, plain or streamed, or fail on purpose."""
+    if not request.headers.get("authorization", "").startswith("Bearer "):
+        fake.count("unauthorized")
+        return _error(401, "Missing or invalid API key", "authentication_error")
+
+    try:
+        body = await request.json()
+        messages = body["messages"]
+    except (ValueError, KeyError):
+        fake.count("bad_request")
+        return _error(400, "Request body must be JSON with a messages list", "invalid_request_error")
+
+    fault = fake.pick_fault(request.headers.get("x-fake-fault"))
+    await asyncio.sleep(fake.sample_latency())
+
+    if fault == FAULT_RATE_LIMIT:
+        fake.count("rate_limited")
+        retry_after = fake.settings.RETRY_AFTER_SECONDS
+        return _error(429, "Rate limit reached", "rate_limit_error", headers={"Retry-After": str(retry_after)})
+    if fault == FAULT_SERVER_ERROR:
+        fake.count("server_error")
+        return _error(fake.settings.SERVER_ERROR_STATUS, "The server is overloaded", "server_error")
+    if fault == FAULT_TIMEOUT:
+        fake.count("timeout")
+        await asyncio.sleep(fake.settings.TIMEOUT_SECONDS)
+        return _error(504, "Upstream timed out", "server_error")
+    if fault == FAULT_MALFORMED:
+        fake.count("malformed")
+        return Response(content='{"id": "chatcmpl-broken", "choices": [', media_type="application/json")
+
+    model = body.get("model", "deepseek-chat")
+    completion = fake.completion_text(messages)
+    usage = _usage(messages, completion)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    if body.get("stream"):
+        fake.count("streamed")
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        return StreamingResponse(
+            _stream_chunks(completion_id, created, model, completion, usage if include_usage else None),
+            media_type="text/event-stream"
+        )
+
+    fake.count("ok")
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": completion},
+            "finish_reason": "stop"
+        }],
+        "usage": usage
+    }
+
+async def _stream_chunks(
+    completion_id: str,
+    created: int,
+    model: str,
+    completion: str,
+    usage: Optional[Dict[str, int]]
+) -> AsyncIterator[str]:
+    """Stream a completion as OpenAI-shaped chat.completion.chunk events."""
+    def chunk(delta: Dict[str, str], finish_reason: Optional[str] = None) -> str:
+        data = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(data)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+
+    words = completion.split(" ")
+    step = max(1, fake.settings.STREAM_CHUNK_WORDS)
+    for i in range(0, len(words), step):
+        text = " ".join(words[i:i + step])
+        yield chunk({"content": text if i == 0 else " " + text})
+        await asyncio.sleep(fake.settings.STREAM_CHUNK_DELAY_MS / 1000.0)
+
+    yield chunk({}, finish_reason="stop")
+    if usage is not None:
+        data = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                "model": model, "choices": [], "usage": usage}
+        yield f"data: {json.dumps(data)}\n\n"
+    yield "data: [DONE]\n\n"
+
+@app.get("/fake/config")
+async def get_config():
+    """Get the current fake server settings"""
+    return fake.settings.dict()
+
+@app.post("/fake/config")
+async def update_config(changes: Dict[str, Any]):
+    """Change fake server settings at runtime, e.g. to start a 5xx burst"""
+    try:
+        return fake.configure(changes).dict()
+    except ValueError as e:
+        return _error(422, str(e), "invalid_request_error")
+
+@app.get("/fake/stats")
+async def get_stats():
+    """Get request counts by outcome"""
+    return fake.counters
+
+@app.post("/fake/reset")
+async def reset_stats():
+    """Reset the request counters"""
+    fake.counters.clear()
+    return {"message": "Counters reset"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8001)
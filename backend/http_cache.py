@@ -0,0 +1,62 @@
+# backend/http_cache.py
+"""HTTP validators for responses computed deterministically from the datasets.
+
+A response's strong ETag is derived from the versions of the datasets it is
+computed from (Table.version) plus the request parameters, so it is known before the body is
+built. A matching If-None-Match is answered with 304 Not Modified without
+computing or serializing the body.
+"""
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+import logging
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+logger = logging.getLogger("http_cache")
+
+def make_etag(*parts: Any) -> str:
+    """Build a quoted strong ETag from a dataset version and request parameters."""
+    content = json.dumps(parts, separators=(",", ":"), default=str)
+    return '"' + hashlib.blake2b(content.encode(), digest_size=16).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison, per RFC 9110).
+
+    Args:
+        if_none_match: Header value, e.g. '"abc", W/"def"' or '*'.
+        etag: Current quoted ETag.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_strip_weak(candidate.strip()) == etag for candidate in if_none_match.split(","))
+
+def _strip_weak(tag: str) -> str:
+    """Drop the weak indicator from an entity tag."""
+    return tag[2:] if tag.startswith("W/") else tag
+
+async def conditional_response(
+    request: Request,
+    etag: str,
+    build: Callable[[], Awaitable[Dict[str, Any]]],
+    cache_control: str
+) -> Response:
+    """Answer 304 if the client has the current representation, else build it.
+
+    Args:
+        request: Incoming request, for its If-None-Match header.
+        etag: Current ETag of the response.
+        build: Computes the response body; only called when needed.
+        cache_control: Cache-Control header value.
+
+    Returns:
+        An empty 304 response or the JSON body, both with ETag and Cache-Control.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        logger.debug(f"Not modified: {request.url.path} {etag}")
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=await build(), headers=headers)
@@ -0,0 +1,329 @@
+# backend/jobs.py
+import asyncio
+import json
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger("jobs")
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+class JobError(Exception):
+    """Error raised by a job handler with an HTTP-style status code"""
+    def __init__(self, message: str, status_code: int = 500):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
+
+
+class JobQueue:
+    """In-process queue that runs AI generations on a pool of worker tasks.
+
+    Jobs are submitted with a kind and JSON-serializable parameters and run by
+    the handler registered for their kind. Results are kept for result_ttl
+    seconds and can be polled or awaited. With a db_path every state change is
+    also written to SQLite, and queued or interrupted jobs are picked up again
+    when the queue starts, so a restart does not lose work. The queue assumes
+    a single process owns the database. The database is only touched from a
+    dedicated thread, which keeps SQLite off the event loop and applies the
+    writes of a job in the order its states changed.
+    """
+
+    def __init__(self, workers: int = 4, result_ttl: int = 3600, db_path: Optional[str] = None):
+        """Initialize the job queue.
+
+        Args:
+            workers: Number of worker tasks running jobs concurrently.
+            result_ttl: Seconds finished jobs are kept.
+            db_path: SQLite database file for durable mode; in-memory only if None.
+        """
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.db_path = db_path
+
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._done_events: Dict[str, asyncio.Event] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_executor: Optional[ThreadPoolExecutor] = None
+
+        logger.info(f"Initialized job queue (workers={workers}, durable={db_path is not None})")
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any]], Awaitable[Any]]) -> None:
+        """Register the coroutine function that runs jobs of a kind.
+
+        Args:
+            kind: Job kind.
+            handler: Called with the job parameters; returns the job result.
+        """
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        """Open the database, reload unfinished jobs and start the workers."""
+        self._queue = asyncio.Queue()
+
+        if self.db_path:
+            self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-db")
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._db_executor, self._open_db)
+            for job in await loop.run_in_executor(self._db_executor, self._load_jobs):
+                self._jobs[job["job_id"]] = job
+                if job["status"] not in FINISHED_STATES:
+                    # Interrupted by a restart: run it again
+                    job["status"] = JOB_QUEUED
+                    job["started_at"] = None
+                    self._queue.put_nowait(job["job_id"])
+            logger.info(f"Restored {self._queue.qsize()} unfinished jobs from {self.db_path}")
+
+        self._worker_tasks = [
+            asyncio.ensure_future(self._worker(i)) for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the workers. Unfinished jobs stay queued in durable mode."""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+        if self._db_executor is not None:
+            # Runs after the writes already queued
+            await asyncio.get_running_loop().run_in_executor(self._db_executor, self._close_db)
+            self._db_executor.shutdown()
+            self._db_executor = None
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job.
+
+        Args:
+            kind: Job kind; a handler must be registered for it.
+            params: JSON-serializable parameters passed to the handler.
+
+        Returns:
+            The new job record.
+
+        Raises:
+            ValueError: If no handler is registered for the kind.
+            RuntimeError: If the queue has not been started.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+
+        self._expire_finished()
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "params": params,
+            "status": JOB_QUEUED,
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None
+        }
+        self._jobs[job["job_id"]] = job
+        self._save(job)
+        self._queue.put_nowait(job["job_id"])
+
+        logger.info(f"Queued {kind} job {job['job_id']}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job record by ID, or None if it is unknown or expired."""
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Long-poll a job until it finishes or the timeout passes.
+
+        Args:
+            job_id: Job to wait for.
+            timeout: Maximum seconds to wait.
+
+        Returns:
+            The job record in its state at return, or None if unknown.
+        """
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED_STATES or timeout <= 0:
+            return job
+
+        event = self._done_events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.get(job_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get job queue statistics.
+
+        Returns:
+            Dictionary with job counts by status and queue configuration.
+        """
+        counts = {state: 0 for state in (JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED)}
+        for job in self._jobs.values():
+            counts[job["status"]] += 1
+        return {
+            **counts,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "workers": self.workers,
+            "durable": self.db_path is not None
+        }
+
+    async def _worker(self, number: int) -> None:
+        """Take jobs off the queue and run them until cancelled."""
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != JOB_QUEUED:
+                continue
+
+            job["status"] = JOB_RUNNING
+            job["started_at"] = time.time()
+            self._save(job)
+
+            try:
+                job["result"] = await self._handlers[job["kind"]](job["params"])
+                job["status"] = JOB_SUCCEEDED
+            except asyncio.CancelledError:
+                # Shutting down: leave the job for the next start in durable mode
+                raise
+            except JobError as e:
+                job["status"] = JOB_FAILED
+                job["error"] = {"status_code": e.status_code, "detail": e.message}
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}")
+                job["status"] = JOB_FAILED
+                job["error"] = {"status_code": 500, "detail": str(e)}
+
+            job["finished_at"] = time.time()
+            self._save(job)
+            logger.info(f"Worker {number} finished {job['kind']} job {job_id}: {job['status']}")
+
+            event = self._done_events.pop(job_id, None)
+            if event is not None:
+                event.set()
+
+    def _expire_finished(self) -> None:
+        """Forget finished jobs older than result_ttl."""
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in FINISHED_STATES and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+        if expired and self._db_executor is not None:
+            self._db_executor.submit(self._delete_finished, cutoff)
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        """Queue a write of a job's current state to the database in durable mode."""
+        if self._db_executor is None:
+            return
+        # Serialized now, so the row holds this state even if the job changes before it is written
+        row = (
+            job["job_id"],
+            job["kind"],
+            json.dumps(job["params"]),
+            job["status"],
+            json.dumps(job["result"]) if job["result"] is not None else None,
+            json.dumps(job["error"]) if job["error"] is not None else None,
+            job["created_at"],
+            job["started_at"],
+            job["finished_at"]
+        )
+        self._db_executor.submit(self._write_row, row)
+
+    # The methods below run on the database thread
+
+    def _open_db(self) -> None:
+        """Open the SQLite database and create the jobs table."""
+        self._db = sqlite3.connect(self.db_path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )"""
+            )
+
+    def _close_db(self) -> None:
+        """Close the database."""
+        self._db.close()
+        self._db = None
+
+    def _load_jobs(self) -> List[Dict[str, Any]]:
+        """Load all unexpired jobs from the database in submission order."""
+        rows = self._db.execute(
+            "SELECT job_id, kind, params, status, result, error, created_at, started_at, finished_at "
+            "FROM jobs WHERE finished_at IS NULL OR finished_at >= ? ORDER BY created_at",
+            (time.time() - self.result_ttl,)
+        ).fetchall()
+        return [
+            {
+                "job_id": row[0],
+                "kind": row[1],
+                "params": json.loads(row[2]),
+                "status": row[3],
+                "result": json.loads(row[4]) if row[4] is not None else None,
+                "error": json.loads(row[5]) if row[5] is not None else None,
+                "created_at": row[6],
+                "started_at": row[7],
+                "finished_at": row[8]
+            }
+            for row in rows
+        ]
+
+    def _write_row(self, row: Tuple[Any, ...]) -> None:
+        """Insert or replace a job row."""
+        try:
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+        except sqlite3.Error as e:
+            logger.error(f"Saving job {row[0]} failed: {str(e)}")
+
+    def _delete_finished(self, cutoff: float) -> None:
+        """Delete the rows of jobs that finished before cutoff."""
+        try:
+            with self._db:
+                self._db.execute(
+                    "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                    (*FINISHED_STATES, cutoff)
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Deleting expired jobs failed: {str(e)}")
+
+
+# Create a global job queue
+from config import settings
+
+# Initialize the job queue with settings
+job_queue = JobQueue(
+    workers=settings.AI_JOBS_WORKERS if settings else 4,
+    result_ttl=settings.AI_JOBS_RESULT_TTL if settings else 3600,
+    db_path=settings.AI_JOBS_DB_PATH if settings else None
+)
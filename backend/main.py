@@ -1,30 +1,49 @@
 # backend/main.py
-import os
-import sys
+import json
+import asyncio
+import math
 import logging
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, AsyncIterator, Callable
 import time
 
-# Add the directory containing mock data to Python path
-current_dir = os.path.dirname(os.path.abspath(__file__))
-mock_data_dir = os.path.join(current_dir, 'mock_data')
-sys.path.insert(0, mock_data_dir)
-
-# Import mock datasets
-from company_documentation import company_documentation
-from jira_tickets import jira_tickets
-from job_postings import job_postings
-from learning_materials_dataset import learning_materials
-from user_profiles import user_profiles
+# Indexed datasets, loaded once
+from repository import repository
 
 # Import configuration, cache, and improved DeepSeek client
 from config import settings
-from cache import response_cache
-from deepseek import DeepSeek, DeepSeekAPIError
+from cache import CacheScope, NO_CACHE, cache_policy_for, entity_fields, response_cache, track_staleness
+from deepseek import DeepSeek, DeepSeekAPIError, DeepSeekDeadlineError, replay_chunks
+from resilience import Deadline, CIRCUIT_CLOSED
+from tokens import (
+    token_usage,
+    compact_whitespace,
+    estimate_tokens,
+    truncate_to_tokens,
+    fit_items,
+    prompt_token_budget
+)
+from prompts import (
+    prompt_registry,
+    build_star_messages,
+    build_job_recommendation_messages,
+    star_cache_scope,
+    job_recommendation_cache_scope
+)
+from matching import (
+    score_connections,
+    match_learning_materials,
+    match_documents,
+    match_jobs,
+    rank_jobs
+)
+from jobs import job_queue, JobError
+from cache_snapshot import cache_snapshotter
+from http_cache import make_etag, conditional_response
+from scheduler import prewarm_scheduler
 
 # Configure logging
 logger = logging.getLogger("main")
@@ -46,6 +65,12 @@ class STARRequest(BaseModel):
     ticket_id: str
     additional_context: Optional[str] = None
 
+class BulkSTARRequest(BaseModel):
+    ticket_ids: Optional[List[str]] = None
+    assignee: Optional[str] = None
+    # Summaries generated at the same time; the configured maximum if None
+    concurrency: Optional[int] = Field(None, ge=1, le=settings.STAR_BULK_CONCURRENCY)
+
 class DocumentationRequest(BaseModel):
     query: str
 
@@ -56,6 +81,9 @@ class MoodCheckRequest(BaseModel):
     mood: str
     feedback: Optional[str] = None
 
+class CacheInvalidationRequest(BaseModel):
+    tags: List[str]  # entity tags, e.g. ["ticket:PROJ-101", "user:user123"]
+
 class CacheStatsResponse(BaseModel):
     total_entries: int
     active_entries: int
@@ -63,29 +91,248 @@ class CacheStatsResponse(BaseModel):
     max_size: int
     ttl: int
     enabled: bool
-
-# AI Chatbot dependency injection
-def get_ai_client():
-    """Dependency for getting the AI client instance."""
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    expirations: int
+    l2_hits: int
+    stale_hits: int
+    bypassed: int
+    invalidations: int
+    tags: int
+    max_bytes: Optional[int] = None
+    raw_bytes: int
+    stored_bytes: int
+    compressed_entries: int
+    compression_ratio: float
+    latency_saved_seconds: float
+    namespaces: Dict[str, Dict[str, Any]]
+    l2: Optional[Dict[str, Any]] = None
+    snapshot: Optional[Dict[str, Any]] = None
+
+# Shared AI client lifecycle: one pooled client per worker process
+@app.on_event("startup")
+async def startup_ai_client():
+    """Create the shared DeepSeek client once at startup."""
     try:
-        client = DeepSeek(api_key=settings.DEEPSEEK_API_KEY)
-        return client
+        app.state.ai_client = DeepSeek(api_key=settings.DEEPSEEK_API_KEY)
     except Exception as e:
         logger.error(f"Failed to initialize DeepSeek client: {str(e)}")
+        app.state.ai_client = None
+
+@app.on_event("shutdown")
+async def shutdown_ai_client():
+    """Close the shared DeepSeek client's connection pool."""
+    client = getattr(app.state, "ai_client", None)
+    if client is not None:
+        await client.aclose()
+
+# Background job workers for "Prefer: respond-async" requests
+@app.on_event("startup")
+async def startup_job_queue():
+    """Register the AI job handlers and start the job workers."""
+    job_queue.register("star_summary", _endpoint_job(generate_star_summary, STARRequest))
+    job_queue.register("documentation", _endpoint_job(get_documentation, DocumentationRequest))
+    job_queue.register("job_recommendations", _endpoint_job(get_job_recommendations, ConnectionRecommendationRequest))
+    job_queue.register("mood_check", _endpoint_job(submit_mood_check, MoodCheckRequest))
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_job_queue():
+    """Stop the job workers."""
+    await job_queue.stop()
+
+# Off-peak pre-generation of STAR summaries and job recommendations
+@app.on_event("startup")
+async def startup_prewarm_scheduler():
+    """Register the content to pre-generate and start the scheduler if enabled."""
+    prewarm_scheduler.register(
+        "star_summary",
+        lambda: [t['ticket_id'] for t in repository.tickets.find(status='Completed')],
+        _prewarm_generator(generate_star_summary, STARRequest, "ticket_id", "star_summary", "ticket"),
+        refresh_after=_prewarm_refresh_after("star_summary")
+    )
+    prewarm_scheduler.register(
+        "job_recommendations",
+        lambda: [user['user_id'] for user in repository.users.all()],
+        _prewarm_generator(
+            get_job_recommendations, ConnectionRecommendationRequest, "user_id", "job_recommendations", "user",
+            # Users without matching jobs get a fixed message and no AI response to cache
+            nothing_to_cache=lambda result: not result.get("recommended_jobs")
+        ),
+        refresh_after=_prewarm_refresh_after("job_recommendations")
+    )
+    if settings.AI_PREWARM_ENABLED:
+        prewarm_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_prewarm_scheduler():
+    """Stop the prewarm scheduler."""
+    await prewarm_scheduler.stop()
+
+# Response cache snapshots, so restarted processes start with a warm cache
+@app.on_event("startup")
+async def startup_cache_snapshotter():
+    """Restore the last cache snapshot in the background and start periodic snapshots."""
+    cache_snapshotter.start()
+
+@app.on_event("shutdown")
+async def shutdown_cache_snapshotter():
+    """Write a final cache snapshot."""
+    await cache_snapshotter.stop()
+
+# AI Chatbot dependency injection
+def get_ai_client(request: Request) -> DeepSeek:
+    """Dependency for getting the shared AI client instance."""
+    client = getattr(request.app.state, "ai_client", None)
+    if client is None:
         raise HTTPException(status_code=500, detail="Failed to initialize AI service")
+    return client
+
+# Helper to start the latency budget of an AI endpoint call
+def endpoint_deadline(endpoint: str, background: bool = False) -> Deadline:
+    """Create the deadline for one call of the named endpoint.
+    
+    Background jobs have no client waiting on the connection and get the
+    longer job latency budget.
+    """
+    if background:
+        return Deadline(settings.AI_JOBS_LATENCY_BUDGET)
+    budget = settings.AI_ENDPOINT_LATENCY_BUDGETS.get(endpoint, settings.AI_LATENCY_BUDGET)
+    return Deadline(budget)
 
 # Helper function to find a user profile
 def find_user_profile(user_id: str) -> Dict[str, Any]:
     """Find a user profile by user_id"""
-    return next((user for user in user_profiles if user['user_id'] == user_id), None)
+    return repository.users.get(user_id)
+
+# Helpers for Server-Sent-Events streaming of AI responses
+def wants_event_stream(request: Optional[Request]) -> bool:
+    """Whether the client asked for a text/event-stream response."""
+    return request is not None and "text/event-stream" in request.headers.get("accept", "")
+
+# Helpers for running AI endpoints as background jobs
+def wants_async_job(request: Optional[Request]) -> bool:
+    """Whether the client asked to get a job ID back instead of waiting."""
+    return request is not None and "respond-async" in request.headers.get("prefer", "")
+
+def submit_ai_job(kind: str, request: BaseModel) -> JSONResponse:
+    """Queue an AI endpoint call and answer 202 with the job to poll."""
+    job = job_queue.submit(kind, request.dict())
+    status_url = f"/api/jobs/{job['job_id']}"
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job["job_id"], "status": job["status"], "status_url": status_url},
+        headers={"Location": status_url}
+    )
+
+def _endpoint_job(endpoint, request_model):
+    """Wrap an AI endpoint as a job handler taking the request body as params.
+    
+    The endpoint runs without an HTTP request, so it neither streams nor
+    queues another job, and its HTTP errors become job errors.
+    """
+    async def run(params: Dict[str, Any]) -> Any:
+        ai_client = getattr(app.state, "ai_client", None)
+        if ai_client is None:
+            raise JobError("Failed to initialize AI service", 500)
+        try:
+            return await endpoint(request_model(**params), None, ai_client)
+        except HTTPException as e:
+            raise JobError(str(e.detail), e.status_code)
+    return run
+
+def _prewarm_generator(
+    endpoint,
+    request_model,
+    id_field: str,
+    endpoint_name: str,
+    entity_type: str,
+    nothing_to_cache: Optional[Callable[[Any], bool]] = None
+):
+    """Wrap an AI endpoint as a prewarm generator taking one entity ID.
+    
+    Endpoints answer with fallback or error text when generation fails, so
+    the generator fails up front when the circuit is not closed, and fails
+    afterwards unless the entity's response is now in the cache.
+    
+    Args:
+        endpoint: AI endpoint function.
+        request_model: Request body model of the endpoint.
+        id_field: Field of the request body holding the entity ID.
+        endpoint_name: Endpoint name, for its cache policy namespace.
+        entity_type: Prefix of the entity's cache tag, e.g. 'ticket'.
+        nothing_to_cache: Whether a result legitimately has no AI response.
+    """
+    run = _endpoint_job(endpoint, request_model)
+    namespace = cache_policy_for(endpoint_name).namespace
+    async def generate(entity_id: str) -> Any:
+        ai_client = getattr(app.state, "ai_client", None)
+        if ai_client is not None and ai_client.get_stats()["circuit_breaker"]["state"] != CIRCUIT_CLOSED:
+            raise JobError("AI service unavailable", 503)
+        result = await run({id_field: entity_id})
+        if nothing_to_cache is not None and nothing_to_cache(result):
+            return result
+        if not response_cache.has_fresh(f"{entity_type}:{entity_id}", namespace):
+            raise JobError("AI response was not generated", 502)
+        return result
+    return generate
+
+def _prewarm_refresh_after(endpoint_name: str) -> float:
+    """Seconds until a pre-generated response of the endpoint expires."""
+    ttl = cache_policy_for(endpoint_name).ttl
+    return ttl if ttl is not None else response_cache.ttl
+
+def _sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format a single SSE event with a JSON payload."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def stream_ai_response(
+    chunks: AsyncIterator[str],
+    meta: Optional[Dict[str, Any]] = None,
+    fallback_text: Optional[str] = None
+) -> StreamingResponse:
+    """Forward AI response chunks to the client as Server-Sent Events.
+    
+    Emits an optional "meta" event with the non-AI part of the response,
+    one unnamed event per chunk ({"delta": ...}) and a final "done" event.
+    If generation fails, fallback_text is sent as a delta when given,
+    otherwise an "error" event is emitted.
+    """
+    async def event_source():
+        if meta is not None:
+            yield _sse_event(meta, "meta")
+        try:
+            async for chunk in chunks:
+                yield _sse_event({"delta": chunk})
+        except Exception as e:
+            logger.error(f"Error while streaming AI response: {str(e)}")
+            if fallback_text is not None:
+                yield _sse_event({"delta": fallback_text})
+            else:
+                yield _sse_event({"detail": f"AI service error: {str(e)}"}, "error")
+        yield _sse_event({}, "done")
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Middleware for request timing and logging
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     start_time = time.time()
+    served_staleness = track_staleness()
     response = await call_next(request)
     process_time = time.time() - start_time
     response.headers["X-Process-Time"] = str(process_time)
+    # Seconds past expiry of the stalest cached AI response in the body. Streamed
+    # bodies read the cache after the headers are sent and never get it.
+    if served_staleness:
+        response.headers["X-Cache-Stale"] = str(math.ceil(max(served_staleness)))
     logger.info(f"Request to {request.url.path} processed in {process_time:.4f} seconds")
     return response
 
@@ -104,13 +351,20 @@ async def deepseek_error_handler(request: Request, exc: DeepSeekAPIError):
 @app.post("/api/create/star-summary")
 async def generate_star_summary(
     request: STARRequest, 
+    http_request: Request,
     ai_client: DeepSeek = Depends(get_ai_client)
 ):
-    """Generate STAR format summary for a completed JIRA ticket"""
+    """Generate STAR format summary for a completed JIRA ticket.
+    
+    Streams the summary as Server-Sent Events when the client sends
+    Accept: text/event-stream, or queues a background job when it sends
+    Prefer: respond-async.
+    """
     logger.info(f"STAR summary requested for ticket: {request.ticket_id}")
+    deadline = endpoint_deadline("star_summary", background=http_request is None)
     
     # Find the ticket
-    ticket = next((t for t in jira_tickets if t['ticket_id'] == request.ticket_id), None)
+    ticket = repository.tickets.get(request.ticket_id)
     if not ticket:
         logger.error(f"Ticket not found: {request.ticket_id}")
         raise HTTPException(status_code=404, detail="Ticket not found")
@@ -120,44 +374,37 @@ async def generate_star_summary(
         logger.warning(f"Attempt to generate STAR summary for incomplete ticket: {request.ticket_id}")
         raise HTTPException(status_code=400, detail="STAR summaries can only be generated for completed tickets")
     
+    if wants_async_job(http_request):
+        return submit_ai_job("star_summary", request)
+    
     # Prepare prompt for STAR summary
-    prompt = f"""Generate a professional STAR (Situation, Task, Action, Result) format summary for this completed work ticket:
-
-TICKET INFORMATION:
-- ID: {ticket['ticket_id']}
-- Title: {ticket['title']}
-- Description: {ticket['description']}
-- Priority: {ticket['priority']}
-- Started: {ticket['start_date']}
-- Completed: {ticket['completion_date']}
-
-COMMENTS:
-{' '.join([f"- {c['user']}: {c['text']}" for c in ticket.get('comments', [])])}
-
-ADDITIONAL CONTEXT PROVIDED BY USER:
-{request.additional_context or 'No additional context provided.'}
-
-Format your response in clear STAR format with these sections:
-1. Situation: Describe the context and background
-2. Task: Explain what needed to be accomplished and why
-3. Action: Detail the specific steps you took to complete the task
-4. Result: Highlight the outcomes, focusing on measurable impacts and what was learned
-
-Keep your summary professional, focused on achievements, and suitable for use in performance reviews or job interviews.
-"""
+    prompt = prompt_registry.get("star_summary")
+    messages = build_star_messages(ticket, request.additional_context)
+    cache_scope = star_cache_scope(ticket, request.additional_context)
     
     try:
-        # Set a system prompt specific to STAR format
-        system_prompt = """You are a professional career coach specializing in creating STAR format summaries. 
-        You transform work accomplishments into compelling, achievement-focused narratives that highlight skills and impact.
-        Your summaries are well-structured, concise, and emphasize measurable results and valuable skills demonstrated."""
+        if wants_event_stream(http_request):
+            chunks = await ai_client.chat(
+                messages=messages,
+                temperature=0.4,
+                use_cache=True,
+                stream=True,
+                deadline=deadline,
+                endpoint_name=prompt.name,
+                prompt_version=prompt.key,
+                cache_scope=cache_scope
+            )
+            return stream_ai_response(chunks)
         
         # Use the improved client with better error handling and caching
-        star_summary = ai_client.get_response(
-            user_input=prompt,
-            system_prompt=system_prompt,
+        star_summary = await ai_client.chat(
+            messages=messages,
             temperature=0.4,  # Lower temperature for more focused/professional responses
-            use_cache=True    # Enable caching for STAR summaries
+            use_cache=True,   # Enable caching for STAR summaries
+            deadline=deadline,
+            endpoint_name=prompt.name,
+            prompt_version=prompt.key,
+            cache_scope=cache_scope
         )
         
         # Log successful generation
@@ -167,46 +414,131 @@ Keep your summary professional, focused on achievements, and suitable for use in
     except Exception as e:
         logger.error(f"Error generating STAR summary for ticket {request.ticket_id}: {str(e)}")
         # Provide a more specific error message based on the exception type
+        if isinstance(e, DeepSeekDeadlineError):
+            raise HTTPException(status_code=504, detail=f"AI service timed out: {str(e)}")
         if isinstance(e, DeepSeekAPIError):
             raise HTTPException(status_code=503, detail=f"AI service error: {str(e)}")
         else:
             raise HTTPException(status_code=500, detail=f"Failed to generate STAR summary: {str(e)}")
         
 
+@app.post("/api/create/star-summaries")
+async def generate_star_summaries(
+    request: BulkSTARRequest,
+    ai_client: DeepSeek = Depends(get_ai_client)
+):
+    """Generate STAR summaries for many tickets, streamed back as NDJSON.
+    
+    Takes explicit ticket IDs, or all completed tickets of an assignee.
+    Summaries are generated concurrently under a cap and each one is written
+    as a JSON line as soon as it is ready, in completion order. Cached
+    summaries come back immediately.
+    """
+    if request.ticket_ids:
+        ticket_ids = list(dict.fromkeys(request.ticket_ids))
+        tickets = repository.tickets.get_many(ticket_ids)
+    elif request.assignee:
+        tickets = repository.tickets.find(assignee=request.assignee, status='Completed')
+        ticket_ids = [t['ticket_id'] for t in tickets]
+    else:
+        raise HTTPException(status_code=400, detail="Provide ticket_ids or an assignee")
+    
+    if len(ticket_ids) > settings.STAR_BULK_MAX_TICKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.STAR_BULK_MAX_TICKETS} tickets can be summarized per request"
+        )
+    
+    concurrency = request.concurrency or settings.STAR_BULK_CONCURRENCY
+    semaphore = asyncio.Semaphore(concurrency)
+    prompt = prompt_registry.get("star_summary")
+    logger.info(f"Bulk STAR summaries requested for {len(ticket_ids)} tickets (concurrency={concurrency})")
+    
+    async def summarize(ticket_id: str, ticket: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if not ticket:
+            return {"ticket_id": ticket_id, "error": "Ticket not found"}
+        if ticket.get('status') != 'Completed':
+            return {"ticket_id": ticket_id, "error": "STAR summaries can only be generated for completed tickets"}
+        
+        async with semaphore:
+            try:
+                star_summary = await ai_client.chat(
+                    messages=build_star_messages(ticket),
+                    temperature=0.4,
+                    use_cache=True,
+                    deadline=endpoint_deadline("star_summary"),
+                    endpoint_name=prompt.name,
+                    prompt_version=prompt.key,
+                    cache_scope=star_cache_scope(ticket)
+                )
+                return {"ticket_id": ticket_id, "star_summary": star_summary}
+            except Exception as e:
+                logger.error(f"Error generating STAR summary for ticket {ticket_id}: {str(e)}")
+                return {"ticket_id": ticket_id, "error": f"AI service error: {str(e)}"}
+    
+    async def ndjson_lines():
+        tasks = [
+            asyncio.ensure_future(summarize(ticket_id, ticket))
+            for ticket_id, ticket in zip(ticket_ids, tickets)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            # Stop outstanding work if the client went away
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
 @app.post("/api/create/documentation")
 async def get_documentation(
     request: DocumentationRequest, 
+    http_request: Request,
     ai_client: DeepSeek = Depends(get_ai_client)
 ):
-    """Retrieve relevant documentation based on query"""
+    """Retrieve relevant documentation based on query.
+    
+    Queues a background job when the client sends Prefer: respond-async.
+    """
+    if wants_async_job(http_request):
+        return submit_ai_job("documentation", request)
+    
+    deadline = endpoint_deadline("documentation", background=http_request is None)
+    
     # Search through company documentation
-    relevant_docs = [
-        doc for doc in company_documentation 
-        if any(
-            keyword.lower() in request.query.lower() 
-            for keyword in doc.get('keywords', [])
-        )
-    ]
+    relevant_docs = match_documents(request.query, repository.documents.all())
     
     # Use AI to provide context
     if relevant_docs:
-        doc_context = " ".join([
-            f"Document {doc['doc_id']}: {doc['title']} - {doc['content_summary']}" 
-            for doc in relevant_docs
-        ])
-        
-        prompt = f"""Help interpret the following documentation relevant to the query: '{request.query}'
+        # Fit the query and as many matched documents as the prompt budget allows
+        context_budget = prompt_token_budget("documentation")
+        query = truncate_to_tokens(request.query, context_budget // 4)
+        doc_context = "\n".join(fit_items(
+            [
+                f"Document {doc['doc_id']}: {doc['title']} - {doc['content_summary']}" 
+                for doc in relevant_docs
+            ],
+            context_budget - estimate_tokens(query)
+        ))
         
-        Relevant Documents:
-        {doc_context}
-        
-        Provide a clear, concise explanation and guidance."""
+        prompt = prompt_registry.get("documentation")
+        cache_scope = CacheScope(
+            [f"doc:{doc['doc_id']}" for doc in relevant_docs],
+            {
+                "query": compact_whitespace(query),
+                "documents": [entity_fields(doc, ['title', 'content_summary']) for doc in relevant_docs]
+            }
+        )
         
         try:
-            ai_explanation = ai_client.get_response(
-                user_input=prompt,
-                system_prompt="You are a helpful documentation assistant who provides clear and accurate explanations.",
-                temperature=0.3  # Lower temperature for factual responses
+            ai_explanation = await ai_client.chat(
+                messages=prompt.render(query=query, documents=doc_context),
+                temperature=0.3,  # Lower temperature for factual responses
+                deadline=deadline,
+                endpoint_name=prompt.name,
+                prompt_version=prompt.key,
+                cache_scope=cache_scope
             )
             return {
                 "documents": relevant_docs,
@@ -214,10 +546,50 @@ async def get_documentation(
             }
         except Exception as e:
             logger.error(f"Error generating AI explanation: {str(e)}")
-            ai_explanation = "Unable to generate AI explanation due to an error."
+            # Still return the matched documents even if the explanation fails
+            return {
+                "documents": relevant_docs,
+                "ai_explanation": "Unable to generate AI explanation due to an error."
+            }
     
     return {"documents": relevant_docs, "ai_explanation": "No directly relevant documentation found."}
 
+@app.get("/api/documentation/search")
+async def search_documentation(query: str, http_request: Request):
+    """List the documents matching a query, without an AI explanation.
+    
+    Deterministic, so it carries an ETag and answers If-None-Match with 304.
+    """
+    # Matching is case-insensitive, so the ETag is too
+    etag = make_etag(repository.documents.version, "documentation/search", query.lower())
+    async def build() -> Dict[str, Any]:
+        return {"documents": match_documents(query, repository.documents.all())}
+    return await conditional_response(
+        http_request, etag, build, f"public, max-age={settings.HTTP_CACHE_MAX_AGE}"
+    )
+
+@app.get("/api/connect/recommendations")
+async def get_connection_recommendations_conditional(user_id: str, http_request: Request):
+    """Provide connection and learning recommendations, with ETag revalidation.
+    
+    Answers If-None-Match with 304 without recomputing the recommendations.
+    """
+    # An unknown user has no representation to revalidate, even for If-None-Match: *
+    if find_user_profile(user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    etag = make_etag(
+        repository.users.version,
+        repository.learning_materials.version,
+        "connect/recommendations",
+        user_id
+    )
+    return await conditional_response(
+        http_request,
+        etag,
+        lambda: get_connection_recommendations(ConnectionRecommendationRequest(user_id=user_id)),
+        f"private, max-age={settings.HTTP_CACHE_MAX_AGE}, must-revalidate"
+    )
+
 @app.post("/api/connect/recommendations")
 async def get_connection_recommendations(request: ConnectionRecommendationRequest):
     """Provide connection and learning recommendations"""
@@ -226,144 +598,75 @@ async def get_connection_recommendations(request: ConnectionRecommendationReques
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Find potential connections with similar skills/interests
-    # Improved algorithm to find better matches
-    potential_connections = []
-    
-    for profile in user_profiles:
-        if profile['user_id'] != user['user_id']:
-            # Calculate skill overlap
-            skill_overlap = set(profile['skills']) & set(user.get('skills', []))
-            # Calculate interest overlap
-            interest_overlap_1 = set(profile['skills']) & set(user.get('interests', []))
-            interest_overlap_2 = set(profile['interests']) & set(user['skills'])
-            # Calculate desired skills overlap (for learning from others)
-            desired_skills_overlap = set(profile['skills']) & set(user.get('desired_skills', []))
-            
-            # Calculate a match score
-            match_score = (
-                len(skill_overlap) * 2 +      # Weight skill matches higher
-                len(interest_overlap_1) +
-                len(interest_overlap_2) +
-                len(desired_skills_overlap) * 1.5  # Weight desired skills matches
-            )
-            
-            # Only include if there's at least some overlap
-            if match_score > 0:
-                potential_connections.append({
-                    **profile,
-                    "match_score": match_score,
-                    "match_reason": _generate_match_reason(
-                        skill_overlap, 
-                        interest_overlap_1 | interest_overlap_2,
-                        desired_skills_overlap
-                    )
-                })
-    
-    # Sort by match score (highest first) and take top results
-    potential_connections.sort(key=lambda x: x.get('match_score', 0), reverse=True)
+    # Find potential connections with similar skills/interests, best match first
+    potential_connections = score_connections(user, repository.connection_candidates(user))
     
     # Find learning materials to close skill gaps
-    desired_skills = user.get('desired_skills', [])
-    recommended_learning = [
-        material for material in learning_materials
-        if any(skill.lower() in [m.lower() for m in material['skills']] 
-               for skill in desired_skills)
-    ]
+    recommended_learning = match_learning_materials(user.get('desired_skills', []), repository.learning_materials.all())
     
     return {
         "potential_connections": potential_connections,
         "recommended_learning": recommended_learning
     }
 
-def _generate_match_reason(skill_overlap, interest_overlap, desired_skills_overlap):
-    """Generate a human-readable reason for the match"""
-    reasons = []
-    
-    if skill_overlap:
-        if len(skill_overlap) == 1:
-            reasons.append(f"Both know {list(skill_overlap)[0]}")
-        else:
-            reasons.append(f"Both know {len(skill_overlap)} common skills")
-    
-    if interest_overlap:
-        if len(interest_overlap) == 1:
-            reasons.append(f"Shares your interest in {list(interest_overlap)[0]}")
-        else:
-            reasons.append(f"Shares {len(interest_overlap)} of your interests")
-    
-    if desired_skills_overlap:
-        if len(desired_skills_overlap) == 1:
-            reasons.append(f"Can help you learn {list(desired_skills_overlap)[0]}")
-        else:
-            reasons.append(f"Has {len(desired_skills_overlap)} skills you want to learn")
-    
-    return ", ".join(reasons)
-
 @app.post("/api/elevate/job-recommendations")
 async def get_job_recommendations(
     request: ConnectionRecommendationRequest, 
+    http_request: Request,
     ai_client: DeepSeek = Depends(get_ai_client)
 ):
-    """Provide job recommendations based on user profile with DeepSeek AI insights"""
+    """Provide job recommendations based on user profile with DeepSeek AI insights.
+    
+    Streams the AI insights as Server-Sent Events when the client sends
+    Accept: text/event-stream; the matched jobs arrive first in a "meta" event.
+    Queues a background job when the client sends Prefer: respond-async.
+    """
+    deadline = endpoint_deadline("job_recommendations", background=http_request is None)
+    
     # Find the user
     user = find_user_profile(request.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    if wants_async_job(http_request):
+        return submit_ai_job("job_recommendations", request)
+    
     # AI-powered job recommendation matching
-    matched_jobs = [
-        job for job in job_postings
-        if (not job.get('internal_only', False) and 
-            any(skill.lower() in ' '.join(job['requirements']).lower() 
-                for skill in user['skills']))
-    ]
+    matched_jobs = match_jobs(user, repository.jobs.all())
     
     # Use DeepSeek AI to refine recommendations
     if matched_jobs:
-        # Build detailed context for the AI
-        user_context = f"""
-        User: {user['name']}
-        Current Role: {user['role']}
-        Department: {user['department']}
-        Experience: {user['experience']} years
-        Current Skills: {', '.join(user['skills'])}
-        Desired Skills: {', '.join(user.get('desired_skills', []))}
-        Interests: {', '.join(user.get('interests', []))}
-        """
-        
-        jobs_context = "\n".join([
-            f"Job {i+1}: {job['title']} in {job['department']} - {job['location']}\n" +
-            f"Requirements: {', '.join(job['requirements'])}\n" +
-            f"Preferred Skills: {', '.join(job.get('preferred_skills', []))}\n" +
-            f"Description: {job['description']}\n" +
-            f"Salary Range: {job.get('salary_range', 'Not specified')}"
-            for i, job in enumerate(matched_jobs[:5])  # Limit to 5 jobs for context length
-        ])
+        # Static instructions first, per-user data last; best-matching jobs first
+        prompt = prompt_registry.get("job_recommendations")
+        ranked_jobs = rank_jobs(user, matched_jobs)
+        messages = build_job_recommendation_messages(user, ranked_jobs)
+        cache_scope = job_recommendation_cache_scope(user, ranked_jobs)
         
-        prompt = f"""As a career coach, analyze these job recommendations for {user['name']}.
-
-USER PROFILE:
-{user_context}
-
-JOB MATCHES:
-{jobs_context}
-
-Provide personalized career insights about these job opportunities. Focus on:
-1. How well each role aligns with the user's current skills
-2. How these opportunities could help develop their desired skills
-3. Which roles are the best match and why
-4. Any specific career growth opportunities these roles present
-
-Keep your analysis concise, practical, and focused on the user's career development.
-"""
+        if wants_event_stream(http_request):
+            chunks = await ai_client.chat(
+                messages=messages,
+                temperature=0.7,
+                stream=True,
+                deadline=deadline,
+                endpoint_name=prompt.name,
+                prompt_version=prompt.key,
+                cache_scope=cache_scope
+            )
+            return stream_ai_response(
+                chunks,
+                meta={"recommended_jobs": matched_jobs},
+                fallback_text="Unable to generate personalized insights at this time. Please try again later."
+            )
         
         try:
             # Call DeepSeek API for personalized insights
-            ai_recommendations = ai_client.get_response(
-                user_input=prompt,
-                system_prompt="You are a career coach specializing in job recommendations and career development.",
-                temperature=0.7
+            ai_recommendations = await ai_client.chat(
+                messages=messages,
+                temperature=0.7,
+                deadline=deadline,
+                endpoint_name=prompt.name,
+                prompt_version=prompt.key,
+                cache_scope=cache_scope
             )
             
             return {
@@ -381,30 +684,70 @@ Keep your analysis concise, practical, and focused on the user's career developm
             }
     
     # Handle case with no matching jobs
-    return {"recommended_jobs": matched_jobs, "ai_recommendations": "No suitable job matches found based on your profile."}
+    no_match_message = "No suitable job matches found based on your profile."
+    if wants_event_stream(http_request):
+        return stream_ai_response(
+            replay_chunks(no_match_message),
+            meta={"recommended_jobs": matched_jobs}
+        )
+    return {"recommended_jobs": matched_jobs, "ai_recommendations": no_match_message}
 @app.post("/api/create/mood-check")
 async def submit_mood_check(
     request: MoodCheckRequest, 
+    http_request: Request,
     ai_client: DeepSeek = Depends(get_ai_client)
 ):
-    """Submit mood check and feedback"""
+    """Submit mood check and feedback.
+    
+    Streams the AI insight as Server-Sent Events when the client sends
+    Accept: text/event-stream, or queues a background job when it sends
+    Prefer: respond-async.
+    """
+    deadline = endpoint_deadline("mood_check", background=http_request is None)
+    
     # Validate mood input
     valid_moods = ["great", "good", "okay", "stressed", "overwhelmed"]
     if request.mood.lower() not in valid_moods:
         raise HTTPException(status_code=400, detail=f"Invalid mood. Valid options are: {', '.join(valid_moods)}")
     
+    if wants_async_job(http_request):
+        return submit_ai_job("mood_check", request)
+    
     # Here you would typically save to a database
     # For now, we'll use AI to provide some insights
-    prompt = f"""User's mood: {request.mood}
-    Feedback: {request.feedback or 'No additional feedback'}
+    feedback = truncate_to_tokens(request.feedback or 'No additional feedback', prompt_token_budget("mood_check"))
+    prompt = prompt_registry.get("mood_check")
+    messages = prompt.render(mood=request.mood, feedback=feedback)
+    # Personal feedback is neither served from nor kept in the shared cache
+    cache_policy = NO_CACHE if request.feedback else None
+    cache_scope = CacheScope([], {"mood": request.mood, "feedback": feedback})
     
-    Provide a supportive and constructive response that acknowledges the user's feelings and offers positive guidance."""
+    if wants_event_stream(http_request):
+        chunks = await ai_client.chat(
+            messages=messages,
+            temperature=0.7,
+            stream=True,
+            deadline=deadline,
+            endpoint_name=prompt.name,
+            prompt_version=prompt.key,
+            cache_policy=cache_policy,
+            cache_scope=cache_scope
+        )
+        return stream_ai_response(
+            chunks,
+            meta={"mood": request.mood, "feedback": request.feedback},
+            fallback_text="Thank you for sharing. Your feelings are valid, and it's great that you're taking time for self-reflection."
+        )
     
     try:
-        ai_insight = ai_client.get_response(
-            user_input=prompt,
-            system_prompt="You are an empathetic career coach who provides supportive guidance.",
-            temperature=0.7
+        ai_insight = await ai_client.chat(
+            messages=messages,
+            temperature=0.7,
+            deadline=deadline,
+            endpoint_name=prompt.name,
+            prompt_version=prompt.key,
+            cache_policy=cache_policy,
+            cache_scope=cache_scope
         )
         
         return {
@@ -420,20 +763,107 @@ async def submit_mood_check(
             "ai_insight": "Thank you for sharing. Your feelings are valid, and it's great that you're taking time for self-reflection."
         }
 
+# Endpoint to poll or long-poll a background AI job
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Get a background job's status and result.
+    
+    With wait > 0 the request is held until the job finishes or wait seconds
+    pass, capped at AI_JOBS_MAX_WAIT.
+    """
+    job = await job_queue.wait(job_id, min(wait, settings.AI_JOBS_MAX_WAIT))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {key: value for key, value in job.items() if key != "params"}
+
+# Endpoint to get background job queue statistics
+@app.get("/api/admin/job-stats")
+async def get_job_stats():
+    """Get background job counts by status and the queue depth"""
+    return job_queue.get_stats()
+
+# Endpoints to inspect and trigger the off-peak prewarm scheduler
+@app.get("/api/admin/prewarm-stats")
+async def get_prewarm_stats():
+    """Get prewarm run counters and warm entity counts"""
+    return prewarm_scheduler.get_stats()
+
+@app.post("/api/admin/prewarm")
+async def run_prewarm():
+    """Pre-generate all content that is not warm yet, regardless of the hour"""
+    return await prewarm_scheduler.run_once()
+
 # Endpoint to get cache statistics
 @app.get("/api/admin/cache-stats", response_model=CacheStatsResponse)
 async def get_cache_stats():
     """Get cache statistics for monitoring"""
     stats = response_cache.get_stats()
+    stats["snapshot"] = cache_snapshotter.get_stats()
     return stats
 
+# Endpoint to get upstream traffic control statistics
+@app.get("/api/admin/upstream-stats")
+async def get_upstream_stats(ai_client: DeepSeek = Depends(get_ai_client)):
+    """Get DeepSeek concurrency limiter and request coalescing statistics"""
+    return ai_client.get_stats()
+
+# Endpoint to get token usage per endpoint
+@app.get("/api/admin/token-usage")
+async def get_token_usage():
+    """Get prompt size, token usage and latency per AI endpoint"""
+    return token_usage.get_stats()
+
+# Endpoint to list the registered prompt templates
+@app.get("/api/admin/prompts")
+async def list_prompts():
+    """List prompt template names and their registered versions"""
+    return prompt_registry.list()
+
+# Endpoint to list the hottest or largest cache entries
+@app.get("/api/admin/cache/keys")
+async def list_cache_keys(order: str = "hottest", limit: int = 20):
+    """List the cache entries with the most hits (hottest) or bytes (largest)"""
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    try:
+        return {"order": order, "entries": response_cache.top_entries(order, min(limit, 500))}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Endpoint to inspect one cache entry
+@app.get("/api/admin/cache/entry")
+async def get_cache_entry(key: str, include_response: bool = False):
+    """Get the metadata of a cache entry, optionally with the cached response"""
+    entry = response_cache.describe(key, include_response)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Cache entry not found")
+    return entry
+
 # Endpoint to clear the cache
 @app.post("/api/admin/clear-cache")
-async def clear_cache():
-    """Clear the response cache"""
+async def clear_cache(namespace: Optional[str] = None, prefix: Optional[str] = None):
+    """Clear the response cache, or only one namespace or key prefix of it"""
+    if namespace is not None and prefix is not None:
+        raise HTTPException(status_code=400, detail="Provide either namespace or prefix, not both")
+    if namespace is not None:
+        return {"namespace": namespace, "cleared": response_cache.clear_namespace(namespace)}
+    if prefix is not None:
+        try:
+            return {"prefix": prefix, "cleared": response_cache.clear_prefix(prefix)}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     response_cache.clear()
     return {"message": "Cache cleared successfully"}
 
+# Endpoint to invalidate the cached responses built from given entities
+@app.post("/api/admin/invalidate-cache")
+async def invalidate_cache(request: CacheInvalidationRequest):
+    """Drop every cached response built from any of the tagged entities"""
+    if not request.tags:
+        raise HTTPException(status_code=400, detail="Provide at least one tag")
+    invalidated = response_cache.invalidate_tags(request.tags)
+    return {"tags": request.tags, "invalidated": invalidated}
+
 # Root endpoint for health check
 @app.get("/")
 async def root():
@@ -447,12 +877,14 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
+    ai_client = getattr(app.state, "ai_client", None)
     return {
         "status": "healthy",
         "api_version": "1.0.0",
         "environment": settings.APP_ENV,
         "cache_enabled": response_cache.enabled,
-        "deepseek_configured": bool(settings.DEEPSEEK_API_KEY)
+        "deepseek_configured": bool(settings.DEEPSEEK_API_KEY),
+        "deepseek_circuit": ai_client.get_stats()["circuit_breaker"]["state"] if ai_client else None
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+# backend/matching.py
+from typing import Any, Dict, List
+
+def score_connections(user: Dict[str, Any], profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Score other profiles as potential connections for a user.
+
+    Args:
+        user: Profile of the user asking for connections.
+        profiles: Candidate profiles; the user's own profile is skipped.
+
+    Returns:
+        Profiles with some overlap, with match_score and match_reason added,
+        best match first.
+    """
+    potential_connections = []
+
+    for profile in profiles:
+        if profile['user_id'] != user['user_id']:
+            # Calculate skill overlap
+            skill_overlap = set(profile['skills']) & set(user.get('skills', []))
+            # Calculate interest overlap
+            interest_overlap_1 = set(profile['skills']) & set(user.get('interests', []))
+            interest_overlap_2 = set(profile['interests']) & set(user['skills'])
+            # Calculate desired skills overlap (for learning from others)
+            desired_skills_overlap = set(profile['skills']) & set(user.get('desired_skills', []))
+
+            # Calculate a match score
+            match_score = (
+                len(skill_overlap) * 2 +      # Weight skill matches higher
+                len(interest_overlap_1) +
+                len(interest_overlap_2) +
+                len(desired_skills_overlap) * 1.5  # Weight desired skills matches
+            )
+
+            # Only include if there's at least some overlap
+            if match_score > 0:
+                potential_connections.append({
+                    **profile,
+                    "match_score": match_score,
+                    "match_reason": generate_match_reason(
+                        skill_overlap,
+                        interest_overlap_1 | interest_overlap_2,
+                        desired_skills_overlap
+                    )
+                })
+
+    # Sort by match score (highest first)
+    potential_connections.sort(key=lambda x: x.get('match_score', 0), reverse=True)
+    return potential_connections
+
+def generate_match_reason(skill_overlap, interest_overlap, desired_skills_overlap):
+    """Generate a human-readable reason for the match"""
+    reasons = []
+
+    if skill_overlap:
+        if len(skill_overlap) == 1:
+            reasons.append(f"Both know {list(skill_overlap)[0]}")
+        else:
+            reasons.append(f"Both know {len(skill_overlap)} common skills")
+
+    if interest_overlap:
+        if len(interest_overlap) == 1:
+            reasons.append(f"Shares your interest in {list(interest_overlap)[0]}")
+        else:
+            reasons.append(f"Shares {len(interest_overlap)} of your interests")
+
+    if desired_skills_overlap:
+        if len(desired_skills_overlap) == 1:
+            reasons.append(f"Can help you learn {list(desired_skills_overlap)[0]}")
+        else:
+            reasons.append(f"Has {len(desired_skills_overlap)} skills you want to learn")
+
+    return ", ".join(reasons)
+
+def match_learning_materials(desired_skills: List[str], materials: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Find learning materials that teach any of the desired skills"""
+    return [
+        material for material in materials
+        if any(skill.lower() in [m.lower() for m in material['skills']]
+               for skill in desired_skills)
+    ]
+
+def match_documents(query: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Find documents with a keyword contained in the query"""
+    return [
+        doc for doc in documents
+        if any(
+            keyword.lower() in query.lower()
+            for keyword in doc.get('keywords', [])
+        )
+    ]
+
+def match_jobs(user: Dict[str, Any], jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Find public jobs whose requirements mention any of the user's skills"""
+    return [
+        job for job in jobs
+        if (not job.get('internal_only', False) and
+            any(skill.lower() in ' '.join(job['requirements']).lower()
+                for skill in user['skills']))
+    ]
+
+def rank_jobs(user: Dict[str, Any], jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Order jobs by how many of the user's skills their requirements mention"""
+    user_skills = [skill.lower() for skill in user['skills']]
+    return sorted(
+        jobs,
+        key=lambda job: sum(skill in ' '.join(job['requirements']).lower() for skill in user_skills),
+        reverse=True
+    )
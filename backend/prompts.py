@@ -0,0 +1,309 @@
+# backend/prompts.py
+from typing import Any, Dict, List, Optional
+import logging
+
+from cache import CacheScope, entity_fields
+from tokens import (
+    compact_whitespace,
+    estimate_tokens,
+    truncate_to_tokens,
+    fit_items,
+    prompt_token_budget
+)
+
+logger = logging.getLogger("prompts")
+
+class PromptTemplate:
+    """A named, versioned prompt split into a static prefix and per-request data.
+
+    Rendered messages always start with the static text - the system prompt and
+    the instructions - and end with the per-request context. Requests for the
+    same template therefore share the longest possible prefix, which DeepSeek's
+    context caching can reuse. Bump the version whenever the text changes.
+    """
+
+    def __init__(self, name: str, version: int, system: str, instructions: str, context: str):
+        """Initialize a prompt template.
+
+        Args:
+            name: Template name, usually the endpoint it serves.
+            version: Template version, part of the response cache key.
+            system: Static system prompt.
+            instructions: Static task instructions, sent before the data.
+            context: Format string for the per-request data, sent last.
+        """
+        self.name = name
+        self.version = version
+        self.system = compact_whitespace(system)
+        self.instructions = compact_whitespace(instructions)
+        self.context = context
+
+    @property
+    def key(self) -> str:
+        """Identifier of this template version, e.g. 'star_summary@v2'."""
+        return f"{self.name}@v{self.version}"
+
+    def render(self, **values: str) -> List[Dict[str, str]]:
+        """Render the chat messages for one request.
+
+        Args:
+            values: Values for the placeholders in the context template.
+
+        Returns:
+            System and user messages, static text first.
+        """
+        context = compact_whitespace(self.context.format(**values))
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": f"{self.instructions}\n\n{context}"}
+        ]
+
+
+class PromptRegistry:
+    """Registry of prompt templates by name and version."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._templates: Dict[str, Dict[int, PromptTemplate]] = {}
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        """Add a template version to the registry.
+
+        Args:
+            template: Template to register.
+
+        Returns:
+            The registered template.
+
+        Raises:
+            ValueError: If this name and version are already registered.
+        """
+        versions = self._templates.setdefault(template.name, {})
+        if template.version in versions:
+            raise ValueError(f"Prompt {template.key} is already registered")
+        versions[template.version] = template
+        return template
+
+    def get(self, name: str, version: Optional[int] = None) -> PromptTemplate:
+        """Get a template, by default its latest version.
+
+        Args:
+            name: Template name.
+            version: Specific version to get.
+
+        Returns:
+            The prompt template.
+
+        Raises:
+            KeyError: If the template or version is unknown.
+        """
+        versions = self._templates[name]
+        return versions[version if version is not None else max(versions)]
+
+    def list(self) -> Dict[str, List[int]]:
+        """List registered template names with their versions."""
+        return {name: sorted(versions) for name, versions in self._templates.items()}
+
+
+# Create the global prompt registry
+prompt_registry = PromptRegistry()
+
+prompt_registry.register(PromptTemplate(
+    name="star_summary",
+    version=2,
+    system="""You are a professional career coach specializing in creating STAR format summaries.
+    You transform work accomplishments into compelling, achievement-focused narratives that highlight skills and impact.
+    Your summaries are well-structured, concise, and emphasize measurable results and valuable skills demonstrated.""",
+    instructions="""Generate a professional STAR (Situation, Task, Action, Result) format summary for the completed work ticket below.
+
+    Format your response in clear STAR format with these sections:
+    1. Situation: Describe the context and background
+    2. Task: Explain what needed to be accomplished and why
+    3. Action: Detail the specific steps you took to complete the task
+    4. Result: Highlight the outcomes, focusing on measurable impacts and what was learned
+
+    Keep your summary professional, focused on achievements, and suitable for use in performance reviews or job interviews.""",
+    context="""TICKET INFORMATION:
+    - ID: {ticket_id}
+    - Title: {title}
+    - Description: {description}
+    - Priority: {priority}
+    - Started: {start_date}
+    - Completed: {completion_date}
+
+    COMMENTS:
+    {comments}
+
+    ADDITIONAL CONTEXT PROVIDED BY USER:
+    {additional_context}"""
+))
+
+prompt_registry.register(PromptTemplate(
+    name="documentation",
+    version=2,
+    system="You are a helpful documentation assistant who provides clear and accurate explanations.",
+    instructions="""Help interpret the documentation below that is relevant to the user's query.
+    Provide a clear, concise explanation and guidance.""",
+    context="""Query: '{query}'
+
+    Relevant Documents:
+    {documents}"""
+))
+
+prompt_registry.register(PromptTemplate(
+    name="job_recommendations",
+    version=2,
+    system="You are a career coach specializing in job recommendations and career development.",
+    instructions="""As a career coach, analyze the job recommendations below for the user.
+
+    Provide personalized career insights about these job opportunities. Focus on:
+    1. How well each role aligns with the user's current skills
+    2. How these opportunities could help develop their desired skills
+    3. Which roles are the best match and why
+    4. Any specific career growth opportunities these roles present
+
+    Keep your analysis concise, practical, and focused on the user's career development.""",
+    context="""USER PROFILE:
+    {user_profile}
+
+    JOB MATCHES:
+    {jobs}"""
+))
+
+prompt_registry.register(PromptTemplate(
+    name="mood_check",
+    version=2,
+    system="You are an empathetic career coach who provides supportive guidance.",
+    instructions="""Provide a supportive and constructive response that acknowledges the user's feelings and offers positive guidance.""",
+    context="""User's mood: {mood}
+    Feedback: {feedback}"""
+))
+
+prompt_registry.register(PromptTemplate(
+    name="job_insights",
+    version=2,
+    system="""You are an expert career coach specializing in tech careers.
+    You provide insightful, balanced, and personalized career guidance based on a user's skills,
+    interests, and career goals. Your advice is practical and helps users make informed decisions
+    about job opportunities and career development.""",
+    instructions="""As a career coach, analyze the job matches below for the user.
+
+    Based on the user's current skills, desired skills, and interests, provide personalized career advice about these job opportunities. Focus on:
+
+    1. How well each position aligns with their current skills and interests
+    2. How these roles could help them develop their desired skills
+    3. Any specific growth opportunities these positions offer
+    4. Which jobs might be the best match and why
+
+    Your advice should be practical, balanced, and personalized to this user's specific situation.""",
+    context="""USER PROFILE:
+    {user_profile}
+
+    JOB MATCHES:
+    {jobs}"""
+))
+
+prompt_registry.register(PromptTemplate(
+    name="skill_plan",
+    version=2,
+    system="""You are an expert career coach specializing in professional skill development.
+    You create practical, personalized learning plans that help professionals acquire new skills efficiently.
+    Your advice is specific, actionable, and tailored to each individual's background and goals.""",
+    instructions="""As a career coach, create a personalized skill development plan for the user below.
+
+    Create a practical skill development plan that will help this user acquire the target skills. Include:
+
+    1. Specific learning resources or activities for each skill
+    2. A realistic timeline for skill acquisition
+    3. How to apply these skills in their current role
+    4. How these skills will enhance their career opportunities
+
+    Provide actionable advice that takes into account their current skill set and experience level.""",
+    context="""USER PROFILE:
+    {user_profile}
+
+    Target Skills to Develop:
+    {target_skills}"""
+))
+
+
+# Entity fields the prompts are built from; edits to other fields keep cached responses
+STAR_TICKET_FIELDS = ['title', 'description', 'priority', 'start_date', 'completion_date']
+PROFILE_FIELDS = ['name', 'role', 'department', 'experience', 'skills', 'desired_skills', 'interests']
+JOB_FIELDS = ['title', 'department', 'location', 'requirements', 'preferred_skills', 'description', 'salary_range']
+
+def build_star_messages(ticket: Dict[str, Any], additional_context: Optional[str] = None) -> List[Dict[str, str]]:
+    """Render the STAR summary prompt for a ticket within the prompt token budget"""
+    # Fit the variable parts of the ticket into the prompt budget
+    context_budget = prompt_token_budget("star_summary")
+    additional_context = truncate_to_tokens(
+        additional_context or 'No additional context provided.',
+        context_budget // 4
+    )
+    ticket_details = f"{ticket['title']} {ticket['description']}"
+    comments = fit_items(
+        [f"- {c['user']}: {c['text']}" for c in ticket.get('comments', [])],
+        context_budget - estimate_tokens(ticket_details) - estimate_tokens(additional_context)
+    )
+    
+    # Static instructions first, ticket data last
+    return prompt_registry.get("star_summary").render(
+        ticket_id=ticket['ticket_id'],
+        title=ticket['title'],
+        description=ticket['description'],
+        priority=ticket['priority'],
+        start_date=ticket['start_date'],
+        completion_date=ticket['completion_date'],
+        comments="\n".join(comments),
+        additional_context=additional_context
+    )
+
+def star_cache_scope(ticket: Dict[str, Any], additional_context: Optional[str] = None) -> CacheScope:
+    """Cache scope of a STAR summary: the ticket fields and comments it is built from"""
+    return CacheScope(
+        [f"ticket:{ticket['ticket_id']}"],
+        {
+            "ticket": entity_fields(ticket, STAR_TICKET_FIELDS),
+            "comments": [[c['user'], c['text']] for c in ticket.get('comments', [])],
+            "additional_context": additional_context
+        }
+    )
+
+def build_job_recommendation_messages(user: Dict[str, Any], ranked_jobs: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Render the job recommendations prompt, keeping as many jobs as fit the budget"""
+    # Build detailed context for the AI
+    user_context = f"""
+    User: {user['name']}
+    Current Role: {user['role']}
+    Department: {user['department']}
+    Experience: {user['experience']} years
+    Current Skills: {', '.join(user['skills'])}
+    Desired Skills: {', '.join(user.get('desired_skills', []))}
+    Interests: {', '.join(user.get('interests', []))}
+    """
+    
+    jobs_context = "\n".join(fit_items(
+        [
+            f"Job {i+1}: {job['title']} in {job['department']} - {job['location']}\n" +
+            f"Requirements: {', '.join(job['requirements'])}\n" +
+            f"Preferred Skills: {', '.join(job.get('preferred_skills', []))}\n" +
+            f"Description: {job['description']}\n" +
+            f"Salary Range: {job.get('salary_range', 'Not specified')}"
+            for i, job in enumerate(ranked_jobs)
+        ],
+        prompt_token_budget("job_recommendations") - estimate_tokens(user_context)
+    ))
+    
+    # Static instructions first, per-user data last
+    return prompt_registry.get("job_recommendations").render(user_profile=user_context, jobs=jobs_context)
+
+def job_recommendation_cache_scope(user: Dict[str, Any], ranked_jobs: List[Dict[str, Any]]) -> CacheScope:
+    """Cache scope of job recommendations: the profile fields and ranked jobs they are built from"""
+    return CacheScope(
+        [f"user:{user['user_id']}"],
+        {
+            "user": entity_fields(user, PROFILE_FIELDS),
+            "jobs": [entity_fields(job, ['job_id'] + JOB_FIELDS) for job in ranked_jobs]
+        },
+        depends_on=[f"job:{job['job_id']}" for job in ranked_jobs]
+    )
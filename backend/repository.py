@@ -0,0 +1,247 @@
+# backend/repository.py
+"""Indexed in-memory access to the datasets.
+
+Each dataset is loaded once into a Table holding its records in their
+original order, a hash index on the primary key and hash indexes on
+common lookup fields, so endpoints look records up in O(1) instead of
+scanning the list.
+"""
+import hashlib
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import logging
+
+logger = logging.getLogger("repository")
+
+Record = Dict[str, Any]
+
+def _holds(field_value: Any, value: Any) -> bool:
+    """Whether a field matches a value the way its index does: by element for lists."""
+    if isinstance(field_value, (list, tuple)):
+        return value in field_value
+    return field_value == value
+
+
+class Table:
+    """Read-only records with a primary key index and secondary indexes.
+
+    A secondary index maps each field value to the positions of the
+    records holding it; list-valued fields such as skills are indexed by
+    each of their elements. Results always come back in dataset order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        records: Iterable[Record],
+        primary_key: str,
+        indexes: Sequence[str] = (),
+        source: Optional[str] = None
+    ):
+        """Load the records and build the indexes.
+
+        Args:
+            name: Dataset name, for logging.
+            records: The dataset.
+            primary_key: Field that identifies a record; on duplicates the
+                first record wins.
+            indexes: Fields to build secondary indexes on.
+            source: File the records were loaded from, whose modification
+                time goes into the version.
+        """
+        self.name = name
+        self.primary_key = primary_key
+        self.source = source
+        self.records: List[Record] = list(records)
+        self._version: Optional[str] = None
+
+        self._by_key: Dict[Any, Record] = {}
+        self._indexes: Dict[str, Dict[Any, List[int]]] = {field: {} for field in indexes}
+        for position, record in enumerate(self.records):
+            key = record.get(primary_key)
+            if key in self._by_key:
+                logger.warning(f"Duplicate {primary_key} {key} in {name}, keeping the first record")
+            else:
+                self._by_key[key] = record
+            for field, index in self._indexes.items():
+                value = record.get(field)
+                for item in (value if isinstance(value, (list, tuple)) else (value,)):
+                    positions = index.setdefault(item, [])
+                    # A list value may repeat an element; index the record once
+                    if not positions or positions[-1] != position:
+                        positions.append(position)
+
+        logger.info(f"Loaded {len(self.records)} {name} records (indexes: {', '.join(indexes) or 'none'})")
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def version(self) -> str:
+        """Short version string of the dataset, e.g. for ETags.
+
+        Derived from the source file's modification time, the row count and
+        the primary keys rather than the full contents, and computed on
+        first use.
+        """
+        if self._version is None:
+            digest = hashlib.blake2b(digest_size=8)
+            mtime = os.path.getmtime(self.source) if self.source else None
+            digest.update(f"{self.name}:{mtime}:{len(self.records)}".encode())
+            for key in self._by_key:
+                digest.update(f"\0{key}".encode())
+            self._version = digest.hexdigest()
+        return self._version
+
+    def all(self) -> List[Record]:
+        """Get every record, in dataset order."""
+        return self.records
+
+    def get(self, key: Any) -> Optional[Record]:
+        """Get the record with the given primary key, or None."""
+        return self._by_key.get(key)
+
+    def get_many(self, keys: Iterable[Any]) -> List[Optional[Record]]:
+        """Get the records with the given primary keys, None for unknown keys."""
+        return [self._by_key.get(key) for key in keys]
+
+    def find(self, **criteria: Any) -> List[Record]:
+        """Get the records whose fields equal all of the criteria.
+
+        The smallest index bucket among the criteria is scanned and the
+        remaining criteria are checked on its records.
+
+        Args:
+            criteria: Field values, e.g. assignee='user123', status='Completed';
+                at least one field must be indexed. A list-valued field
+                matches when it contains the value.
+
+        Returns:
+            Matching records, in dataset order.
+
+        Raises:
+            ValueError: If none of the fields is indexed.
+        """
+        indexed = [field for field in criteria if field in self._indexes]
+        if not indexed:
+            raise ValueError(f"{self.name} has no index on any of: {', '.join(criteria)}")
+        field = min(indexed, key=lambda f: len(self._indexes[f].get(criteria[f], ())))
+        rest = [(f, v) for f, v in criteria.items() if f != field]
+        return [
+            record for record in (self.records[p] for p in self._indexes[field].get(criteria[field], ()))
+            if all(_holds(record.get(f), v) for f, v in rest)
+        ]
+
+    def find_any(self, criteria: Dict[str, Iterable[Any]]) -> List[Record]:
+        """Get the records where any indexed field holds any of its values.
+
+        Args:
+            criteria: Values to look up per indexed field, e.g.
+                {'skills': ['Python', 'AWS']}; list-valued fields match on
+                any element.
+
+        Returns:
+            Matching records, each once, in dataset order.
+        """
+        positions = set()
+        for field, values in criteria.items():
+            index = self._indexes[field]
+            for value in values:
+                positions.update(index.get(value, ()))
+        return [self.records[p] for p in sorted(positions)]
+
+
+class Repository:
+    """The datasets behind the API, each loaded once and indexed."""
+
+    def __init__(
+        self,
+        user_profiles: Iterable[Record],
+        jira_tickets: Iterable[Record],
+        job_postings: Iterable[Record],
+        learning_materials: Iterable[Record],
+        company_documentation: Iterable[Record],
+        sources: Optional[Dict[str, str]] = None
+    ):
+        """Index the datasets.
+
+        Args:
+            user_profiles: Employee profiles, keyed by user_id.
+            jira_tickets: Tickets, keyed by ticket_id.
+            job_postings: Internal job postings, keyed by job_id.
+            learning_materials: Learning catalog, keyed by material_id.
+            company_documentation: Documents, keyed by doc_id.
+            sources: Source file per dataset name, for the table versions.
+        """
+        sources = sources or {}
+        self.users = Table(
+            "user_profiles", user_profiles, "user_id",
+            indexes=("department", "manager_id", "skills", "interests"),
+            source=sources.get("user_profiles")
+        )
+        self.tickets = Table(
+            "jira_tickets", jira_tickets, "ticket_id",
+            indexes=("assignee", "status"),
+            source=sources.get("jira_tickets")
+        )
+        self.jobs = Table(
+            "job_postings", job_postings, "job_id",
+            indexes=("department", "status"),
+            source=sources.get("job_postings")
+        )
+        self.learning_materials = Table(
+            "learning_materials", learning_materials, "material_id",
+            source=sources.get("learning_materials")
+        )
+        self.documents = Table(
+            "company_documentation", company_documentation, "doc_id",
+            source=sources.get("company_documentation")
+        )
+
+    def connection_candidates(self, user: Record) -> List[Record]:
+        """Get the profiles that can score above zero as connections of a user.
+
+        These are the profiles sharing a skill with the user's skills,
+        interests or desired skills, or with an interest in one of the
+        user's skills; everyone else has no overlap with the user.
+
+        Args:
+            user: Profile of the user asking for connections.
+
+        Returns:
+            Candidate profiles, in dataset order; may include the user.
+        """
+        # Dataset order keeps tied scores ranked as they would be over the full list
+        return self.users.find_any({
+            "skills": set(user.get('skills', [])) | set(user.get('interests', [])) | set(user.get('desired_skills', [])),
+            "interests": user.get('skills', [])
+        })
+
+
+# Load the mock datasets
+current_dir = os.path.dirname(os.path.abspath(__file__))
+mock_data_dir = os.path.join(current_dir, 'mock_data')
+sys.path.insert(0, mock_data_dir)
+
+from company_documentation import company_documentation
+from jira_tickets import jira_tickets
+from job_postings import job_postings
+from learning_materials_dataset import learning_materials
+from user_profiles import user_profiles
+
+# Create a global repository instance
+repository = Repository(
+    user_profiles,
+    jira_tickets,
+    job_postings,
+    learning_materials,
+    company_documentation,
+    sources={
+        "user_profiles": sys.modules["user_profiles"].__file__,
+        "jira_tickets": sys.modules["jira_tickets"].__file__,
+        "job_postings": sys.modules["job_postings"].__file__,
+        "learning_materials": sys.modules["learning_materials_dataset"].__file__,
+        "company_documentation": sys.modules["company_documentation"].__file__
+    }
+)
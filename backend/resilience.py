@@ -0,0 +1,476 @@
+# backend/resilience.py
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger("resilience")
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight call.
+    
+    The first caller for a key (the leader) starts the work as a separate task;
+    callers arriving while it runs wait on the same task. Every waiter gets the
+    result or the exception. A waiter that is cancelled stops waiting without
+    cancelling the shared task, so the others - and the cache - still get the
+    result.
+    """
+    
+    def __init__(self):
+        """Initialize an empty table of in-flight calls."""
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.coalesced_calls = 0
+    
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None
+    ) -> Any:
+        """Run fn once for all concurrent callers with the same key.
+        
+        Args:
+            key: Identity of the call; equal keys share one execution.
+            fn: Zero-argument coroutine function performing the work.
+            timeout: Seconds this caller is willing to wait. The shared call
+                keeps running for the other waiters when it runs out.
+            
+        Returns:
+            The result of the shared call.
+            
+        Raises:
+            asyncio.TimeoutError: If timeout passes before the call finishes.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced_calls += 1
+            logger.debug(f"Joined in-flight call for key: {key[:8]}...")
+        
+        if timeout is None:
+            return await asyncio.shield(task)
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+    
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        """Drop a finished call so the next caller starts a fresh one."""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+    
+    @property
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running."""
+        return len(self._in_flight)
+
+
+# Outcomes reported to AdaptiveLimiter.release
+LIMIT_SUCCESS = "success"   # Upstream answered normally
+LIMIT_DROPPED = "dropped"   # 429, 5xx or timeout: upstream is overloaded
+LIMIT_IGNORED = "ignored"   # Client error or cancellation: says nothing about load
+
+class AdaptiveLimiter:
+    """AIMD concurrency limiter for upstream calls.
+    
+    Callers acquire a slot before each upstream request and release it with the
+    outcome. The limit grows additively while calls succeed with stable latency
+    and the limit is actually in use, and shrinks multiplicatively on dropped
+    calls (429s, 5xx, timeouts) or when short-term latency rises well above the
+    long-term baseline. Callers over the limit wait in a FIFO queue instead of
+    failing.
+    """
+    
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        backoff_ratio: float = 0.5,
+        latency_tolerance: float = 2.0,
+        decrease_cooldown: float = 1.0
+    ):
+        """Initialize the limiter.
+        
+        Args:
+            initial_limit: Concurrency limit to start from.
+            min_limit: Lowest the limit may shrink to.
+            max_limit: Highest the limit may grow to.
+            backoff_ratio: Factor the limit is multiplied by on a dropped call.
+            latency_tolerance: Ratio of short-term to baseline latency above
+                which the limit is reduced.
+            decrease_cooldown: Minimum seconds between two decreases, so one
+                burst of failures only counts once.
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.decrease_cooldown = decrease_cooldown
+        
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        
+        # Latency tracking: fast and slow exponentially weighted averages
+        self._short_latency: Optional[float] = None
+        self._baseline_latency: Optional[float] = None
+        
+        # Counters for monitoring
+        self.acquired = 0
+        self.dropped = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_queue_depth = 0
+    
+    async def acquire(self) -> None:
+        """Wait for a free slot. Slots are handed out in arrival order."""
+        start_time = time.monotonic()
+        
+        if self.in_flight < self._effective_limit() and not self._waiters:
+            self.in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just as we were cancelled
+                    self.in_flight -= 1
+                    self._wake_waiters()
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+        
+        waited = time.monotonic() - start_time
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+    
+    def release(self, outcome: str, latency: Optional[float] = None) -> None:
+        """Return a slot and feed the call's outcome into the limit.
+        
+        Args:
+            outcome: One of LIMIT_SUCCESS, LIMIT_DROPPED or LIMIT_IGNORED.
+            latency: Duration of the upstream call in seconds, if meaningful.
+        """
+        self.in_flight -= 1
+        
+        if outcome == LIMIT_DROPPED:
+            self.dropped += 1
+            self._decrease()
+        elif outcome == LIMIT_SUCCESS:
+            if latency is not None and self._latency_rising(latency):
+                self._decrease()
+            elif self.in_flight + 1 >= self.limit / 2:
+                # Only grow when the current limit is actually being used
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        
+        self._wake_waiters()
+    
+    def _effective_limit(self) -> int:
+        """Integral number of slots currently available."""
+        return max(self.min_limit, int(self.limit))
+    
+    def _decrease(self) -> None:
+        """Multiplicatively shrink the limit, at most once per cooldown."""
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        old_limit = self.limit
+        self.limit = max(float(self.min_limit), self.limit * self.backoff_ratio)
+        logger.warning(f"Upstream concurrency limit reduced from {old_limit:.1f} to {self.limit:.1f}")
+    
+    def _latency_rising(self, latency: float) -> bool:
+        """Record a latency sample and report whether latency is rising."""
+        if self._short_latency is None:
+            self._short_latency = self._baseline_latency = latency
+            return False
+        self._short_latency = 0.3 * latency + 0.7 * self._short_latency
+        self._baseline_latency = 0.02 * latency + 0.98 * self._baseline_latency
+        return self._short_latency > self._baseline_latency * self.latency_tolerance
+    
+    def _wake_waiters(self) -> None:
+        """Hand free slots to queued callers in FIFO order."""
+        while self._waiters and self.in_flight < self._effective_limit():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+    
+    def get_stats(self) -> Dict[str, Union[int, float, None]]:
+        """Get limiter statistics.
+        
+        Returns:
+            Dictionary with limiter statistics.
+        """
+        return {
+            "limit": round(self.limit, 2),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "max_queue_depth": self.max_queue_depth,
+            "acquired": self.acquired,
+            "dropped": self.dropped,
+            "avg_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+            "max_wait": self.max_wait,
+            "latency_short": self._short_latency,
+            "latency_baseline": self._baseline_latency
+        }
+
+
+# Circuit breaker states
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Circuit breaker driven by the error rate over a rolling time window.
+    
+    Closed: calls flow and their outcomes are recorded. When at least
+    min_calls outcomes in the window show an error rate of failure_threshold
+    or more, the circuit opens.
+    Open: calls are rejected immediately until open_duration has passed.
+    Half-open: up to half_open_max_calls probe calls are let through. A probe
+    failure re-opens the circuit; enough successful probes close it.
+    """
+    
+    def __init__(
+        self,
+        failure_threshold: float = 0.5,
+        min_calls: int = 10,
+        window: float = 30.0,
+        open_duration: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        """Initialize the circuit breaker in the closed state.
+        
+        Args:
+            failure_threshold: Error rate (0.0 to 1.0) that opens the circuit.
+            min_calls: Outcomes needed in the window before the rate counts.
+            window: Length of the rolling window in seconds.
+            open_duration: Seconds the circuit stays open before probing.
+            half_open_max_calls: Concurrent probes allowed while half-open;
+                this many successes close the circuit.
+        """
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        
+        self.state = CIRCUIT_CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        
+        self.rejected_calls = 0
+        self.times_opened = 0
+    
+    def allow_request(self) -> bool:
+        """Check whether a call may go upstream, taking a probe slot if half-open.
+        
+        Every allowed call must be followed by exactly one of record_success,
+        record_failure or record_ignored.
+        """
+        if self.state == CIRCUIT_OPEN:
+            if time.monotonic() - self._opened_at < self.open_duration:
+                self.rejected_calls += 1
+                return False
+            self._transition(CIRCUIT_HALF_OPEN)
+        
+        if self.state == CIRCUIT_HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_max_calls:
+                self.rejected_calls += 1
+                return False
+            self._probes_in_flight += 1
+        
+        return True
+    
+    def record_success(self) -> None:
+        """Record a call that reached a healthy upstream."""
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_max_calls:
+                self._transition(CIRCUIT_CLOSED)
+            return
+        self._record(True)
+    
+    def record_failure(self) -> None:
+        """Record a call that failed because of the upstream."""
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._transition(CIRCUIT_OPEN)
+            return
+        self._record(False)
+        
+        total = len(self._outcomes)
+        if (self.state == CIRCUIT_CLOSED and total >= self.min_calls
+                and self._failures / total >= self.failure_threshold):
+            self._transition(CIRCUIT_OPEN)
+    
+    def record_ignored(self) -> None:
+        """Release an allowed call whose outcome says nothing about upstream health."""
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+    
+    def _record(self, success: bool) -> None:
+        """Add an outcome to the rolling window."""
+        now = time.monotonic()
+        self._outcomes.append((now, success))
+        if not success:
+            self._failures += 1
+        self._prune(now)
+    
+    def _prune(self, now: float) -> None:
+        """Drop outcomes older than the rolling window."""
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            _, old_success = self._outcomes.popleft()
+            if not old_success:
+                self._failures -= 1
+    
+    def _transition(self, state: str) -> None:
+        """Move to a new state and reset the bookkeeping for it."""
+        if state == self.state:
+            return
+        logger.warning(f"Circuit breaker {self.state} -> {state}")
+        self.state = state
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if state == CIRCUIT_OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        elif state == CIRCUIT_CLOSED:
+            self._outcomes.clear()
+            self._failures = 0
+    
+    @property
+    def retry_after(self) -> float:
+        """Seconds until an open circuit starts probing again."""
+        if self.state != CIRCUIT_OPEN:
+            return 0.0
+        return max(0.0, self.open_duration - (time.monotonic() - self._opened_at))
+    
+    def get_stats(self) -> Dict[str, Union[str, int, float]]:
+        """Get circuit breaker statistics.
+        
+        Returns:
+            Dictionary with circuit breaker statistics.
+        """
+        self._prune(time.monotonic())
+        total = len(self._outcomes)
+        return {
+            "state": self.state,
+            "window_calls": total,
+            "window_error_rate": self._failures / total if total else 0.0,
+            "retry_after": self.retry_after,
+            "rejected_calls": self.rejected_calls,
+            "times_opened": self.times_opened
+        }
+
+
+class Deadline:
+    """Absolute point in time by which a request must be answered.
+    
+    Created once per incoming request from its latency budget and passed down,
+    so every upstream attempt, queue wait and backoff sleep spends from the
+    same budget.
+    """
+    
+    def __init__(self, budget: float):
+        """Start the clock on a latency budget.
+        
+        Args:
+            budget: Total seconds available to the request.
+        """
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+    
+    def remaining(self) -> float:
+        """Seconds left before the deadline, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.remaining() <= 0.0
+
+
+class RetryBudget:
+    """Process-wide cap on retries as a fraction of first attempts.
+    
+    Every first attempt deposits `ratio` tokens and every retry withdraws one,
+    so retries can never exceed that share of traffic and cannot snowball during
+    a partial outage. A trickle of min_retries_per_second tokens keeps
+    low-traffic processes able to retry at all.
+    """
+    
+    def __init__(
+        self,
+        ratio: float = 0.1,
+        min_retries_per_second: float = 1.0,
+        max_balance: float = 20.0
+    ):
+        """Initialize the retry budget.
+        
+        Args:
+            ratio: Retries allowed per first attempt (0.1 = 10% of traffic).
+            min_retries_per_second: Retries always allowed regardless of traffic.
+            max_balance: Most tokens that can be saved up for a burst of retries.
+        """
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.max_balance = max_balance
+        self.balance = min(max_balance, max(1.0, min_retries_per_second))
+        self._last_refill = time.monotonic()
+        
+        self.requests = 0
+        self.retries_allowed = 0
+        self.retries_denied = 0
+    
+    def record_request(self) -> None:
+        """Deposit tokens for a first attempt."""
+        self.requests += 1
+        self.balance = min(self.max_balance, self.balance + self.ratio)
+    
+    def try_spend(self) -> bool:
+        """Withdraw a token for a retry if the budget allows it."""
+        now = time.monotonic()
+        self.balance = min(
+            self.max_balance,
+            self.balance + (now - self._last_refill) * self.min_retries_per_second
+        )
+        self._last_refill = now
+        
+        if self.balance >= 1.0:
+            self.balance -= 1.0
+            self.retries_allowed += 1
+            return True
+        self.retries_denied += 1
+        return False
+    
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        """Get retry budget statistics.
+        
+        Returns:
+            Dictionary with retry budget statistics.
+        """
+        return {
+            "balance": round(self.balance, 2),
+            "ratio": self.ratio,
+            "requests": self.requests,
+            "retries_allowed": self.retries_allowed,
+            "retries_denied": self.retries_denied
+        }
@@ -0,0 +1,189 @@
+# backend/scheduler.py
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger("scheduler")
+
+class PrewarmScheduler:
+    """Pre-generates cacheable AI responses off-peak so user requests hit the cache.
+
+    Each registered kind lists the entities to warm (e.g. completed ticket IDs)
+    and generates the response for one entity through the same code path as
+    the interactive endpoint, which writes it into the response cache. An
+    entity is generated again once its last warm-up is older than its kind's
+    refresh_after, so new entities and expired cache entries are picked up by
+    the next run.
+    """
+
+    def __init__(
+        self,
+        interval: float = 600.0,
+        concurrency: int = 2,
+        start_hour: int = 1,
+        end_hour: int = 6,
+        refresh_after: float = 3600.0
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            interval: Seconds between runs.
+            concurrency: Maximum generations running at the same time.
+            start_hour: Local hour the off-peak window starts.
+            end_hour: Local hour the off-peak window ends; may wrap past midnight.
+            refresh_after: Seconds after which a warmed entity is generated
+                again, for kinds registered without their own.
+        """
+        self.interval = interval
+        self.concurrency = concurrency
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.refresh_after = refresh_after
+
+        self._kinds: Dict[str, Tuple[Callable[[], Iterable[str]], Callable[[str], Awaitable[Any]], float]] = {}
+        self._warmed_at: Dict[Tuple[str, str], float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._run_lock: Optional[asyncio.Lock] = None
+
+        # Counters
+        self.runs = 0
+        self.generated = 0
+        self.failed = 0
+        self.last_run: Optional[float] = None
+
+        logger.info(
+            f"Initialized prewarm scheduler (interval={interval}s, concurrency={concurrency}, "
+            f"off-peak={start_hour}:00-{end_hour}:00)"
+        )
+
+    def register(
+        self,
+        kind: str,
+        entities: Callable[[], Iterable[str]],
+        generate: Callable[[str], Awaitable[Any]],
+        refresh_after: Optional[float] = None
+    ) -> None:
+        """Register a kind of content to pre-generate.
+
+        Args:
+            kind: Name of the content, e.g. the endpoint it serves.
+            entities: Returns the IDs of the entities to warm.
+            generate: Generates and caches the response for one entity ID;
+                raises if the response did not end up in the cache.
+            refresh_after: Seconds after which a warmed entity is generated
+                again, usually the TTL of its cache entries; the scheduler
+                default if None.
+        """
+        self._kinds[kind] = (entities, generate, refresh_after if refresh_after is not None else self.refresh_after)
+
+    def start(self) -> None:
+        """Start running in the background."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        """Stop the background loop, cancelling a run in progress."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def is_off_peak(self, now: Optional[datetime] = None) -> bool:
+        """Whether the current local hour is inside the off-peak window."""
+        hour = (now or datetime.now()).hour
+        if self.start_hour <= self.end_hour:
+            return self.start_hour <= hour < self.end_hour
+        return hour >= self.start_hour or hour < self.end_hour
+
+    async def run_once(self) -> Dict[str, int]:
+        """Generate every registered entity that is not warm yet.
+
+        Returns:
+            Counts of generated, failed and skipped entities.
+        """
+        # Created on first use so it binds to the server's event loop
+        if self._run_lock is None:
+            self._run_lock = asyncio.Lock()
+
+        async with self._run_lock:
+            now = time.time()
+            pending: List[Tuple[str, str]] = []
+            skipped = 0
+            for kind, (entities, _, refresh_after) in self._kinds.items():
+                for entity_id in entities():
+                    warmed_at = self._warmed_at.get((kind, entity_id))
+                    if warmed_at is not None and now - warmed_at < refresh_after:
+                        skipped += 1
+                    else:
+                        pending.append((kind, entity_id))
+
+            semaphore = asyncio.Semaphore(max(1, self.concurrency))
+            results = await asyncio.gather(*(self._warm(kind, entity_id, semaphore) for kind, entity_id in pending))
+
+            generated = sum(results)
+            failed = len(results) - generated
+            self.runs += 1
+            self.generated += generated
+            self.failed += failed
+            self.last_run = time.time()
+
+            logger.info(f"Prewarm run finished: {generated} generated, {failed} failed, {skipped} already warm")
+            return {"generated": generated, "failed": failed, "skipped": skipped}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics.
+
+        Returns:
+            Dictionary with run counters and the warm entity count per kind.
+        """
+        now = time.time()
+        warm: Dict[str, int] = {kind: 0 for kind in self._kinds}
+        for (kind, _), warmed_at in self._warmed_at.items():
+            if kind in self._kinds and now - warmed_at < self._kinds[kind][2]:
+                warm[kind] = warm.get(kind, 0) + 1
+
+        return {
+            "running": self._task is not None,
+            "off_peak": self.is_off_peak(),
+            "runs": self.runs,
+            "generated": self.generated,
+            "failed": self.failed,
+            "last_run": self.last_run,
+            "warm_entities": warm
+        }
+
+    async def _warm(self, kind: str, entity_id: str, semaphore: asyncio.Semaphore) -> bool:
+        """Generate one entity under the concurrency cap. Returns success."""
+        async with semaphore:
+            try:
+                await self._kinds[kind][1](entity_id)
+            except Exception as e:
+                logger.warning(f"Prewarm of {kind} {entity_id} failed: {str(e)}")
+                return False
+            self._warmed_at[(kind, entity_id)] = time.time()
+            return True
+
+    async def _loop(self) -> None:
+        """Run during the off-peak window every interval seconds."""
+        while True:
+            if self.is_off_peak():
+                try:
+                    await self.run_once()
+                except Exception as e:
+                    logger.error(f"Prewarm run failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+
+# Create a global prewarm scheduler
+from config import settings
+
+# Initialize the scheduler with settings
+prewarm_scheduler = PrewarmScheduler(
+    interval=settings.AI_PREWARM_INTERVAL if settings else 600.0,
+    concurrency=settings.AI_PREWARM_CONCURRENCY if settings else 2,
+    start_hour=settings.AI_PREWARM_START_HOUR if settings else 1,
+    end_hour=settings.AI_PREWARM_END_HOUR if settings else 6,
+    refresh_after=settings.AI_RESPONSE_CACHE_TTL if settings else 3600
+)
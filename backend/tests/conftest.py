@@ -0,0 +1,47 @@
+# backend/tests/conftest.py
+"""Shared test setup.
+
+Run from the backend directory with: python -m pytest -q
+"""
+import os
+import sys
+
+import pytest
+
+# The settings refuse to load without these
+os.environ.setdefault("DEEPSEEK_API_KEY", "sk-test")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeClock:
+    """Stand-in for time.time and time.monotonic that only moves when told to."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    monotonic = time
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the clock of the cache and resilience modules with a FakeClock.
+
+    Only the modules' own reference to time is patched, so the event loop
+    keeps its real clock.
+    """
+    import cache
+    import resilience
+
+    fake = FakeClock()
+    monkeypatch.setattr(cache, "time", fake)
+    monkeypatch.setattr(resilience, "time", fake)
+    return fake
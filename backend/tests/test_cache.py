@@ -0,0 +1,188 @@
+# backend/tests/test_cache.py
+import asyncio
+
+from cache import CachePolicy, ResponseCache, SQLiteCacheBackend
+
+
+def make_cache(**kwargs) -> ResponseCache:
+    options = {"ttl": 60, "max_size": 3, "compress_min_bytes": None}
+    options.update(kwargs)
+    return ResponseCache(**options)
+
+
+def test_get_returns_stored_response(clock):
+    cache = make_cache()
+    cache.set("k", "response")
+
+    assert cache.get("k") == "response"
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used_entry(clock):
+    cache = make_cache(max_size=3)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    cache.get("a")  # "b" is now the least recently used
+
+    cache.set("d", "d")
+
+    assert list(cache.cache) == ["c", "a", "d"]
+    assert cache.get("b") is None
+    assert cache.evictions == 1
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = make_cache()
+    cache.set("k", "response", CachePolicy(ttl=10))
+
+    clock.advance(9)
+    assert cache.get("k") == "response"
+    clock.advance(1)
+    assert cache.get("k") is None
+    assert cache.expirations == 1
+    assert "k" not in cache.cache
+
+
+def test_stale_entry_served_within_max_stale(clock):
+    cache = make_cache()
+    policy = CachePolicy(ttl=10, max_stale=5)
+    cache.set("k", "response", policy)
+    clock.advance(12)
+
+    # Callers tolerating staleness get it along with its age
+    assert cache.lookup("k", policy) == ("response", 2)
+    assert cache.stale_hits == 1
+    # Callers that want fresh responses miss, but the entry is kept
+    assert cache.lookup("k") is None
+    assert "k" in cache.cache
+
+    clock.advance(3)
+    assert cache.lookup("k", policy) is None
+    assert "k" not in cache.cache
+
+
+def test_bypass_read_skips_lookup(clock):
+    cache = make_cache()
+    cache.set("k", "response")
+
+    assert cache.get("k", CachePolicy(bypass_read=True)) is None
+    assert cache.bypassed == 1
+    assert cache.misses == 0
+
+
+def test_byte_bound_evicts_until_under_limit(clock):
+    # Each entry takes a one-byte key plus a 10-byte response
+    cache = make_cache(max_size=100, max_bytes=25)
+    for key in ("a", "b", "c"):
+        cache.set(key, key * 10)
+
+    assert list(cache.cache) == ["b", "c"]
+    assert cache.stored_bytes == 22
+    assert cache.evictions == 1
+
+
+def test_byte_bound_rejects_oversized_response(clock):
+    cache = make_cache(max_size=100, max_bytes=25)
+    cache.set("a", "a" * 10)
+
+    cache.set("big", "x" * 100)
+
+    assert cache.get("big") is None
+    assert list(cache.cache) == ["a"]
+
+
+def test_byte_bound_purges_expired_before_evicting(clock):
+    cache = make_cache(max_size=100, max_bytes=25)
+    cache.set("old", "o" * 10, CachePolicy(ttl=1))
+    cache.set("a", "a" * 10)
+    clock.advance(2)
+
+    cache.set("b", "b" * 10)
+
+    assert list(cache.cache) == ["a", "b"]
+    assert (cache.expirations, cache.evictions) == (1, 0)
+
+
+def test_invalidate_tags_drops_dependent_entries(clock):
+    cache = make_cache()
+    cache.set("summary", "s", tags=["ticket:PROJ-1"])
+    cache.set("other", "o", tags=["ticket:PROJ-2"])
+
+    assert cache.invalidate_tags(["ticket:PROJ-1"]) == 1
+    assert cache.get("summary") is None
+    assert cache.get("other") == "o"
+
+
+def test_stats_count_expired_entries(clock):
+    cache = make_cache(max_size=10)
+    cache.set("fresh", "f", CachePolicy(ttl=100))
+    cache.set("stale", "s", CachePolicy(ttl=10, max_stale=100))
+    cache.set("stale2", "s", CachePolicy(ttl=10, max_stale=100))
+    cache.set("gone", "g", CachePolicy(ttl=10))
+    clock.advance(20)
+
+    stats = cache.get_stats()
+
+    # Entries past their staleness window are purged; stale ones still count as expired
+    assert stats["total_entries"] == 3
+    assert stats["active_entries"] == 1
+    assert stats["expired_entries"] == 2
+
+
+def test_stats_report_hits_and_namespaces(clock):
+    cache = make_cache()
+    policy = CachePolicy(namespace="star_summary")
+    cache.set("k", "response", policy, latency=2.0)
+    cache.get("k", policy)
+    cache.get("missing", policy)
+
+    stats = cache.get_stats()
+
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["latency_saved_seconds"] == 2.0
+    namespace = stats["namespaces"]["star_summary"]
+    assert (namespace["entries"], namespace["hits"], namespace["misses"]) == (1, 1, 1)
+    assert namespace["hit_rate"] == 0.5
+
+
+def test_compression_ratio(clock):
+    plain = make_cache()
+    plain.set("k", "response " * 100)
+    assert plain.get_stats()["compression_ratio"] == 1.0
+
+    compressed = make_cache(compress_min_bytes=100)
+    compressed.set("k", "response " * 100)
+
+    stats = compressed.get_stats()
+    assert stats["compressed_entries"] == 1
+    assert stats["compression_ratio"] > 10
+    assert compressed.get("k") == "response " * 100
+
+
+def test_l1_miss_reads_through_to_l2(clock, tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "l2.db"))
+    try:
+        make_cache(backend=backend).set("k", "response", tags=["user:u1"])
+        other_worker = make_cache(backend=backend)
+
+        assert asyncio.run(other_worker.lookup_async("k")) == ("response", 0.0)
+        assert other_worker.l2_hits == 1
+        assert "k" in other_worker.cache
+    finally:
+        backend.close()
+
+
+def test_l2_invalidation_applies_before_later_reads(clock, tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "l2.db"))
+    try:
+        make_cache(backend=backend).set("k", "response", tags=["user:u1"])
+        make_cache(backend=backend).invalidate_tags(["user:u1"])
+        other_worker = make_cache(backend=backend)
+
+        assert asyncio.run(other_worker.lookup_async("k")) is None
+        assert other_worker.get("k") is None
+        assert other_worker.misses == 2
+    finally:
+        backend.close()
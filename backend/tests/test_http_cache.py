@@ -0,0 +1,32 @@
+# backend/tests/test_http_cache.py
+import pytest
+
+from http_cache import etag_matches, make_etag
+
+ETAG = '"abc"'
+
+
+@pytest.mark.parametrize("if_none_match", [
+    '"abc"',
+    'W/"abc"',
+    '"xyz", "abc"',
+    '"xyz",W/"abc"',
+    '*',
+    ' * '
+])
+def test_etag_matches(if_none_match):
+    assert etag_matches(if_none_match, ETAG)
+
+
+@pytest.mark.parametrize("if_none_match", [None, '', '"xyz"', 'abc', '"abcd"', 'W/"xyz"'])
+def test_etag_does_not_match(if_none_match):
+    assert not etag_matches(if_none_match, ETAG)
+
+
+def test_make_etag_is_quoted_and_deterministic():
+    etag = make_etag("v1", {"user_id": "u1"})
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("v1", {"user_id": "u1"})
+    assert etag != make_etag("v2", {"user_id": "u1"})
+    assert etag_matches(etag, etag)
@@ -0,0 +1,65 @@
+# backend/tests/test_repository.py
+import pytest
+
+from repository import Table
+
+PEOPLE = [
+    {"id": 1, "team": "data", "level": "senior", "skills": ["Python", "SQL"]},
+    {"id": 2, "team": "web", "level": "junior", "skills": ["JavaScript"]},
+    {"id": 3, "team": "data", "level": "junior", "skills": ["Python", "Python"]},
+    {"id": 4, "team": "ops", "level": "senior", "skills": ["AWS", "Python"]},
+]
+
+
+@pytest.fixture
+def people() -> Table:
+    return Table("people", PEOPLE, "id", indexes=("team", "skills"))
+
+
+def test_get_by_primary_key(people):
+    assert people.get(3) is PEOPLE[2]
+    assert people.get(99) is None
+    assert people.get_many([2, 99]) == [PEOPLE[1], None]
+
+
+def test_find_on_indexed_field(people):
+    assert people.find(team="data") == [PEOPLE[0], PEOPLE[2]]
+    assert people.find(team="finance") == []
+
+
+def test_find_checks_unindexed_criteria(people):
+    assert people.find(team="data", level="junior") == [PEOPLE[2]]
+
+
+def test_find_matches_list_elements_once(people):
+    assert people.find(skills="Python") == [PEOPLE[0], PEOPLE[2], PEOPLE[3]]
+
+
+def test_find_combines_indexed_criteria(people):
+    assert people.find(skills="Python", team="ops") == [PEOPLE[3]]
+
+
+def test_find_requires_an_indexed_field(people):
+    with pytest.raises(ValueError):
+        people.find(level="senior")
+
+
+def test_find_any_unions_fields_in_dataset_order(people):
+    found = people.find_any({"skills": ["AWS", "JavaScript"], "team": ["data"]})
+
+    assert found == PEOPLE
+
+
+def test_find_any_returns_each_record_once(people):
+    assert people.find_any({"skills": ["Python", "SQL"]}) == [PEOPLE[0], PEOPLE[2], PEOPLE[3]]
+
+
+def test_find_any_without_values(people):
+    assert people.find_any({"skills": []}) == []
+
+
+def test_duplicate_primary_key_keeps_first_record():
+    table = Table("dupes", [{"id": 1, "v": "first"}, {"id": 1, "v": "second"}], "id")
+
+    assert table.get(1)["v"] == "first"
+    assert len(table) == 2
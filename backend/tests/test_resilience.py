@@ -0,0 +1,212 @@
+# backend/tests/test_resilience.py
+import asyncio
+
+import pytest
+
+from resilience import (
+    CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, LIMIT_DROPPED, LIMIT_SUCCESS,
+    AdaptiveLimiter, CircuitBreaker, SingleFlight
+)
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_calls):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+
+def test_breaker_opens_at_failure_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=0.5, min_calls=4, open_duration=30)
+    for success in (True, True, False):
+        breaker.allow_request()
+        breaker.record_success() if success else breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED
+
+    breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == CIRCUIT_OPEN
+    assert not breaker.allow_request()
+    assert breaker.rejected_calls == 1
+    assert breaker.retry_after == 30
+
+
+def test_breaker_needs_min_calls(clock):
+    breaker = CircuitBreaker(min_calls=4)
+    for _ in range(3):
+        breaker.allow_request()
+        breaker.record_failure()
+
+    assert breaker.state == CIRCUIT_CLOSED
+
+
+def test_breaker_forgets_outcomes_outside_window(clock):
+    breaker = CircuitBreaker(min_calls=4, window=10)
+    for _ in range(3):
+        breaker.allow_request()
+        breaker.record_failure()
+    clock.advance(11)
+
+    breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == CIRCUIT_CLOSED
+    assert breaker.get_stats()["window_calls"] == 1
+
+
+def test_breaker_half_open_probe_success_closes(clock):
+    breaker = CircuitBreaker(min_calls=2, open_duration=30, half_open_max_calls=1)
+    open_breaker(breaker)
+    clock.advance(30)
+
+    assert breaker.allow_request()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+
+    assert breaker.state == CIRCUIT_CLOSED
+    assert breaker.allow_request()
+
+
+def test_breaker_half_open_probe_failure_reopens(clock):
+    breaker = CircuitBreaker(min_calls=2, open_duration=30)
+    open_breaker(breaker)
+    clock.advance(30)
+
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == CIRCUIT_OPEN
+    assert breaker.times_opened == 2
+    assert not breaker.allow_request()
+
+
+def test_breaker_ignored_outcome_frees_probe(clock):
+    breaker = CircuitBreaker(min_calls=2, open_duration=30)
+    open_breaker(breaker)
+    clock.advance(30)
+
+    assert breaker.allow_request()
+    breaker.record_ignored()
+
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_limiter_queues_callers_over_limit_in_order():
+    async def scenario():
+        limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+        order = []
+
+        async def call(name):
+            await limiter.acquire()
+            order.append(name)
+            await asyncio.sleep(0)
+            limiter.release(LIMIT_SUCCESS)
+
+        await asyncio.gather(*(call(name) for name in "abc"))
+        return limiter, order
+
+    limiter, order = asyncio.run(scenario())
+
+    assert order == ["a", "b", "c"]
+    assert limiter.in_flight == 0
+    assert limiter.get_stats()["max_queue_depth"] == 2
+
+
+def test_limiter_halves_on_drop_once_per_cooldown(clock):
+    limiter = AdaptiveLimiter(initial_limit=20, backoff_ratio=0.5, decrease_cooldown=1.0)
+
+    async def drop():
+        await limiter.acquire()
+        limiter.release(LIMIT_DROPPED)
+
+    asyncio.run(drop())
+    asyncio.run(drop())
+    assert limiter.limit == 10
+    assert limiter.dropped == 2
+
+    clock.advance(1)
+    asyncio.run(drop())
+    assert limiter.limit == 5
+
+
+def test_limiter_never_drops_below_min_limit(clock):
+    limiter = AdaptiveLimiter(initial_limit=2, min_limit=2, decrease_cooldown=0)
+
+    async def drop():
+        await limiter.acquire()
+        limiter.release(LIMIT_DROPPED)
+
+    asyncio.run(drop())
+
+    assert limiter.limit == 2
+
+
+def test_limiter_grows_while_busy():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=3)
+
+    async def busy():
+        await limiter.acquire()
+        await limiter.acquire()
+        limiter.release(LIMIT_SUCCESS)
+        limiter.release(LIMIT_SUCCESS)
+
+    asyncio.run(busy())
+
+    assert 2 < limiter.limit <= 3
+
+
+def test_single_flight_runs_shared_call_once():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+
+    assert calls == 1
+    assert results == ["result"] * 5
+    assert flight.coalesced_calls == 4
+    assert flight.in_flight == 0
+
+
+def test_single_flight_shares_exception():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        return await asyncio.gather(*(flight.do("k", fail) for _ in range(2)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert [str(e) for e in results] == ["upstream down"] * 2
+
+
+def test_single_flight_timeout_leaves_shared_call_running():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        patient = asyncio.ensure_future(flight.do("k", slow))
+        with pytest.raises(asyncio.TimeoutError):
+            await flight.do("k", slow, timeout=0.01)
+        return await patient
+
+    assert asyncio.run(scenario()) == "result"
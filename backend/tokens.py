@@ -0,0 +1,205 @@
+# backend/tokens.py
+import math
+import re
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+from config import settings
+
+logger = logging.getLogger("tokens")
+
+# DeepSeek documents roughly 0.3 tokens per English character; without the
+# tokenizer at hand this is close enough for budgeting
+TOKENS_PER_CHAR = 0.3
+
+# Extra tokens the chat template adds around every message
+TOKENS_PER_MESSAGE = 4
+
+_HORIZONTAL_WHITESPACE = re.compile(r"[ \t]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+def prompt_token_budget(endpoint_name: str) -> int:
+    """Get the token budget for the per-request context of an endpoint's prompt.
+    
+    Args:
+        endpoint_name: Name of the app endpoint.
+        
+    Returns:
+        Tokens the variable context (tickets, jobs, documents...) may use.
+    """
+    if not settings:
+        return 2000
+    return settings.AI_ENDPOINT_PROMPT_TOKEN_BUDGETS.get(endpoint_name, settings.AI_PROMPT_TOKEN_BUDGET)
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text.
+    
+    Args:
+        text: Text to measure.
+        
+    Returns:
+        Estimated token count.
+    """
+    return math.ceil(len(text) * TOKENS_PER_CHAR) if text else 0
+
+def estimate_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimate the prompt tokens of a list of chat messages.
+    
+    Args:
+        messages: Message objects with 'role' and 'content' keys.
+        
+    Returns:
+        Estimated token count.
+    """
+    return sum(estimate_tokens(m.get("content", "")) + TOKENS_PER_MESSAGE for m in messages)
+
+def compact_whitespace(text: str) -> str:
+    """Strip indentation and redundant whitespace from a prompt.
+    
+    Runs of spaces and tabs become one space, every line is stripped and more
+    than one blank line in a row is collapsed. Line structure is kept.
+    
+    Args:
+        text: Prompt text.
+        
+    Returns:
+        Compacted text.
+    """
+    lines = [_HORIZONTAL_WHITESPACE.sub(" ", line).strip() for line in text.strip().splitlines()]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines))
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = " [...]") -> str:
+    """Cut text so that it fits within a token budget.
+    
+    Args:
+        text: Text to shorten.
+        max_tokens: Token budget for the text.
+        marker: Appended to show that the text was cut.
+        
+    Returns:
+        The text, shortened at a word boundary if it was over budget.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    
+    max_chars = max(0, int(max_tokens / TOKENS_PER_CHAR) - len(marker))
+    cut = text[:max_chars]
+    # Prefer to cut at a word boundary
+    if " " in cut[max_chars // 2:]:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip() + marker
+
+def fit_items(items: List[str], max_tokens: int, separator: str = "\n") -> List[str]:
+    """Keep the leading items that fit together within a token budget.
+    
+    Items should be ordered most important first. The first item is always
+    kept, truncated if it alone is over budget, so the prompt never loses its
+    whole context.
+    
+    Args:
+        items: Rendered context items, most important first.
+        max_tokens: Token budget for all kept items together.
+        separator: Separator the items will be joined with.
+        
+    Returns:
+        The items that fit.
+    """
+    kept: List[str] = []
+    used = 0
+    separator_tokens = estimate_tokens(separator)
+    
+    for item in items:
+        cost = estimate_tokens(item) + (separator_tokens if kept else 0)
+        if used + cost > max_tokens:
+            if not kept:
+                kept.append(truncate_to_tokens(item, max_tokens))
+            break
+        kept.append(item)
+        used += cost
+    
+    if len(kept) < len(items):
+        logger.debug(f"Prompt budget kept {len(kept)} of {len(items)} context items")
+    return kept
+
+
+class TokenUsageTracker:
+    """Per-endpoint accounting of prompt size, token usage and latency.
+    
+    Records the estimated prompt size and the `usage` block DeepSeek returns
+    for every upstream completion, so latency and cost can be tied to prompt
+    size per endpoint.
+    """
+    
+    def __init__(self):
+        """Initialize empty usage statistics."""
+        self._stats: Dict[str, Dict[str, Union[int, float]]] = {}
+    
+    def _entry(self, endpoint: str) -> Dict[str, Union[int, float]]:
+        """Get or create the statistics entry for an endpoint."""
+        if endpoint not in self._stats:
+            self._stats[endpoint] = {
+                "calls": 0,
+                "cached_calls": 0,
+                "estimated_prompt_tokens": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "prompt_cache_hit_tokens": 0,
+                "max_prompt_tokens": 0,
+                "total_latency": 0.0
+            }
+        return self._stats[endpoint]
+    
+    def record(
+        self,
+        endpoint: Optional[str],
+        usage: Optional[Dict[str, Any]],
+        estimated_prompt_tokens: int,
+        latency: float
+    ) -> None:
+        """Record one upstream completion.
+        
+        Args:
+            endpoint: Name of the endpoint the call was made for.
+            usage: The response's `usage` block, if any.
+            estimated_prompt_tokens: Our estimate of the prompt size.
+            latency: Duration of the upstream call in seconds.
+        """
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens", estimated_prompt_tokens)
+        entry = self._entry(endpoint or "unknown")
+        entry["calls"] += 1
+        entry["estimated_prompt_tokens"] += estimated_prompt_tokens
+        entry["prompt_tokens"] += prompt_tokens
+        entry["completion_tokens"] += usage.get("completion_tokens", 0)
+        entry["prompt_cache_hit_tokens"] += usage.get("prompt_cache_hit_tokens", 0)
+        entry["max_prompt_tokens"] = max(entry["max_prompt_tokens"], prompt_tokens)
+        entry["total_latency"] += latency
+    
+    def record_cached(self, endpoint: Optional[str]) -> None:
+        """Record a call answered from the response cache."""
+        self._entry(endpoint or "unknown")["cached_calls"] += 1
+    
+    def get_stats(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """Get token usage statistics per endpoint.
+        
+        Returns:
+            Dictionary mapping endpoint names to their usage statistics.
+        """
+        stats = {}
+        for endpoint, entry in self._stats.items():
+            calls = entry["calls"]
+            stats[endpoint] = {
+                **entry,
+                "avg_prompt_tokens": entry["prompt_tokens"] / calls if calls else 0.0,
+                "avg_completion_tokens": entry["completion_tokens"] / calls if calls else 0.0,
+                "avg_latency": entry["total_latency"] / calls if calls else 0.0
+            }
+        return stats
+    
+    def clear(self) -> None:
+        """Reset all usage statistics."""
+        self._stats.clear()
+
+
+# Create a global token usage tracker
+token_usage = TokenUsageTracker()
@@ -28,9 +28,9 @@ const connectionService = {
    */
   getRecommendationsWithProfile: async (userId, userProfile) => {
     try {
-      // Make the API call for recommendations
-      const response = await api.post('/connect/recommendations', {
-        user_id: userId
+      // GET, so the browser can revalidate repeated views with the ETag
+      const response = await api.get('/connect/recommendations', {
+        params: { user_id: userId }
       });
       
       const result = response.data;